@@ -18,6 +18,8 @@ module.exports = {
 
   // API 설정
   API: {
-    RECOMMENDATION_URL: process.env.RECOMMENDATION_API_URL || "http://localhost:5000"
+    RECOMMENDATION_URL: process.env.RECOMMENDATION_API_URL || "http://localhost:5000",
+    // true면 YouTube 검색 결과를 키워드마다 바로 추천 서버로 스트리밍 (/recommend/stream)
+    RECOMMENDATION_STREAMING: process.env.RECOMMENDATION_STREAMING === "true"
   }
 };
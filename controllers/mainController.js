@@ -3,8 +3,17 @@ const Emotion = require("../models/Emotion");
 const MusicHistory = require("../models/MusicHistory");
 const UserProfile = require("../models/UserProfile");
 const { searchMultipleKeywords, loadMoreMusic } = require("../utils/youtubeApi");
-const { generateKeywords, getRecommendations } = require("../utils/recommendationHelper");
-const { MUSIC } = require("../config/constants");
+const {
+  generateKeywords,
+  getRecommendations,
+  getRecommendationPage,
+  openRecommendationStream,
+  getNextRecommendationPage,
+  getCatalogRecommendations,
+  refreshUserProfile,
+  appendUserProfile
+} = require("../utils/recommendationHelper");
+const { MUSIC, API } = require("../config/constants");
 
 //@desc Get index page
 //@route GET /index
@@ -119,17 +128,29 @@ const recommendMusic = asyncHandler(async (req, res) => {
   // 2. 키워드 생성
   const keywords = await generateKeywords(emotion, playedHistory);
 
-  // 3. YouTube 검색
+  // 3~4. YouTube 검색 + Python 추천 서버 호출
   const resultsPerKeyword = Math.ceil(count / keywords.length);
-  const candidateMusic = await searchMultipleKeywords(
-    keywords,
-    resultsPerKeyword,
-    MUSIC.MAX_DURATION,
-    [] 
-  );
-
-  // 4. Python 추천 서버 호출
-  const musicList = await getRecommendations(userId, emotion, candidateMusic, playedHistory);
+  let page;
+  if (API.RECOMMENDATION_STREAMING) {
+    // 키워드 검색이 끝날 때마다 결과를 추천 서버로 보내 채점 (상위 count개만 받음)
+    const stream = openRecommendationStream(userId, emotion, playedHistory, count);
+    try {
+      await searchMultipleKeywords(keywords, resultsPerKeyword, MUSIC.MAX_DURATION, [], stream.send);
+    } finally {
+      page = await stream.finish();
+    }
+  } else {
+    const candidateMusic = await searchMultipleKeywords(
+      keywords,
+      resultsPerKeyword,
+      MUSIC.MAX_DURATION,
+      [] 
+    );
+
+    // 상위 count개만 받고 나머지는 nextCursor로 추가 로딩
+    page = await getRecommendationPage(userId, emotion, candidateMusic, playedHistory, count);
+  }
+  const { musicList, totalCount, nextCursor } = page;
 
   // 5. 결과 반환
   res.status(200).json({
@@ -138,8 +159,9 @@ const recommendMusic = asyncHandler(async (req, res) => {
     data: {
       emotion,
       keywords,
-      totalCount: musicList.length,
-      musicList: musicList.slice(0, count),
+      totalCount,
+      musicList,
+      nextCursor,
     },
   });
 });
@@ -147,7 +169,7 @@ const recommendMusic = asyncHandler(async (req, res) => {
 // 추가 음악 로딩 API
 // POST /api/music/load-more
 const loadMore = asyncHandler(async (req, res) => {
-  const { emotion, excludeVideoIds = [], count = 30 } = req.body;
+  const { emotion, excludeVideoIds = [], count = 30, cursor } = req.body;
   const userId = req.user.id;
 
   if (!emotion) {
@@ -157,6 +179,24 @@ const loadMore = asyncHandler(async (req, res) => {
     });
   }
 
+  // 이전 추천에서 남은 결과가 있으면 재검색 없이 다음 페이지 사용
+  // (커서는 Python 서버 워커 간 공유 저장소에서 읽으므로 어느 워커로 가도 같은 결과 - 워커별 카탈로그보다 먼저 사용)
+  if (cursor) {
+    const page = await getNextRecommendationPage(userId, cursor, count);
+    if (page && page.musicList.length > 0) {
+      return res.status(200).json({
+        success: true,
+        message: "추가 음악 로딩이 완료되었습니다.",
+        data: {
+          emotion,
+          totalCount: page.totalCount,
+          musicList: page.musicList,
+          nextCursor: page.nextCursor,
+        },
+      });
+    }
+  }
+
   // 1. 사용자 재생 기록 조회
   const playedHistory = await MusicHistory.find({ userId })
     .populate('emotionId', 'emotion') 
@@ -165,13 +205,30 @@ const loadMore = asyncHandler(async (req, res) => {
     .select('youtubeVideoId videoTitle channelTitle playedAt emotionId')
     .lean();
 
-  // 2. 키워드 생성 
+  // 2. 로컬 카탈로그에 이 감정으로 받은 음악이 충분하면 YouTube 검색 없이 추천
+  //    (카탈로그는 후보를 받은 요청의 감정을 기록하고 같은 감정 음악만 반환)
+  //    카탈로그는 Python 워커 프로세스별이라 요청을 받은 워커에 따라 결과가 다를 수 있음 - 부족하면 YouTube 검색
+  const catalogPage = await getCatalogRecommendations(userId, emotion, playedHistory, excludeVideoIds, count);
+  if (catalogPage && catalogPage.musicList.length >= count) {
+    return res.status(200).json({
+      success: true,
+      message: "추가 음악 로딩이 완료되었습니다.",
+      data: {
+        emotion,
+        totalCount: catalogPage.totalCount,
+        musicList: catalogPage.musicList,
+        nextCursor: catalogPage.nextCursor,
+      },
+    });
+  }
+
+  // 3. 키워드 생성 
   const keywords = await generateKeywords(emotion, playedHistory);
 
-  // 3. 추가 음악 검색
+  // 4. 추가 음악 검색
   const candidateMusic = await loadMoreMusic(emotion, keywords, excludeVideoIds, count, MUSIC.MAX_DURATION);
 
-  // 4. Python 추천 서버 호출
+  // 5. Python 추천 서버 호출
   const musicList = await getRecommendations(userId, emotion, candidateMusic, playedHistory);
 
   res.status(200).json({
@@ -246,9 +303,10 @@ const updateUserProfile = asyncHandler(async (req, res) => {
   try {
     // 1. 최근 재생 기록 조회
     const playedHistory = await MusicHistory.find({ userId })
+      .populate('emotionId', 'emotion')
       .sort({ playedAt: -1 })
-      .limit(10)
-      .select('youtubeVideoId videoTitle channelTitle playedAt')
+      .limit(MUSIC.HISTORY_LIMIT)
+      .select('youtubeVideoId videoTitle channelTitle playedAt emotionId')
       .lean();
 
     if (playedHistory.length === 0) {
@@ -258,23 +316,14 @@ const updateUserProfile = asyncHandler(async (req, res) => {
       });
     }
 
-    // 2. Python 서버에 프로필 생성 요청
-    // 빈 후보 목록으로 호출하여 사용자 프로필만 생성
-    const profileResponse = await axios.post(`${RECOMMENDATION_API_URL}/recommend`, {
-      userId: userId,
-      candidateMusic: [],
-      playedHistory: playedHistory.map(music => ({
-        videoId: music.youtubeVideoId,
-        title: music.videoTitle,
-        channelTitle: music.channelTitle,
-        playedAt: music.playedAt
-      }))
-    });
+    // 2. 가장 최근 재생 곡만 Python 프로필에 증분 반영
+    //    (Python에 저장된 프로필이 없으면 전체 재생 기록으로 재계산 - 감정별 프로필도 함께 저장)
+    const userProfileData = await appendUserProfile(userId, playedHistory[0])
+      || await refreshUserProfile(userId, playedHistory);
 
-    if (profileResponse.data.success) {
-      const userProfileData = profileResponse.data.data;
-      const userProfileVector = userProfileData.userProfile || {};
-      const userProfileSize = userProfileData.userProfileSize || 0;
+    if (userProfileData) {
+      const userProfileVector = userProfileData.profile || {};
+      const userProfileSize = Object.keys(userProfileVector).length;
 
       // 3. UserProfile 컬렉션에 저장 
       await UserProfile.findOneAndUpdate(
@@ -282,7 +331,7 @@ const updateUserProfile = asyncHandler(async (req, res) => {
         {
           profileVector: userProfileVector,  
           lastUpdated: new Date(),
-          musicCount: playedHistory.length,
+          musicCount: userProfileData.musicCount,
         },
         { upsert: true, new: true }
       );
@@ -291,9 +340,9 @@ const updateUserProfile = asyncHandler(async (req, res) => {
         success: true,
         message: "사용자 프로필이 업데이트되었습니다.",
         data: {
-          musicCount: playedHistory.length,
+          musicCount: userProfileData.musicCount,
           profileSize: userProfileSize,
-          vectorSize: Object.keys(userProfileVector).length
+          vectorSize: userProfileSize
         }
       });
     } else {
@@ -45,6 +45,7 @@ const totalTimeEl = document.getElementById('totalTime');
 
 let isListVisible = false;
 let progressInterval = null;
+let nextCursor = null; // 추천 서버에 남은 결과 (추가 로딩 시 재검색 없이 사용)
 
 // localStorage에서 음악 리스트 가져오기
 function getMusicListFromCache(emotionId) {
@@ -261,6 +262,8 @@ async function loadInitialMusic() {
       throw new Error(data.message || '음악 추천 실패');
     }
 
+    nextCursor = data.data.nextCursor || null;
+
     // songs 배열 구성
     songs = data.data.musicList.map(music => ({
       videoId: music.videoId,
@@ -304,12 +307,14 @@ async function loadMoreMusic() {
       body: JSON.stringify({
         emotion: currentEmotion,
         excludeVideoIds: excludeVideoIds,
-        count: 30
+        count: 30,
+        cursor: nextCursor
       })
     });
 
     if (response.ok) {
       const data = await response.json();
+      nextCursor = data.data?.nextCursor || null;
 
       if (data.success && data.data.musicList.length > 0) {
         newSongs = data.data.musicList.map(music => ({
@@ -0,0 +1,380 @@
+"""
+추천 서버 벤치마크 (재현 가능한 합성 데이터 + 함수별 / 엔드포인트별 측정)
+
+    python utils/benchmark_recommendation.py --output baseline.json
+    python utils/benchmark_recommendation.py --output after.json --compare baseline.json
+
+- 합성 데이터: 한국어 / 영어 / 일본어가 섞인 YouTube 검색 결과 형태의 후보 음악과 재생 기록
+  (--seed가 같으면 항상 같은 데이터)
+- 마이크로 벤치마크: preprocess_text, detect_language, create_user_profile, cosine_similarity, 후보 벡터화 / 유사도 계산
+- 엔드투엔드: Flask 테스트 클라이언트로 /recommend, /generate-keywords 호출
+  (cold: 매 반복 전에 분석 캐시 비움, warm: 캐시 재사용)
+- 결과는 JSON으로 저장하고, --compare로 이전 결과와 중앙값을 비교해 회귀(기본 10% 이상 느려짐) 표시
+  회귀가 있으면 종료 코드 1
+
+코퍼스 IDF / 프로필 저장소는 임시 디렉터리를 사용하므로 운영 데이터(utils/data)에 영향 없음
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# ========================================
+# 1. 합성 데이터 생성
+# ========================================
+
+EMOTIONS = ['happy', 'love', 'sleep', 'crying', 'angry', 'excited']
+
+# 언어별 제목 / 설명 어휘 (실제 음악 영상 제목에 자주 나오는 단어 위주)
+WORDS = {
+    'ko': ['사랑', '노래', '발라드', '감성', '행복', '슬픈', '이별', '눈물', '밤', '겨울', '봄날', '편지',
+           '너에게', '우리', '기억', '그리움', '추억', '잔잔한', '신나는', '플레이리스트', '모음', '듣기좋은',
+           '카페', '드라이브', '새벽', '혼자', '위로', '설렘', '고백', '라이브', '커버', '노래방'],
+    'en': ['love', 'song', 'ballad', 'happy', 'sad', 'night', 'chill', 'music', 'playlist', 'lofi',
+           'beats', 'relax', 'study', 'sleep', 'dance', 'party', 'summer', 'rain', 'heart', 'dream',
+           'acoustic', 'cover', 'remix', 'live', 'official', 'video', 'lyrics', 'audio', 'mix', 'hits'],
+    'ja': ['恋', '歌', '夜', '悲しい', '涙', '桜', '君', '夢', '空', '雨', 'ラブソング', '音楽', '癒し',
+           '睡眠', 'ピアノ', '作業用', '失恋', '青春', '感動', 'メドレー', 'カバー', '歌ってみた'],
+}
+
+ARTISTS = {
+    'ko': ['아이유', '성시경', '백예린', '잔나비', '폴킴', '헤이즈', '악동뮤지션', '태연', '10cm', '볼빨간사춘기'],
+    'en': ['Taylor Swift', 'Ed Sheeran', 'Adele', 'Coldplay', 'Billie Eilish', 'Lofi Girl', 'The Weeknd'],
+    'ja': ['YOASOBI', 'あいみょん', '米津玄師', 'Official髭男dism', 'King Gnu', 'Aimer', 'LiSA'],
+}
+
+TITLE_TEMPLATES = [
+    '{artist} - {words} [MV]',
+    '{artist} - {words} (Official Music Video)',
+    '[Playlist] {words}',
+    '{words} | {artist}',
+    '{artist}「{words}」Official Video',
+    '{words} 🎵 {words2}',
+    '{artist} {words} Live Clip',
+    '#{tag} {words}',
+]
+
+DEFAULT_LANGUAGE_MIX = {'ko': 0.5, 'en': 0.3, 'ja': 0.2}
+
+
+def pick_language(rng, language_mix):
+    r = rng.random()
+    cumulative = 0
+    for lang, weight in language_mix.items():
+        cumulative += weight
+        if r < cumulative:
+            return lang
+    return lang
+
+
+def random_words(rng, lang, count):
+    """주 언어 단어 위주로, 10% 확률로 다른 언어 단어 섞기"""
+    words = []
+    for _ in range(count):
+        word_lang = lang if rng.random() < 0.9 else rng.choice(list(WORDS))
+        words.append(rng.choice(WORDS[word_lang]))
+    return ' '.join(words)
+
+
+def generate_music(rng, prefix, index, language_mix, description_words=(0, 60)):
+    lang = pick_language(rng, language_mix)
+    artist = rng.choice(ARTISTS[lang])
+    title = rng.choice(TITLE_TEMPLATES).format(
+        artist=artist,
+        words=random_words(rng, lang, rng.randint(1, 4)),
+        words2=random_words(rng, lang, rng.randint(1, 3)),
+        tag=rng.choice(WORDS[lang])
+    )
+    description = random_words(rng, lang, rng.randint(*description_words))
+    if rng.random() < 0.3:
+        description += ' #' + ' #'.join(rng.sample(WORDS[lang], 3))
+
+    return {
+        'videoId': f'{prefix}{index:06d}',
+        'title': title,
+        'description': description,
+        'channelTitle': f'{artist} Official' if rng.random() < 0.5 else artist,
+        'thumbnailUrl': f'https://i.ytimg.com/vi/{prefix}{index:06d}/hqdefault.jpg',
+        'tags': [rng.choice(WORDS[lang]) for _ in range(rng.randint(0, 5))]
+    }
+
+
+def generate_candidates(rng, count, language_mix=DEFAULT_LANGUAGE_MIX):
+    """YouTube 검색 결과 형태의 후보 음악"""
+    return [generate_music(rng, 'c', i, language_mix) for i in range(count)]
+
+
+def generate_history(rng, count, language_mix=DEFAULT_LANGUAGE_MIX, emotions=EMOTIONS):
+    """최신순 재생 기록 (Node의 MusicHistory 형태)"""
+    history = []
+    played_at = datetime(2025, 12, 31, 23, 0, tzinfo=timezone.utc).timestamp()
+    for i in range(count):
+        music = generate_music(rng, 'h', i, language_mix, description_words=(0, 20))
+        played_at -= rng.randint(60, 6 * 3600)
+        music['playedAt'] = datetime.fromtimestamp(played_at, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        music['emotion'] = rng.choice(emotions)
+        history.append(music)
+    return history
+
+
+# ========================================
+# 2. 측정
+# ========================================
+
+def measure(func, repeat, warmup, setup=None):
+    """
+    func을 warmup회 실행한 뒤 repeat회 측정 (setup은 매 반복 전에 실행, 측정 시간에서 제외)
+    반환: 밀리초 단위 통계
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+
+    timings = []
+    gc.collect()
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    return {
+        'repeat': repeat,
+        'minMs': round(timings[0], 4),
+        'medianMs': round(statistics.median(timings), 4),
+        'p95Ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+        'meanMs': round(statistics.fmean(timings), 4),
+        'stdevMs': round(statistics.stdev(timings), 4) if len(timings) > 1 else 0.0
+    }
+
+
+def micro_benchmarks(service, candidates, history):
+    """함수별 벤치마크: (이름, 함수, setup)"""
+    texts = [f"{m['title']} {m['description']} {m['channelTitle']}" for m in candidates]
+    profile = service.create_user_profile(history, top_n=10, corpus=service.corpus_idf)
+    _, candidate_matrix = service.vectorize_candidates(candidates, corpus=service.corpus_idf)
+
+    # cosine_similarity는 딕셔너리 벡터 기준 (후보 하나씩 비교하던 방식)
+    profile_terms = profile.to_dict()
+    idf = service.calculate_idf([{'tokens': service.preprocess_text(text)} for text in texts])
+    candidate_vectors = [
+        service.calculate_tfidf(service.calculate_tf(service.preprocess_text(text)), idf)
+        for text in texts
+    ]
+
+    def preprocess_all():
+        for text in texts:
+            service.preprocess_text(text)
+
+    def detect_all():
+        for text in texts:
+            service.detect_language(text)
+
+    def cosine_all():
+        for vector in candidate_vectors:
+            service.cosine_similarity(profile_terms, vector)
+
+    return [
+        ('preprocess_text', preprocess_all, None),
+        ('detect_language', detect_all, None),
+        ('create_user_profile', lambda: service.create_user_profile(history, top_n=10, corpus=service.corpus_idf),
+         service.analysis_cache.clear),
+        ('cosine_similarity', cosine_all, None),
+        ('vectorize_candidates.cold', lambda: service.vectorize_candidates(candidates, corpus=service.corpus_idf),
+         service.analysis_cache.clear),
+        ('vectorize_candidates.warm', lambda: service.vectorize_candidates(candidates, corpus=service.corpus_idf),
+         None),
+        ('score_candidates', lambda: service.score_candidates(profile, candidate_matrix), None),
+    ]
+
+
+def route_benchmarks(service, client, candidates, history):
+    """엔드투엔드 벤치마크 (Flask 테스트 클라이언트)"""
+    recommend_body = {
+        'userId': 'benchmark-user',
+        'emotion': '',
+        'candidateMusic': candidates,
+        'playedHistory': history
+    }
+    keywords_body = {'emotion': '', 'playedHistory': history}
+
+    def post(path, body):
+        def call():
+            response = client.post(path, json=body)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} → {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return call
+
+    return [
+        ('route./recommend.cold', post('/recommend', recommend_body), service.analysis_cache.clear),
+        ('route./recommend.warm', post('/recommend', recommend_body), None),
+        ('route./generate-keywords', post('/generate-keywords', keywords_body), None),
+    ]
+
+
+def run_benchmarks(args):
+    # 서비스 import 전에 격리된 저장 경로 / 로그 레벨 설정
+    workdir = tempfile.mkdtemp(prefix='recommendation-bench-')
+    os.environ.setdefault('PROFILE_STORE_PATH', os.path.join(workdir, 'profiles.sqlite3'))
+    os.environ.setdefault('CORPUS_IDF_PATH', os.path.join(workdir, 'corpus_idf.json'))
+    os.environ.setdefault('CORPUS_SNAPSHOT_INTERVAL', '0')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import recommendation_service as service
+
+    client = service.app.test_client()
+    results = {}
+
+    for candidate_count in args.candidates:
+        # 크기마다 같은 시드에서 다시 생성 (크기 목록이 달라도 같은 크기의 데이터는 동일)
+        rng = random.Random(f'{args.seed}:{candidate_count}:{args.history}')
+        candidates = generate_candidates(rng, candidate_count, args.language_mix)
+        history = generate_history(rng, args.history, args.language_mix)
+
+        # /generate-keywords의 키워드 섞기(random.shuffle)도 재현 가능하도록
+        random.seed(args.seed)
+
+        benchmarks = micro_benchmarks(service, candidates, history)
+        benchmarks += route_benchmarks(service, client, candidates, history)
+
+        for name, func, setup in benchmarks:
+            if args.filter and args.filter not in name:
+                continue
+            key = f'{name}[candidates={candidate_count}]'
+            results[key] = measure(func, args.repeat, args.warmup, setup)
+            print(f"  {key:<55} median {results[key]['medianMs']:>9.3f}ms  p95 {results[key]['p95Ms']:>9.3f}ms")
+
+    return results
+
+
+# ========================================
+# 3. 결과 저장 / 비교
+# ========================================
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment_info(args):
+    import numpy as np
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'gitCommit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpuCount': os.cpu_count(),
+        'seed': args.seed,
+        'candidates': args.candidates,
+        'history': args.history,
+        'languageMix': args.language_mix,
+        'repeat': args.repeat,
+        'warmup': args.warmup,
+        'idfMode': os.environ.get('IDF_MODE', 'corpus')
+    }
+
+
+def compare_results(baseline, current, threshold):
+    """
+    중앙값 기준 비교
+    반환: [(이름, 이전 ms, 현재 ms, 변화율, 회귀 여부), ...]
+    """
+    rows = []
+    for name, result in current.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        change = (result['medianMs'] - previous['medianMs']) / previous['medianMs'] if previous['medianMs'] else 0.0
+        rows.append((name, previous['medianMs'], result['medianMs'], change, change > threshold))
+    return rows
+
+
+def parse_language_mix(value):
+    """'ko=0.5,en=0.3,ja=0.2' → {'ko': 0.5, 'en': 0.3, 'ja': 0.2} (합이 1이 되도록 정규화)"""
+    mix = {}
+    for part in value.split(','):
+        lang, _, weight = part.partition('=')
+        if lang not in WORDS:
+            raise argparse.ArgumentTypeError(f"지원하지 않는 언어: {lang} (ko / en / ja)")
+        mix[lang] = float(weight)
+    total = sum(mix.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("언어 비율의 합은 0보다 커야 합니다.")
+    return {lang: weight / total for lang, weight in mix.items()}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Music Recommendation System - Benchmark')
+    parser.add_argument('--candidates', type=lambda v: [int(n) for n in v.split(',')], default=[50, 200, 1000],
+                        help='후보 음악 수 목록 (쉼표 구분, 기본 50,200,1000)')
+    parser.add_argument('--history', type=int, default=20, help='재생 기록 수 (기본 20)')
+    parser.add_argument('--language-mix', type=parse_language_mix, default=DEFAULT_LANGUAGE_MIX,
+                        help='언어 비율 (기본 ko=0.5,en=0.3,ja=0.2)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=30, help='측정 반복 횟수 (기본 30)')
+    parser.add_argument('--warmup', type=int, default=3, help='측정 전 예열 횟수 (기본 3)')
+    parser.add_argument('--filter', default='', help='이름에 이 문자열이 포함된 벤치마크만 실행')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    parser.add_argument('--compare', help='비교할 이전 결과 JSON')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='회귀로 판단할 중앙값 증가율 (기본 0.10 = 10%%)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("=" * 60)
+    print("Music Recommendation System - Benchmark")
+    print("=" * 60)
+
+    results = run_benchmarks(args)
+    report = {'environment': environment_info(args), 'results': results}
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.output}")
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    rows = compare_results(baseline['results'], results, args.threshold)
+    regressions = [row for row in rows if row[4]]
+
+    print("=" * 60)
+    print(f"비교: {args.compare} (커밋 {baseline['environment'].get('gitCommit')})")
+    for name, previous_ms, current_ms, change, regressed in rows:
+        flag = 'REGRESSION' if regressed else ''
+        print(f"  {name:<55} {previous_ms:>9.3f}ms → {current_ms:>9.3f}ms  {change:+7.1%} {flag}")
+    print(f"회귀 {len(regressions)}건 (기준 +{args.threshold:.0%})")
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
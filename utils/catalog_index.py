@@ -0,0 +1,586 @@
+"""
+로컬 음악 카탈로그 + 근사 최근접 이웃(ANN) 색인
+서버가 지금까지 본 후보 음악을 모아 두고, 사용자 취향 벡터와 비슷할 가능성이 높은 문서를
+외부 검색 없이 빠르게 찾음 (정확한 점수 계산은 호출 측에서 후보에 대해서만 수행)
+
+색인: SimHash (부호 랜덤 투영 LSH)
+- 단어마다 해시로 ±1 투영 벡터를 만들고 TF-IDF 가중합의 부호로 num_bits 비트 서명 생성 (투영 행렬 저장 없음)
+- 두 서명의 해밍 거리는 두 벡터 사이 각도에 비례 → 코사인 유사도가 높을수록 거리가 작음
+- 서명은 (문서 수 × num_bits/8) uint8 배열 하나에 모아 두고, 조회 시 XOR + popcount로 전체 거리를 한 번에 계산
+  (10만 개 × 256비트 = 3.2MB 스캔)
+
+정확한 검색: 단위 TF-IDF 벡터 역색인 (InvertedIndex - 공유 단어가 있는 문서만 채점, 상한 기반 가지치기)
+
+감정 태그: 문서마다 그 문서를 후보로 받은 요청의 감정을 기록하고, 조회 / 검색에서 emotion으로 걸러냄
+          (카탈로그 검색 자체에는 감정 조건이 없으므로 다른 감정으로 받은 음악이 섞이지 않도록)
+
+스냅샷: load_snapshot으로 연 스냅샷(CatalogSegment, 메모리 매핑)은 읽기 전용 기본 계층,
+        이후 추가한 문서는 메모리 계층 - 조회 / 검색은 두 계층 결과를 합침
+        (기본 계층 문서 제거는 프로세스별 표시만, 다음 save_snapshot / merge_snapshot 때 반영)
+        여러 워커가 같은 파일에 저장할 때는 merge_snapshot - 파일 잠금 안에서 디스크의 최신 스냅샷에 변경분을 합침
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import threading
+from collections import Counter
+
+import numpy as np
+
+from catalog_snapshot import CatalogSegment, write_catalog_snapshot
+from inverted_index import InvertedIndex, vector_norm
+from model_snapshot import SnapshotError, file_lock, file_state
+
+logger = logging.getLogger('recommendation.catalog')
+
+# 바이트별 1 비트 수 (np.bitwise_count가 없는 numpy 1.x용)
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint16)
+
+
+def hamming_distances(signatures, signature):
+    """(n × 바이트) 서명 배열과 서명 하나 사이의 해밍 거리 (n,)"""
+    xor = np.bitwise_xor(signatures, signature)
+    if hasattr(np, 'bitwise_count') and xor.shape[1] % 8 == 0:
+        return np.bitwise_count(xor.view(np.uint64)).sum(axis=1, dtype=np.int32)
+    return POPCOUNT[xor].sum(axis=1, dtype=np.int32)
+
+
+def unit_vector(weights):
+    """{term: weight}를 크기 1로 정규화 (크기가 0이면 그대로)"""
+    magnitude = vector_norm(weights)
+    if magnitude == 0:
+        return weights
+    return {term: weight / magnitude for term, weight in weights.items()}
+
+
+class CatalogIndex:
+    """
+    videoId → 문서 (표시용 메타데이터, 토큰, 언어, 서명 슬롯) + 감정 태그
+    max_size를 넘으면 가장 먼저 추가된 문서부터 제거
+    문서 가중치(서명 / 역색인)는 추가 시점의 코퍼스 IDF로 고정
+    """
+
+    def __init__(self, analyzer, corpus=None, max_size=200000, num_bits=256):
+        """
+        analyzer: music → {'tokens', 'termCounts', 'language'} (analyze_music)
+        corpus: CorpusIDF - 주어지면 서명 계산에 코퍼스 IDF 가중치 사용, 없으면 TF만 사용
+        num_bits: 서명 비트 수 (512 이하의 8의 배수, 클수록 정확하지만 메모리 / 스캔 시간 증가)
+        """
+        if num_bits <= 0 or num_bits % 8 or num_bits > 512:
+            raise ValueError('num_bits는 512 이하의 8의 배수여야 합니다.')
+
+        self.analyzer = analyzer
+        self.corpus = corpus
+        self.max_size = max_size
+        self.num_bits = num_bits
+        self._num_bytes = num_bits // 8
+
+        self.documents = {}   # videoId → 문서 (삽입 순서 = 오래된 순)
+        self._signatures = np.zeros((0, self._num_bytes), dtype=np.uint8)
+        self._slot_ids = []   # 슬롯 → videoId (비어 있으면 None)
+        self._free_slots = []
+        self._slot_emotions = {}  # 감정 → 슬롯별 포함 여부 (조회용, 역색인에는 같은 감정이 태그로 붙음)
+        self.inverted = InvertedIndex()
+
+        # 스냅샷 기본 계층 (없으면 None)
+        self.base = None
+        self._base_alive = np.zeros(0, dtype=bool)
+        self._base_size = 0
+        self._base_evict_next = 0
+        self._base_emotions = {}  # 감정 → 스냅샷 이후 이 프로세스에서 붙인 기본 계층 문서 번호 집합
+        self._removed = set()     # 스냅샷 이후 remove로 제거한 videoId (merge_snapshot에서 디스크 스냅샷에도 반영)
+        self.dirty = False  # 마지막 스냅샷 이후 변경 여부
+
+        self.added = 0
+        self.evicted = 0
+
+        self._lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._indexer_pid = None
+
+    # ----------------------------------------
+    # 서명
+    # ----------------------------------------
+
+    def term_signs(self, terms):
+        """단어별 ±1 투영 벡터 (len(terms) × num_bits) - 같은 단어는 항상 같은 벡터"""
+        buffer = b''.join(
+            hashlib.blake2b(term.encode('utf-8'), digest_size=self._num_bytes).digest()
+            for term in terms
+        )
+        bits = np.unpackbits(np.frombuffer(buffer, dtype=np.uint8).reshape(len(terms), self._num_bytes), axis=1)
+        return bits.astype(np.float32) * 2 - 1
+
+    def signature(self, weights):
+        """{term: weight} → 패킹된 서명 (num_bits/8 바이트)"""
+        if not weights:
+            return np.zeros(self._num_bytes, dtype=np.uint8)
+        values = np.fromiter(weights.values(), dtype=np.float32, count=len(weights))
+        return np.packbits((values @ self.term_signs(list(weights))) > 0)
+
+    def document_weights(self, term_counts, total_terms):
+        """문서 가중치 (calculate_tfidf와 같은 TF × 코퍼스 IDF)"""
+        if self.corpus is not None:
+            idf = self.corpus.idf_map(term_counts)
+            return {term: count / total_terms * idf[term] for term, count in term_counts.items()}
+        return {term: count / total_terms for term, count in term_counts.items()}
+
+    # ----------------------------------------
+    # 추가 / 제거
+    # ----------------------------------------
+
+    def add(self, music_list, emotion=None):
+        """
+        음악 목록을 카탈로그에 추가 (videoId가 없거나 이미 있는 음악, 토큰이 없는 음악은 건너뜀)
+        emotion: 음악 목록을 받은 요청의 감정 - 새 문서와 이미 있는 문서 모두에 태그로 추가
+        반환: 새로 추가한 문서 수
+        """
+        documents = []
+        existing = []
+        seen = set()
+        for music in music_list:
+            video_id = music.get('videoId')
+            if not video_id or video_id in seen:
+                continue
+            if self.contains(video_id):
+                existing.append(video_id)
+                continue
+
+            analysis = self.analyzer(music)
+            if not analysis['tokens']:
+                continue
+
+            seen.add(video_id)
+            weights = self.document_weights(analysis['termCounts'], len(analysis['tokens']))
+            documents.append({
+                'videoId': video_id,
+                'music': {
+                    'videoId': video_id,
+                    'title': music.get('title', ''),
+                    'channelTitle': music.get('channelTitle', ''),
+                    'thumbnailUrl': music.get('thumbnailUrl', ''),
+                    'duration': music.get('duration', 0)
+                },
+                'tokens': analysis['tokens'],
+                'language': analysis['language'],
+                'signature': self.signature(weights),
+                'weights': weights
+            })
+
+        added = 0
+        with self._lock:
+            for doc in documents:
+                if doc['videoId'] in self.documents:
+                    continue
+                slot = self._allocate_slot_locked()
+                self._signatures[slot] = doc.pop('signature')
+                self._slot_ids[slot] = doc['videoId']
+                doc['slot'] = slot
+                self.inverted.add(
+                    doc['videoId'], unit_vector(doc.pop('weights')), doc['language'], tags=[emotion] if emotion else ()
+                )
+                if emotion:
+                    self._slot_emotion_mask(emotion)[slot] = True
+                self.documents[doc['videoId']] = doc
+                self._removed.discard(doc['videoId'])
+                added += 1
+
+            if emotion:
+                for video_id in existing:
+                    self.dirty = self._tag_locked(video_id, emotion) or self.dirty
+
+            while len(self) > self.max_size:
+                self._evict_oldest_locked()
+                self.evicted += 1
+
+            self.added += added
+            self.dirty = self.dirty or added > 0
+
+        return added
+
+    def _tag_locked(self, video_id, emotion):
+        """이미 있는 문서에 감정 태그 추가 (새로 붙였으면 True)"""
+        doc = self.documents.get(video_id)
+        if doc is not None:
+            mask = self._slot_emotion_mask(emotion)
+            if mask[doc['slot']]:
+                return False
+            mask[doc['slot']] = True
+            self.inverted.tag(video_id, emotion)
+            return True
+
+        index = self._base_index(video_id)
+        if index < 0 or self.base.emotion_mask(emotion)[index]:
+            return False
+        tagged = self._base_emotions.setdefault(emotion, set())
+        if index in tagged:
+            return False
+        tagged.add(index)
+        return True
+
+    def _slot_emotion_mask(self, emotion):
+        mask = self._slot_emotions.get(emotion)
+        if mask is None:
+            mask = self._slot_emotions[emotion] = np.zeros(len(self._signatures), dtype=bool)
+        return mask
+
+    def contains(self, video_id):
+        """카탈로그에 있는지 (메모리 계층 또는 제거되지 않은 기본 계층 문서)"""
+        if video_id in self.documents:
+            return True
+        return self._base_index(video_id) >= 0
+
+    def _base_index(self, video_id):
+        """기본 계층 문서 번호 (없거나 제거됐으면 -1)"""
+        if self.base is None:
+            return -1
+        index = self.base.find(video_id)
+        return index if index >= 0 and self._base_alive[index] else -1
+
+    def _evict_oldest_locked(self):
+        # 기본 계층 문서가 메모리 계층 문서보다 오래됨
+        while self._base_evict_next < len(self._base_alive) and not self._base_alive[self._base_evict_next]:
+            self._base_evict_next += 1
+        if self._base_evict_next < len(self._base_alive):
+            self._remove_base_locked(self._base_evict_next)
+        else:
+            self._remove_locked(next(iter(self.documents)))
+
+    def _remove_base_locked(self, index):
+        self._base_alive[index] = False
+        self._base_size -= 1
+        self.dirty = True
+
+    def _allocate_slot_locked(self):
+        if self._free_slots:
+            return self._free_slots.pop()
+
+        slot = len(self._slot_ids)
+        if slot == len(self._signatures):
+            # 용량을 두 배씩 늘림 (추가할 때마다 배열을 다시 만들지 않도록)
+            signatures = np.zeros((max(1024, slot * 2), self._num_bytes), dtype=np.uint8)
+            signatures[:slot] = self._signatures
+            self._signatures = signatures
+            for emotion, mask in self._slot_emotions.items():
+                self._slot_emotions[emotion] = np.concatenate([mask, np.zeros(len(signatures) - len(mask), dtype=bool)])
+        self._slot_ids.append(None)
+        return slot
+
+    def remove(self, video_id):
+        """카탈로그에서 제거 (없으면 False)"""
+        with self._lock:
+            if video_id in self.documents:
+                self._remove_locked(video_id)
+            elif self._base_index(video_id) >= 0:
+                self._remove_base_locked(self._base_index(video_id))
+            else:
+                return False
+            self._removed.add(video_id)
+            return True
+
+    def _remove_locked(self, video_id):
+        doc = self.documents.pop(video_id)
+        self._slot_ids[doc['slot']] = None
+        self._free_slots.append(doc['slot'])
+        for mask in self._slot_emotions.values():
+            mask[doc['slot']] = False
+        self.inverted.remove(video_id)
+        self.dirty = True
+
+    # ----------------------------------------
+    # 백그라운드 색인
+    # ----------------------------------------
+
+    def enqueue(self, music_list, emotion=None):
+        """
+        요청 처리 경로에서 호출 - 분석 / 색인은 백그라운드 스레드에서 처리
+        (프로세스마다 한 번 스레드 시작, fork 이후 워커에서도 다시 시작)
+        emotion: 음악 목록을 받은 요청의 감정 (add 참고)
+        """
+        if not music_list:
+            return
+        if self._indexer_pid != os.getpid():
+            self._start_indexer()
+        self._queue.put((list(music_list), emotion))
+
+    def _start_indexer(self):
+        with self._lock:
+            if self._indexer_pid == os.getpid():
+                return
+            self._queue = queue.SimpleQueue()  # fork 이전 프로세스의 대기 작업은 버림
+            self._indexer_pid = os.getpid()
+
+        thread = threading.Thread(target=self._index_loop, name='catalog-indexer', daemon=True)
+        thread.start()
+
+    def _index_loop(self):
+        while True:
+            music_list, emotion = self._queue.get()
+            try:
+                self.add(music_list, emotion)
+            except Exception as e:
+                logger.warning("[Catalog] 색인 실패: %s", e)
+
+    # ----------------------------------------
+    # 조회
+    # ----------------------------------------
+
+    def query(self, weights, limit=2000, exclude=(), emotion=None):
+        """
+        취향 벡터와 서명 해밍 거리가 가까운 문서 최대 limit개 (가까운 순)
+        exclude: 제외할 videoId 집합
+        emotion: 주어지면 이 감정 태그가 붙은 문서만
+        """
+        if not weights:
+            return []
+
+        signature = self.signature(weights)
+
+        with self._lock:
+            base_alive = self._base_alive_excluding(exclude, emotion)
+            excluded = [self.documents[video_id]['slot'] for video_id in exclude if video_id in self.documents]
+
+            # 기본 계층 거리 뒤에 메모리 계층 거리 (거리가 같으면 기본 계층 = 오래된 문서 먼저)
+            used = len(self._slot_ids)
+            distances = hamming_distances(self._signatures[:used], signature)
+            if self._free_slots:
+                distances[self._free_slots] = self.num_bits + 1  # 빈 슬롯 / 제외 문서는 가장 먼 거리로
+            if excluded:
+                distances[excluded] = self.num_bits + 1
+            if emotion is not None:
+                tagged = self._slot_emotions.get(emotion)
+                if tagged is None:
+                    distances[:] = self.num_bits + 1
+                else:
+                    distances[~tagged[:used]] = self.num_bits + 1
+            if self.base is not None:
+                base_distances = hamming_distances(self.base.signatures, signature)
+                base_distances[~base_alive] = self.num_bits + 1
+                distances = np.concatenate([base_distances, distances])
+
+            count = min(limit, int(np.count_nonzero(distances <= self.num_bits)))
+            if count <= 0:
+                return []
+
+            if count < len(distances):
+                nearest = np.argpartition(distances, count - 1)[:count]
+            else:
+                nearest = np.arange(len(distances))
+            nearest = nearest[np.lexsort((nearest, distances[nearest]))][:count]
+
+            base_count = len(self._base_alive)
+            return [
+                self.base.document(position) if position < base_count
+                else self.documents[self._slot_ids[position - base_count]]
+                for position in nearest.tolist()
+            ]
+
+    def _base_alive_excluding(self, exclude, emotion=None):
+        """기본 계층 사용 여부 배열 (exclude 문서 제외, emotion이 주어지면 그 감정 문서만, 복사본)"""
+        alive = self._base_alive.copy()
+        if self.base is not None:
+            for video_id in exclude:
+                index = self.base.find(video_id)
+                if index >= 0:
+                    alive[index] = False
+            if emotion is not None:
+                tagged = self.base.emotion_mask(emotion).copy()
+                tagged[list(self._base_emotions.get(emotion, ()))] = True
+                alive &= tagged
+        return alive
+
+    def emotions(self, video_id):
+        """문서의 감정 태그 목록 (없는 문서면 빈 목록)"""
+        with self._lock:
+            if video_id in self.documents:
+                return sorted(self.inverted.tags(video_id))
+            index = self._base_index(video_id)
+            if index < 0:
+                return []
+            return self._base_document_emotions(index)
+
+    def _base_document_emotions(self, index):
+        emotions = set(self.base.document_emotions(index))
+        emotions.update(emotion for emotion, tagged in self._base_emotions.items() if index in tagged)
+        return sorted(emotions)
+
+    def search(self, weights, k, language_boost=None, exclude=(), emotion=None):
+        """
+        정확한 top-K: 코사인 유사도 × 언어별 배수 상위 k개 [(문서, 점수), ...] (점수 내림차순)
+        취향 벡터와 공유 단어가 없는 문서는 방문하지 않음
+        language_boost: {language: 점수 배수}
+        exclude: 제외할 videoId 집합
+        emotion: 주어지면 이 감정 태그가 붙은 문서만
+        """
+        if not weights:
+            return []
+
+        with self._lock:
+            results = [
+                (-score, 1, rank, self.documents[video_id])
+                for rank, (video_id, score) in enumerate(
+                    self.inverted.search(weights, k, group_boost=language_boost, exclude=exclude, tag=emotion)
+                )
+            ]
+            if self._base_size:
+                indices, scores = self.base.search(
+                    weights, k, language_boost or {}, self._base_alive_excluding(exclude, emotion), vector_norm(weights)
+                )
+                results.extend((-score, 0, index, index) for index, score in zip(indices.tolist(), scores.tolist()))
+
+        # 두 계층 결과 병합 (점수가 같으면 기본 계층 = 오래된 문서 먼저)
+        results.sort(key=lambda item: item[:3])
+        return [
+            (self.base.document(doc) if layer == 0 else doc, -negative_score)
+            for negative_score, layer, _, doc in results[:k]
+        ]
+
+    # ----------------------------------------
+    # 스냅샷
+    # ----------------------------------------
+
+    def load_snapshot(self, path):
+        """
+        스냅샷을 기본 계층으로 연결 (메모리 매핑 - 다시 계산하지 않음, 문서를 추가하기 전에 호출)
+        예외: SnapshotError (형식 / 버전 / 서명 비트 수가 다름)
+        """
+        segment = CatalogSegment(path)
+        if segment.num_bits != self.num_bits:
+            raise SnapshotError(f"서명 비트 수가 다릅니다: {segment.num_bits} (설정: {self.num_bits})")
+
+        with self._lock:
+            if self.documents or self.base is not None:
+                raise ValueError('스냅샷은 빈 카탈로그에만 연결할 수 있습니다.')
+            self.base = segment
+            self._base_alive = np.ones(segment.num_docs, dtype=bool)
+            self._base_size = segment.num_docs
+            self._base_evict_next = 0
+            while len(self) > self.max_size:
+                self._evict_oldest_locked()
+            self.dirty = False
+
+    def save_snapshot(self, path):
+        """
+        현재 카탈로그(기본 계층 + 메모리 계층)를 스냅샷으로 저장 (추가 순서 유지)
+        path에 다른 프로세스가 저장한 내용은 덮어씀 - 오프라인 빌드용, 서버 워커는 merge_snapshot
+        반환: 파일 크기(바이트)
+        """
+        with self._lock:
+            records = []
+            if self.base is not None:
+                indices = np.flatnonzero(self._base_alive).tolist()
+                records.extend(self.base.records(indices))
+                if self._base_emotions:
+                    for index, record in zip(indices, records):
+                        record['emotions'] = self._base_document_emotions(index)
+            records.extend(self._memory_records_locked())
+
+            size = self._write_locked(path, records)
+
+        logger.info("[Catalog] 스냅샷 저장: %s (%d개)", path, len(records))
+        return size
+
+    def merge_snapshot(self, path):
+        """
+        이 프로세스의 변경분을 path의 최신 스냅샷에 합쳐 저장 (파일 잠금 안에서 읽기-합치기-쓰기)
+        여러 워커가 종료하면서 같은 파일에 저장해도 먼저 저장한 워커가 합친 문서를 잃지 않음
+        - 디스크 스냅샷 문서 뒤에 이 프로세스에서 추가한 문서(디스크에 없는 문서)를 추가 순서대로 붙임
+        - 감정 태그는 합집합, remove로 제거한 문서는 제외
+        - max_size를 넘으면 오래된 문서부터 제외 (용량 때문에 이 프로세스에서 제거한 문서도 같은 규칙으로 빠짐)
+        예외: SnapshotError (디스크 스냅샷의 형식 / 서명 비트 수가 다름)
+        반환: 파일 크기(바이트)
+        """
+        with file_lock(path), self._lock:
+            disk = self._disk_segment_locked(path)
+            records = disk.records(range(disk.num_docs)) if disk is not None else []
+            positions = {record['videoId']: position for position, record in enumerate(records)}
+
+            # 이 프로세스에서 기본 계층 문서에 붙인 감정 태그
+            for emotion, indices in self._base_emotions.items():
+                for index in indices:
+                    position = positions.get(self.base.video_ids[index])
+                    if position is not None:
+                        records[position]['emotions'] = sorted(set(records[position]['emotions']) | {emotion})
+
+            for record in self._memory_records_locked():
+                position = positions.get(record['videoId'])
+                if position is None:
+                    positions[record['videoId']] = len(records)
+                    records.append(record)
+                else:
+                    merged = set(records[position]['emotions']) | set(record['emotions'])
+                    records[position]['emotions'] = sorted(merged)
+
+            if self._removed:
+                records = [record for record in records if record['videoId'] not in self._removed]
+            if self.max_size and len(records) > self.max_size:
+                records = records[len(records) - self.max_size:]
+
+            size = self._write_locked(path, records)
+            self._removed.clear()
+
+        logger.info("[Catalog] 스냅샷 병합 저장: %s (%d개)", path, len(records))
+        return size
+
+    def _disk_segment_locked(self, path):
+        """path의 현재 스냅샷 (연결한 기본 계층과 같은 파일이면 그대로 사용, 파일이 없으면 None)"""
+        state = file_state(path)
+        if state is None:
+            return None
+        if self.base is not None and self.base.snapshot.file_state == state:
+            return self.base
+
+        segment = CatalogSegment(path)
+        if segment.num_bits != self.num_bits:
+            raise SnapshotError(f"서명 비트 수가 다릅니다: {segment.num_bits} (설정: {self.num_bits})")
+        return segment
+
+    def _memory_records_locked(self):
+        """메모리 계층 문서 → write_catalog_snapshot 입력 형식 (추가 순서)"""
+        weights = {}
+        for term, video_ids, values in self.inverted.export():
+            for video_id, weight in zip(video_ids, values.tolist()):
+                weights.setdefault(video_id, {})[term] = weight
+
+        records = []
+        for video_id, doc in self.documents.items():
+            counts = Counter(doc['tokens'])
+            doc_weights = weights.get(video_id, {})
+            terms = [term for term in counts if term in doc_weights]
+            records.append({
+                'videoId': video_id,
+                'music': doc['music'],
+                'language': doc['language'],
+                'signature': self._signatures[doc['slot']],
+                'terms': terms,
+                'counts': [counts[term] for term in terms],
+                'weights': [doc_weights[term] for term in terms],
+                'emotions': self.inverted.tags(video_id)
+            })
+        return records
+
+    def _write_locked(self, path, records):
+        size = write_catalog_snapshot(path, records, self.num_bits, meta={
+            'idf': 'corpus' if self.corpus is not None else 'tf',
+            'corpusDocuments': self.corpus.num_docs if self.corpus is not None else None
+        })
+        self.dirty = False
+        return size
+
+    def __len__(self):
+        return len(self.documents) + self._base_size
+
+    def stats(self):
+        """카탈로그 통계 (/health 응답용)"""
+        return {
+            'size': len(self),
+            'memorySize': len(self.documents),
+            'snapshot': dict(self.base.info(), liveDocuments=self._base_size) if self.base is not None else None,
+            'maxSize': self.max_size,
+            'signatureBits': self.num_bits,
+            'inverted': self.inverted.stats(),
+            'added': self.added,
+            'evicted': self.evicted
+        }
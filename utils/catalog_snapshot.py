@@ -0,0 +1,438 @@
+"""
+카탈로그 스냅샷 (메모리 매핑 읽기 전용 세그먼트) + 빌드 / 점검 도구
+
+스냅샷 배열 (model_snapshot 형식, kind='catalog')
+- vocab_blob / vocab_offsets        : 단어 목록 (바이트 순 정렬 → 단어 ID = 위치, 이분 탐색으로 조회)
+- posting_offsets / posting_docs / posting_weights / max_weights
+                                     : 단어 ID별 포스팅 (문서 번호, 단위 TF-IDF 가중치) + 단어별 가중치 상한
+- doc_term_offsets / doc_terms / doc_term_counts / doc_weights
+                                     : 문서별 단어 ID, 등장 횟수, 가중치 (토큰 복원 / 다시 저장할 때 사용)
+- doc_languages, signatures          : 언어 코드(meta.languages 인덱스), SimHash 서명
+- doc_emotion_offsets / doc_emotions : 문서별 감정 코드(meta.emotions 인덱스) - 그 감정의 검색 결과로 받은 문서
+                                       (없는 이전 스냅샷은 모든 문서의 감정이 비어 있는 것으로 읽음)
+- video_id_blob / video_id_offsets / video_id_order, music_blob / music_offsets
+                                     : videoId (정렬 순서로 이분 탐색), 표시용 메타데이터 JSON
+문서 번호 = 카탈로그 추가 순서 (오래된 순)
+
+    python utils/catalog_snapshot.py build --input music.ndjson --out utils/data/catalog.snapshot
+    python utils/catalog_snapshot.py build --base utils/data/catalog.snapshot --input new.json --out utils/data/catalog.snapshot
+    python utils/catalog_snapshot.py build --input music.ndjson --out catalog.snapshot --corpus-out corpus_idf.build.json
+    python utils/rebuild_profiles.py corpus-install corpus_idf.build.json   (빌드한 코퍼스를 서버 파일로 교체할 때만)
+    python utils/catalog_snapshot.py verify utils/data/catalog.snapshot
+    python utils/catalog_snapshot.py info utils/data/catalog.snapshot
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from inverted_index import pruned_top_k
+from model_snapshot import Snapshot, SnapshotError, StringTable, pack_strings, write_snapshot
+
+SNAPSHOT_KIND = 'catalog'
+
+
+# ========================================
+# 1. 저장
+# ========================================
+
+def write_catalog_snapshot(path, records, num_bits, meta=None):
+    """
+    카탈로그 문서 목록을 스냅샷으로 저장
+    records: 추가 순서대로 [{'videoId', 'music', 'language', 'signature', 'terms', 'counts', 'weights', 'emotions'}, ...]
+             (terms / counts / weights는 같은 길이의 목록, weights는 단위 벡터 가중치, emotions는 생략 가능)
+    반환: 파일 크기(바이트)
+    """
+    num_docs = len(records)
+    vocabulary = sorted({term for record in records for term in record['terms']})  # 코드 포인트 순 = UTF-8 바이트 순
+    term_ids = {term: index for index, term in enumerate(vocabulary)}
+    languages = sorted({record['language'] for record in records})
+    language_codes = {language: code for code, language in enumerate(languages)}
+    emotions = sorted({emotion for record in records for emotion in record.get('emotions', ())})
+    emotion_codes = {emotion: code for code, emotion in enumerate(emotions)}
+
+    # 문서별 (단어 ID 오름차순) 단어 / 횟수 / 가중치
+    doc_lengths = np.fromiter((len(record['terms']) for record in records), dtype=np.int64, count=num_docs)
+    doc_term_offsets = np.zeros(num_docs + 1, dtype=np.int64)
+    np.cumsum(doc_lengths, out=doc_term_offsets[1:])
+    total = int(doc_term_offsets[-1])
+
+    doc_terms = np.fromiter(
+        (term_ids[term] for record in records for term in record['terms']), dtype=np.int32, count=total
+    )
+    doc_term_counts = np.fromiter(
+        (count for record in records for count in record['counts']), dtype=np.int32, count=total
+    )
+    doc_weights = np.fromiter(
+        (weight for record in records for weight in record['weights']), dtype=np.float64, count=total
+    )
+    doc_of = np.repeat(np.arange(num_docs, dtype=np.int32), doc_lengths)
+
+    order = np.lexsort((doc_terms, doc_of))
+    doc_terms, doc_term_counts, doc_weights = doc_terms[order], doc_term_counts[order], doc_weights[order]
+
+    # 단어별 포스팅 (문서 번호 오름차순)
+    posting_order = np.lexsort((doc_of, doc_terms))
+    posting_docs = doc_of[posting_order]
+    posting_weights = doc_weights[posting_order]
+    posting_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(doc_terms, minlength=len(vocabulary)), out=posting_offsets[1:])
+    if len(vocabulary):
+        max_weights = np.maximum.reduceat(posting_weights, posting_offsets[:-1])
+    else:
+        max_weights = np.zeros(0, dtype=np.float64)
+
+    video_ids = [record['videoId'] for record in records]
+    video_id_blob, video_id_offsets = pack_strings(video_ids)
+    video_id_order = np.array(sorted(range(num_docs), key=video_ids.__getitem__), dtype=np.int32)
+    music_blob, music_offsets = pack_strings([json.dumps(record['music'], ensure_ascii=False) for record in records])
+    vocab_blob, vocab_offsets = pack_strings(vocabulary)
+
+    signatures = np.zeros((num_docs, num_bits // 8), dtype=np.uint8)
+    for index, record in enumerate(records):
+        signatures[index] = record['signature']
+
+    doc_emotion_offsets = np.zeros(num_docs + 1, dtype=np.int64)
+    np.cumsum([len(record.get('emotions', ())) for record in records], out=doc_emotion_offsets[1:])
+    doc_emotions = np.fromiter(
+        (emotion_codes[emotion] for record in records for emotion in sorted(record.get('emotions', ()))),
+        dtype=np.int16, count=int(doc_emotion_offsets[-1])
+    )
+
+    arrays = {
+        'vocab_blob': vocab_blob,
+        'vocab_offsets': vocab_offsets,
+        'posting_offsets': posting_offsets,
+        'posting_docs': posting_docs,
+        'posting_weights': posting_weights,
+        'max_weights': max_weights,
+        'doc_term_offsets': doc_term_offsets,
+        'doc_terms': doc_terms,
+        'doc_term_counts': doc_term_counts,
+        'doc_weights': doc_weights,
+        'doc_languages': np.fromiter((language_codes[record['language']] for record in records), dtype=np.int16, count=num_docs),
+        'signatures': signatures,
+        'doc_emotion_offsets': doc_emotion_offsets,
+        'doc_emotions': doc_emotions,
+        'video_id_blob': video_id_blob,
+        'video_id_offsets': video_id_offsets,
+        'video_id_order': video_id_order,
+        'music_blob': music_blob,
+        'music_offsets': music_offsets
+    }
+    meta = dict(
+        meta or {},
+        numDocs=num_docs, numTerms=len(vocabulary), signatureBits=num_bits, languages=languages, emotions=emotions
+    )
+    return write_snapshot(path, SNAPSHOT_KIND, arrays, meta)
+
+
+# ========================================
+# 2. 읽기 전용 세그먼트
+# ========================================
+
+class CatalogSegment:
+    """
+    메모리 매핑된 카탈로그 스냅샷 (읽기 전용)
+    문서 번호 기준으로 조회 / 검색하고, 제거 여부(alive)는 호출 측(CatalogIndex)이 프로세스별로 관리
+    """
+
+    def __init__(self, path):
+        self.snapshot = Snapshot(path, kind=SNAPSHOT_KIND)
+        arrays = self.snapshot.arrays
+        meta = self.snapshot.meta
+
+        self.num_docs = meta['numDocs']
+        self.num_bits = meta['signatureBits']
+        self.languages = meta['languages']
+
+        self.vocabulary = StringTable(arrays['vocab_blob'], arrays['vocab_offsets'])
+        self.video_ids = StringTable(arrays['video_id_blob'], arrays['video_id_offsets'], arrays['video_id_order'])
+        self.music = StringTable(arrays['music_blob'], arrays['music_offsets'])
+
+        self.posting_offsets = arrays['posting_offsets']
+        self.posting_docs = arrays['posting_docs']
+        self.posting_weights = arrays['posting_weights']
+        self.max_weights = arrays['max_weights']
+        self.doc_term_offsets = arrays['doc_term_offsets']
+        self.doc_terms = arrays['doc_terms']
+        self.doc_term_counts = arrays['doc_term_counts']
+        self.doc_weights = arrays['doc_weights']
+        self.doc_languages = arrays['doc_languages']
+        self.signatures = arrays['signatures']
+
+        self.emotions = meta.get('emotions', [])
+        self.doc_emotion_offsets = arrays.get('doc_emotion_offsets', np.zeros(self.num_docs + 1, dtype=np.int64))
+        self.doc_emotions = arrays.get('doc_emotions', np.zeros(0, dtype=np.int16))
+        self._emotion_masks = {}
+
+    def find(self, video_id):
+        """videoId의 문서 번호 (없으면 -1)"""
+        return self.video_ids.find(video_id)
+
+    def term_entries(self, index, vocabulary=None):
+        """
+        문서의 (단어 목록, 등장 횟수 목록, 가중치 목록)
+        vocabulary: 디코딩해 둔 단어 목록 (문서를 많이 읽을 때 사용, 없으면 단어마다 디코딩)
+        """
+        start, end = self.doc_term_offsets[index], self.doc_term_offsets[index + 1]
+        term_ids = self.doc_terms[start:end].tolist()
+        if vocabulary is None:
+            terms = [self.vocabulary[term_id] for term_id in term_ids]
+        else:
+            terms = [vocabulary[term_id] for term_id in term_ids]
+        return terms, self.doc_term_counts[start:end].tolist(), self.doc_weights[start:end].tolist()
+
+    def emotion_mask(self, emotion):
+        """문서 번호별 감정 포함 여부 (감정별로 한 번 계산해 보관, 읽기 전용)"""
+        mask = self._emotion_masks.get(emotion)
+        if mask is None:
+            mask = np.zeros(self.num_docs, dtype=bool)
+            if emotion in self.emotions:
+                positions = np.flatnonzero(self.doc_emotions == self.emotions.index(emotion))
+                mask[np.searchsorted(self.doc_emotion_offsets, positions, side='right') - 1] = True
+            mask.flags.writeable = False
+            self._emotion_masks[emotion] = mask
+        return mask
+
+    def document_emotions(self, index):
+        """문서의 감정 목록"""
+        start, end = self.doc_emotion_offsets[index], self.doc_emotion_offsets[index + 1]
+        return [self.emotions[code] for code in self.doc_emotions[start:end].tolist()]
+
+    def document(self, index):
+        """문서 번호 → CatalogIndex 문서 형식 (토큰은 단어별 등장 횟수로 복원 - 순서는 다르지만 TF-IDF는 같음)"""
+        terms, counts, _ = self.term_entries(index)
+        return {
+            'videoId': self.video_ids[index],
+            'music': json.loads(self.music[index]),
+            'tokens': [term for term, count in zip(terms, counts) for _ in range(count)],
+            'language': self.languages[self.doc_languages[index]]
+        }
+
+    def records(self, indices):
+        """문서 번호 목록 → write_catalog_snapshot 입력 형식 (다시 저장할 때 사용)"""
+        vocabulary = [self.vocabulary[term_id] for term_id in range(len(self.vocabulary))]
+        return [self.record(index, vocabulary) for index in indices]
+
+    def record(self, index, vocabulary=None):
+        terms, counts, weights = self.term_entries(index, vocabulary)
+        return {
+            'videoId': self.video_ids[index],
+            'music': json.loads(self.music[index]),
+            'language': self.languages[self.doc_languages[index]],
+            'signature': self.signatures[index],
+            'terms': terms,
+            'counts': counts,
+            'weights': weights,
+            'emotions': self.document_emotions(index)
+        }
+
+    def search(self, query, k, language_boost, alive, query_norm):
+        """
+        정확한 top-K (InvertedIndex.search와 같은 점수 / 가지치기)
+        alive: 문서 번호별 사용 여부 (제거 / 제외 문서는 False)
+        반환: (문서 번호 배열, 점수 배열)
+        """
+        boost_table = np.array([language_boost.get(language, 1.0) for language in self.languages] or [1.0])
+        multipliers = boost_table[self.doc_languages] * alive
+
+        term_postings = []
+        for term, weight in query.items():
+            term_id = self.vocabulary.find(term) if weight > 0 else -1
+            if term_id < 0:
+                continue
+            start, end = self.posting_offsets[term_id], self.posting_offsets[term_id + 1]
+            term_postings.append((
+                weight * float(self.max_weights[term_id]),
+                weight,
+                self.posting_docs[start:end],
+                self.posting_weights[start:end]
+            ))
+
+        return pruned_top_k(term_postings, multipliers, k, query_norm)
+
+    def info(self):
+        return self.snapshot.info()
+
+
+# ========================================
+# 3. 점검
+# ========================================
+
+def check_catalog_snapshot(path):
+    """
+    스냅샷 전체 점검 (체크섬 + 배열 간 일관성)
+    반환: 문제 목록 (비어 있으면 정상)
+    """
+    try:
+        segment = CatalogSegment(path)
+    except (OSError, SnapshotError, KeyError) as e:
+        return [f"열 수 없음: {e}"]
+
+    problems = [f"체크섬 불일치: {name}" for name in segment.snapshot.verify()]
+
+    num_docs = segment.num_docs
+    num_terms = len(segment.vocabulary)
+
+    def check_offsets(name, offsets, length, total):
+        if len(offsets) != length + 1 or offsets[0] != 0 or offsets[-1] != total or np.any(np.diff(offsets) < 0):
+            problems.append(f"오프셋 오류: {name}")
+
+    check_offsets('posting_offsets', segment.posting_offsets, num_terms, len(segment.posting_docs))
+    check_offsets('doc_term_offsets', segment.doc_term_offsets, num_docs, len(segment.doc_terms))
+    check_offsets('video_id_offsets', segment.video_ids.offsets, num_docs, len(segment.video_ids.blob))
+    check_offsets('music_offsets', segment.music.offsets, num_docs, len(segment.music.blob))
+    check_offsets('doc_emotion_offsets', segment.doc_emotion_offsets, num_docs, len(segment.doc_emotions))
+
+    if len(segment.posting_docs) != len(segment.doc_terms):
+        problems.append("포스팅 수와 문서 단어 수가 다름")
+    if len(segment.posting_docs) and (segment.posting_docs.min() < 0 or segment.posting_docs.max() >= num_docs):
+        problems.append("포스팅 문서 번호 범위 오류")
+    if len(segment.doc_terms) and (segment.doc_terms.min() < 0 or segment.doc_terms.max() >= num_terms):
+        problems.append("문서 단어 ID 범위 오류")
+    if segment.signatures.shape != (num_docs, segment.num_bits // 8):
+        problems.append("서명 배열 크기 오류")
+    if len(segment.doc_languages) and segment.doc_languages.max() >= len(segment.languages):
+        problems.append("언어 코드 범위 오류")
+    if len(segment.doc_emotions) and (segment.doc_emotions.min() < 0 or segment.doc_emotions.max() >= len(segment.emotions)):
+        problems.append("감정 코드 범위 오류")
+
+    if not problems:
+        # 단어 / videoId 정렬, 포스팅 정렬, 상한
+        terms = [segment.vocabulary.raw(index) for index in range(num_terms)]
+        if any(a >= b for a, b in zip(terms, terms[1:])):
+            problems.append("단어 목록이 정렬되어 있지 않거나 중복됨")
+        ids = [segment.video_ids.raw(int(index)) for index in segment.video_ids.order]
+        if any(a >= b for a, b in zip(ids, ids[1:])):
+            problems.append("videoId 정렬 순서 오류 또는 중복")
+        for term_id in range(num_terms):
+            start, end = segment.posting_offsets[term_id], segment.posting_offsets[term_id + 1]
+            docs = segment.posting_docs[start:end]
+            if end == start or np.any(np.diff(docs) <= 0):
+                problems.append(f"포스팅 정렬 오류: {segment.vocabulary[term_id]}")
+                break
+            if segment.posting_weights[start:end].max() > segment.max_weights[term_id]:
+                problems.append(f"가중치 상한 오류: {segment.vocabulary[term_id]}")
+                break
+
+    return problems
+
+
+# ========================================
+# 4. 빌드 / 점검 도구
+# ========================================
+
+def read_music_file(path):
+    """JSON 배열 또는 NDJSON(한 줄에 음악 하나) 파일 읽기"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def build_command(args):
+    import recommendation_service
+    from catalog_index import CatalogIndex
+
+    # 서버 코퍼스 파일은 읽기만 하고 빌드에서 집계한 문서는 메모리 사본에만 반영 (--corpus-out으로 내보냄)
+    live_corpus = recommendation_service.corpus_idf
+    corpus = live_corpus.offline_copy() if live_corpus is not None else None
+    catalog = CatalogIndex(
+        analyzer=lambda music: recommendation_service.analyze_music(music, include_tags=True),
+        corpus=corpus,
+        max_size=args.max_size,
+        num_bits=args.signature_bits
+    )
+    if args.base:
+        catalog.load_snapshot(args.base)
+        print(f"기존 스냅샷: {len(catalog)}개 ({args.base})")
+
+    started = time.perf_counter()
+    for path in args.input:
+        music_list = read_music_file(path)
+        if corpus is not None:
+            corpus.add_documents(
+                (music.get('videoId'), recommendation_service.analyze_music(music, include_tags=True)['tokens'])
+                for music in music_list
+            )
+            corpus.refresh()
+        # 음악에 emotion이 있으면 그 감정 태그로 추가
+        by_emotion = {}
+        for music in music_list:
+            by_emotion.setdefault(music.get('emotion') or None, []).append(music)
+        added = sum(catalog.add(group, emotion) for emotion, group in by_emotion.items())
+        print(f"{path}: {len(music_list)}개 중 {added}개 추가")
+
+    size = catalog.save_snapshot(args.out)
+    print(f"저장: {args.out} ({len(catalog)}개 문서, {size / 1024 / 1024:.1f}MB, {time.perf_counter() - started:.1f}초)")
+
+    if args.corpus_out:
+        if corpus is None:
+            print("코퍼스 IDF 모드가 아니므로 --corpus-out은 저장하지 않음")
+        else:
+            corpus.write(args.corpus_out)
+            print(f"코퍼스 IDF 저장: {args.corpus_out} (문서 {corpus.num_docs}개 - 서버 파일은 바꾸지 않음)")
+
+    problems = check_catalog_snapshot(args.out)
+    for problem in problems:
+        print(f"  - {problem}")
+    return 1 if problems else 0
+
+
+def verify_command(args):
+    started = time.perf_counter()
+    problems = check_catalog_snapshot(args.path)
+    if problems:
+        print(f"스냅샷 오류 ({args.path}):")
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    print(f"정상: {args.path} ({time.perf_counter() - started:.2f}초)")
+    return 0
+
+
+def info_command(args):
+    started = time.perf_counter()
+    segment = CatalogSegment(args.path)
+    info = segment.info()
+    info['openSeconds'] = round(time.perf_counter() - started, 4)
+    print(json.dumps(info, ensure_ascii=False, indent=2))
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='카탈로그 스냅샷 빌드 / 점검')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='음악 목록(JSON / NDJSON)으로 스냅샷 생성')
+    build.add_argument('--input', action='append', default=[], help='음악 목록 파일 (여러 번 지정 가능, 음악별 emotion 필드는 감정 태그)')
+    build.add_argument('--base', help='이어서 만들 기존 스냅샷')
+    build.add_argument('--out', required=True, help='저장할 스냅샷 경로')
+    build.add_argument(
+        '--corpus-out',
+        help='빌드에서 집계한 코퍼스 IDF를 저장할 경로 (서버의 CORPUS_IDF_PATH와 다른 경로, 생략하면 저장하지 않음)'
+    )
+    build.add_argument('--max-size', type=int, default=int(os.environ.get('CATALOG_MAX_SIZE', 200000)))
+    build.add_argument('--signature-bits', type=int, default=int(os.environ.get('CATALOG_SIGNATURE_BITS', 256)))
+    build.set_defaults(handler=build_command)
+
+    verify = commands.add_parser('verify', help='체크섬 + 배열 일관성 점검')
+    verify.add_argument('path')
+    verify.set_defaults(handler=verify_command)
+
+    info = commands.add_parser('info', help='스냅샷 요약 출력')
+    info.add_argument('path')
+    info.set_defaults(handler=info_command)
+
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    sys.exit(arguments.handler(arguments))
@@ -0,0 +1,402 @@
+"""
+전체 코퍼스 기준 IDF 모델
+서버가 지금까지 본 모든 후보 / 재생 기록 문서의 단어별 문서 빈도를 누적하고 주기적으로 디스크에 저장
+
+- 새 문서는 대기 목록에만 쌓이고, 공개된 IDF(IDFTable)는 다음 갱신(refresh) 전까지 바뀌지 않음
+  → 요청은 시작할 때 current()로 버전 하나를 고정하므로 같은 요청의 취향 벡터 / 후보는 같은 IDF를 사용하고,
+    같은 revision 동안에는 같은 요청이 항상 같은 점수를 받음 (캐시 / 요청 간 점수 비교 가능)
+  다른 프로세스(커널 풀 자식)는 sync(revision)로 같은 revision을 찾고, 찾을 수 없으면 RevisionUnavailable
+  (최근 keep_revisions개는 메모리에 보관 - 더 새 revision으로 대신 채점하지 않음)
+- 갱신은 파일 잠금을 잡은 프로세스 하나만 수행: 디스크의 최신 revision을 기준으로 대기 문서를 합쳐 revision + 1로 저장
+  → 여러 gunicorn 워커가 같은 파일을 써도 다른 워커가 집계한 문서를 덮어쓰지 않고, 다른 워커의 revision도 받아옴
+- 오프라인 도구(catalog_snapshot / rebuild_profiles build)는 서버 파일을 읽기만 하고 메모리 사본(offline_copy)에 집계한 뒤
+  다른 경로로 내보냄 → 서버 파일 교체는 install로 따로 수행
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows (개발 서버는 프로세스 하나이므로 파일 잠금 없이 저장)
+    fcntl = None
+
+logger = logging.getLogger('recommendation.corpus_idf')
+
+SNAPSHOT_VERSION = 2
+
+
+class RevisionUnavailable(LookupError):
+    """요청에 고정한 revision을 메모리에도 스냅샷 파일에도 찾을 수 없음 (파일이 이미 다음 revision으로 바뀜)"""
+
+
+class IDFTable:
+    """
+    한 revision의 문서 빈도 (읽기 전용 - 갱신할 때는 새 IDFTable을 만들어 교체)
+    IDF 식은 calculate_idf와 동일: log((전체 문서 수 + 1) / (단어가 등장한 문서 수 + 1)) + 1
+    """
+
+    __slots__ = ('revision', 'num_docs', 'doc_freq')
+
+    def __init__(self, revision=0, num_docs=0, doc_freq=None):
+        self.revision = revision
+        self.num_docs = num_docs
+        self.doc_freq = {} if doc_freq is None else doc_freq  # term → 문서 빈도
+
+    def idf(self, term):
+        """단어 하나의 IDF (처음 보는 단어는 문서 빈도 0으로 계산)"""
+        return math.log((self.num_docs + 1) / (self.doc_freq.get(term, 0) + 1)) + 1
+
+    def idf_map(self, terms):
+        """단어 목록의 IDF 딕셔너리 {term: idf}"""
+        total = self.num_docs + 1
+        doc_freq = self.doc_freq
+        return {
+            term: math.log(total / (doc_freq.get(term, 0) + 1)) + 1
+            for term in terms
+        }
+
+
+class CorpusIDF:
+    """
+    revision 단위로 공개되는 증분 문서 빈도(DF) 테이블
+    같은 문서(videoId)는 한 번만 집계하므로 인기 영상이 반복 등장해도 DF가 부풀지 않음
+    집계한 문서 ID는 최근 max_seen개만 보관 (오래전에 본 문서가 다시 오면 한 번 더 집계될 수 있음 - 스냅샷 크기 제한)
+    read_only: 문서를 집계하지 않고 파일에 쓰지 않음 (커널 풀 자식 프로세스 등 읽기만 하는 프로세스)
+    keep_revisions: sync로 다시 찾을 수 있도록 메모리에 보관할 최근 revision 수 (현재 revision 포함)
+    """
+
+    def __init__(self, path=None, snapshot_interval=300, max_seen=200000, read_only=False, keep_revisions=4):
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.max_seen = max_seen
+        self.read_only = read_only
+        self.keep_revisions = max(1, keep_revisions)
+
+        self.table = IDFTable()  # 현재 공개된 revision
+        self._revisions = {0: self.table}  # 최근에 공개 / 로드한 revision → IDFTable (오래된 순)
+        self.seen = {}           # 집계한 문서 ID (삽입 순서 = 오래된 순, 값은 사용하지 않음)
+        self._pending = {}       # 아직 공개하지 않은 문서 ID → 단어 집합
+
+        self._lock = threading.Lock()          # seen / _pending / table 교체
+        self._refresh_lock = threading.Lock()  # 프로세스 안에서 갱신은 한 번에 하나
+        self._file_state = None                # 마지막으로 읽거나 쓴 스냅샷 파일의 (inode, mtime, 크기)
+        self._snapshot_thread_pid = None
+
+        if path and os.path.exists(path):
+            self.load()
+
+    # ----------------------------------------
+    # 조회 (현재 공개된 revision 기준)
+    # ----------------------------------------
+
+    def current(self):
+        """현재 공개된 IDFTable - 요청 하나 동안 이 값을 고정해서 사용"""
+        self._ensure_snapshot_thread()
+        return self.table
+
+    @property
+    def revision(self):
+        return self.table.revision
+
+    @property
+    def num_docs(self):
+        return self.table.num_docs
+
+    @property
+    def doc_freq(self):
+        return self.table.doc_freq
+
+    def idf(self, term):
+        return self.table.idf(term)
+
+    def idf_map(self, terms):
+        return self.table.idf_map(terms)
+
+    def stats(self):
+        """코퍼스 통계 (/health 응답용)"""
+        table = self.table
+        return {
+            'revision': table.revision,
+            'documents': table.num_docs,
+            'terms': len(table.doc_freq),
+            'pending': len(self._pending),
+            'seen': len(self.seen),
+            'path': self.path,
+            'readOnly': self.read_only
+        }
+
+    # ----------------------------------------
+    # 갱신
+    # ----------------------------------------
+
+    def add_documents(self, documents):
+        """
+        문서 여러 개를 다음 revision에 집계하도록 대기 목록에 추가 (현재 IDF는 바뀌지 않음)
+        documents: [(doc_id, tokens), ...] - doc_id가 없거나 이미 본 문서는 건너뜀
+        반환: 새로 추가한 문서 수
+        """
+        if self.read_only:
+            return 0
+
+        added = 0
+        with self._lock:
+            seen = self.seen
+            pending = self._pending
+            for doc_id, tokens in documents:
+                if not doc_id or doc_id in seen or doc_id in pending:
+                    continue
+                pending[doc_id] = frozenset(tokens)
+                added += 1
+
+        if added:
+            self._ensure_snapshot_thread()
+
+        return added
+
+    def refresh(self):
+        """
+        대기 문서를 합쳐 새 revision 공개 (파일이 있으면 잠금을 잡고 디스크의 최신 revision 기준으로 합친 뒤 저장)
+        대기 문서가 없어도 다른 프로세스가 저장한 새 revision이 있으면 받아옴
+        반환: 공개된 IDFTable
+        """
+        with self._refresh_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+
+            try:
+                if self.path and not self.read_only:
+                    with self._file_lock():
+                        base_table, base_seen = self._latest()
+                        table, seen = self._merge(base_table, base_seen, pending)
+                        if table is not base_table:
+                            self._write(self.path, table, seen)
+                else:
+                    table, seen = self._merge(self.table, self.seen, pending)
+            except Exception:
+                # 저장에 실패한 문서는 다음 갱신에서 다시 시도
+                with self._lock:
+                    pending.update(self._pending)
+                    self._pending = pending
+                raise
+
+            self._publish(table, seen)
+
+        return table
+
+    # 종료 시 / 워커 종료 시 호출하는 이름 (atexit, serve.worker_exit)
+    save = refresh
+
+    def sync(self, revision):
+        """
+        요청에 고정한 revision의 IDFTable (커널 풀 자식처럼 요청을 처리한 프로세스와 다른 프로세스에서 채점할 때)
+        메모리에 없으면 스냅샷 파일이 바뀐 경우에만 다시 읽음 - 더 새 revision으로 대신 채점하지 않음
+        revision이 None이면 현재 공개된 revision
+        예외: RevisionUnavailable (파일이 이미 다른 revision으로 바뀌어 고정한 revision을 읽을 수 없음)
+        """
+        if revision is None:
+            return self.table
+
+        table = self._revisions.get(revision)
+        if table is None and self.path:
+            with self._refresh_lock:
+                table = self._revisions.get(revision)
+                if table is None and self._file_changed():
+                    self.load()
+                    table = self._revisions.get(revision)
+        if table is None:
+            raise RevisionUnavailable(f"코퍼스 IDF revision {revision}을 찾을 수 없습니다 (현재 {self.table.revision})")
+        return table
+
+    def _publish(self, table, seen):
+        """새 (IDFTable, seen) 공개 + 최근 revision 목록에 추가 (sync로 다시 찾을 수 있도록)"""
+        with self._lock:
+            self.table = table
+            self.seen = seen
+            revisions = self._revisions
+            revisions.pop(table.revision, None)
+            revisions[table.revision] = table
+            while len(revisions) > self.keep_revisions:
+                del revisions[next(iter(revisions))]
+
+    def _latest(self):
+        """디스크에 더 새 스냅샷이 있으면 그 내용, 아니면 현재 공개된 내용 (파일 잠금 안에서 호출)"""
+        if self._file_changed():
+            snapshot = self._read(self.path)
+            self._file_state = self._stat(self.path)
+            return self._parse(snapshot)
+        return self.table, self.seen
+
+    def _merge(self, table, seen, pending):
+        """
+        (table, seen)에 대기 문서를 합친 새 (IDFTable, seen) - 입력은 수정하지 않음
+        새로 집계한 문서가 없으면 입력을 그대로 반환
+        """
+        documents = [(doc_id, terms) for doc_id, terms in pending.items() if doc_id not in seen]
+        if not documents:
+            return table, seen
+
+        doc_freq = dict(table.doc_freq)
+        seen = dict(seen)
+        for doc_id, terms in documents:
+            seen[doc_id] = None
+            for term in terms:
+                doc_freq[term] = doc_freq.get(term, 0) + 1
+
+        # 오래된 문서 ID부터 제거 (문서 빈도는 그대로 유지)
+        overflow = len(seen) - self.max_seen
+        if self.max_seen and overflow > 0:
+            for doc_id in list(seen)[:overflow]:
+                del seen[doc_id]
+
+        return IDFTable(table.revision + 1, table.num_docs + len(documents), doc_freq), seen
+
+    # ----------------------------------------
+    # 저장 / 로드
+    # ----------------------------------------
+
+    def load(self, path=None):
+        """
+        디스크 스냅샷 로드 (path를 주면 그 파일 - 오프라인 도구가 서버 코퍼스를 읽기만 할 때)
+        대기 중인 문서는 그대로 유지 (다음 갱신에서 로드한 revision에 합침)
+        """
+        path = path or self.path
+        snapshot = self._read(path)
+        table, seen = self._parse(snapshot)
+
+        self._publish(table, seen)
+        if path == self.path:
+            self._file_state = self._stat(path)
+
+    def write(self, path):
+        """현재 공개된 revision을 path에 저장 (서버 파일과 다른 경로로 내보낼 때 - 대기 문서는 포함하지 않음)"""
+        self._write(path, self.table, self.seen)
+
+    def offline_copy(self):
+        """
+        오프라인 도구용 메모리 사본 (파일 경로 없음 - 집계 / 갱신해도 파일에 쓰지 않음, 내보낼 때는 write)
+        이 인스턴스는 읽기 전용으로 바꿈 (도구가 import한 서버 모듈의 종료 시 저장이 서버 파일에 쓰지 않도록)
+        """
+        self.read_only = True
+        corpus = CorpusIDF(max_seen=self.max_seen)
+        if self.path and os.path.exists(self.path):
+            corpus.load(self.path)
+        return corpus
+
+    def install(self, source_path):
+        """
+        오프라인 도구가 내보낸 스냅샷으로 서버 파일 교체 (파일 잠금 안에서)
+        revision은 서버 파일보다 크게 올리므로 서버 프로세스는 다음 갱신(refresh) / sync에서 새 파일을 읽고
+        아직 공개하지 않은 대기 문서는 새 파일에 합침
+        (사본을 만든 뒤 서버가 공개한 문서는 빠지고, 같은 문서를 다시 보면 다시 집계됨)
+        반환: 설치한 IDFTable
+        """
+        if not self.path or self.read_only:
+            raise ValueError('파일 경로가 있고 읽기 전용이 아닌 코퍼스에만 설치할 수 있습니다.')
+
+        table, seen = self._parse(self._read(source_path))
+        with self._refresh_lock:
+            with self._file_lock():
+                base_table, _ = self._latest()
+                table = IDFTable(max(base_table.revision, table.revision) + 1, table.num_docs, table.doc_freq)
+                self._write(self.path, table, seen)
+            self._publish(table, seen)
+        return table
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _parse(self, snapshot):
+        """스냅샷 JSON → (IDFTable, seen) (revision이 없는 이전 형식은 revision 0)"""
+        seen = dict.fromkeys(snapshot['seen'])
+        if self.max_seen and len(seen) > self.max_seen:
+            seen = dict.fromkeys(list(seen)[-self.max_seen:])
+        table = IDFTable(snapshot.get('revision', 0), snapshot['numDocs'], snapshot['docFreq'])
+        return table, seen
+
+    def _write(self, path, table, seen):
+        """
+        스냅샷 저장 (임시 파일에 쓴 뒤 교체하므로 중간에 죽어도 기존 파일 유지)
+        """
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'revision': table.revision,
+            'numDocs': table.num_docs,
+            'docFreq': table.doc_freq,
+            'seen': list(seen)
+        }
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        if path == self.path:
+            self._file_state = self._stat(path)
+
+    @staticmethod
+    def _stat(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _file_changed(self):
+        """마지막으로 읽거나 쓴 뒤 스냅샷 파일이 바뀌었는지 (다른 워커의 저장, 오프라인 도구로 교체)"""
+        state = self._stat(self.path)
+        return state is not None and state != self._file_state
+
+    @contextmanager
+    def _file_lock(self):
+        """스냅샷 파일 쓰기 잠금 (프로세스 간 - 한 번에 한 프로세스만 읽기-합치기-쓰기)"""
+        if fcntl is None:
+            yield
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{self.path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _ensure_snapshot_thread(self):
+        """
+        주기적 갱신 스레드 시작 (프로세스마다 한 번, fork 이후 워커에서도 다시 시작, 읽기 전용이면 시작하지 않음)
+        """
+        if not self.path or not self.snapshot_interval or self.read_only:
+            return
+        if self._snapshot_thread_pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._snapshot_thread_pid == os.getpid():
+                return
+            self._snapshot_thread_pid = os.getpid()
+
+        thread = threading.Thread(target=self._snapshot_loop, name='corpus-idf-snapshot', daemon=True)
+        thread.start()
+
+    def _snapshot_loop(self):
+        while True:
+            time.sleep(self.snapshot_interval)
+            try:
+                self.refresh()
+            except OSError as e:
+                logger.warning("[Corpus IDF] 스냅샷 저장 실패: %s", e)
@@ -0,0 +1,279 @@
+"""
+단어 → 포스팅(문서 ID, 가중치) 역색인 + 상한 기반 가지치기 top-K 검색
+사용자 취향 벡터와 단어를 하나도 공유하지 않는 문서는 아예 방문하지 않음
+(cosine_similarity의 '공통 키 없음 → 0' 단축을 전체 카탈로그로 일반화)
+
+검색 (단어 단위 누적 + MaxScore/WAND 방식 가지치기)
+- 단어별 상한 = 질의 가중치 × 포스팅 최대 가중치, 상한이 큰 단어부터 포스팅 전체를 누적
+- 지금까지의 부분 점수로 k번째 점수 하한(θ)을 구하고, 남은 단어 상한의 합으로도 θ에 못 미치면
+  아직 보지 못한 문서는 top-K에 들 수 없음 → 이후 단어는 후보 문서만 이분 탐색으로 조회
+  (후보가 포스팅보다 충분히 적을 때만 - 아니면 포스팅을 그대로 누적)
+- 후보도 (부분 점수 + 남은 상한)이 θ 미만이면 계속 제외
+- 문서별 점수 배수(언어 가중치 등)는 상한 계산에 포함하므로 결과는 전체 채점과 같음
+
+문서 ID는 추가 순서대로 증가 → 포스팅 목록이 항상 정렬되어 있어 추가는 끝에 붙이기만 함
+제거는 표시만 하고, 제거된 문서가 절반을 넘으면 ID를 다시 매겨 한 번에 정리
+스레드 안전하지 않음 (호출 측에서 잠금)
+"""
+
+import numpy as np
+
+
+def vector_norm(weights):
+    """{term: weight} 벡터 크기"""
+    return float(np.sqrt(sum(weight * weight for weight in weights.values())))
+
+
+def pruned_top_k(term_postings, multipliers, k, query_norm):
+    """
+    상한 기반 가지치기 top-K (InvertedIndex와 스냅샷 세그먼트가 공유)
+    term_postings: [(상한 = 질의 가중치 × 포스팅 최대 가중치, 질의 가중치, 문서 ID 배열(정렬됨), 가중치 배열), ...]
+    multipliers: 문서 ID별 점수 배수 (0이면 후보 제외)
+    반환: (문서 ID 배열, 점수 배열) - 점수 내림차순, 같으면 문서 ID 오름차순
+    """
+    num_ids = len(multipliers)
+    empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64))
+    if k <= 0 or not term_postings or num_ids == 0:
+        return empty
+    max_multiplier = float(multipliers.max())
+    if max_multiplier <= 0:
+        return empty
+
+    # 상한이 큰 단어부터 처리, remaining[i] = i번째 이후 단어 상한의 합
+    term_postings = sorted(term_postings, key=lambda item: item[0], reverse=True)
+    remaining = np.cumsum([item[0] for item in term_postings][::-1])[::-1].tolist()[1:] + [0.0]
+
+    scores = np.zeros(num_ids, dtype=np.float64)
+    candidates = None
+    threshold = 0.0
+
+    for (_, weight, ids, values), rest in zip(term_postings, remaining):
+        size = len(ids)
+
+        if candidates is None:
+            # 포스팅 전체 누적 (한 포스팅 안의 문서 ID는 중복 없음)
+            scores[ids] += weight * values
+            lower = scores * multipliers
+            if np.count_nonzero(lower) >= k:
+                threshold = np.partition(lower, num_ids - k)[num_ids - k]
+            # 보지 못한 문서의 최대 점수 = 남은 상한 합 × 최대 배수 < θ → 후보 확정
+            if rest * max_multiplier < threshold:
+                candidates = np.flatnonzero((scores + rest) * multipliers >= threshold)
+        else:
+            if len(candidates) * 16 < size:
+                # 후보만 이분 탐색으로 조회
+                positions = np.searchsorted(ids, candidates)
+                positions[positions == size] = 0
+                hit = ids[positions] == candidates
+                scores[candidates[hit]] += weight * values[positions[hit]]
+            else:
+                # 후보가 포스팅에 비해 많으면 포스팅 전체를 누적하는 편이 빠름 (후보 밖 문서 점수는 쓰지 않음)
+                scores[ids] += weight * values
+
+            candidate_lower = scores[candidates] * multipliers[candidates]
+            if len(candidates) >= k:
+                threshold = max(threshold, np.partition(candidate_lower, len(candidates) - k)[len(candidates) - k])
+            candidates = candidates[(scores[candidates] + rest) * multipliers[candidates] >= threshold]
+
+    if candidates is None:
+        candidates = np.flatnonzero(scores * multipliers > 0)
+    final = scores[candidates] * multipliers[candidates] / query_norm
+    keep = final > 0
+    candidates = candidates[keep]
+    final = final[keep]
+
+    # 점수 내림차순, 같으면 문서 ID(추가 순서) 오름차순 (k번째 점수와 같은 문서까지 남긴 뒤 정렬)
+    if len(candidates) > k:
+        top = final >= np.partition(final, len(final) - k)[len(final) - k]
+        candidates = candidates[top]
+        final = final[top]
+    order = np.lexsort((candidates, -final))[:k]
+
+    return candidates[order], final[order]
+
+
+class InvertedIndex:
+    """
+    key → 단위 벡터 {term: weight} 역색인
+    점수 = Σ 질의 가중치 × 문서 가중치 / |질의| (= 문서 벡터가 단위 벡터일 때 코사인 유사도) × 그룹 배수
+    """
+
+    def __init__(self):
+        self._postings = {}     # term → [문서 ID 배열(int32), 가중치 배열(float64), 사용 길이]
+        self._max_weight = {}   # term → 포스팅 가중치 상한 (제거해도 줄이지 않음 - 상한으로는 여전히 유효)
+        self._ids = {}          # key → 문서 ID
+        self._doc_terms = {}    # key → 단어 목록 (ID 재할당용)
+        self._keys = []         # 문서 ID → key (제거되면 None)
+        self._groups = np.zeros(0, dtype=np.int32)   # 문서 ID → 그룹 코드
+        self._alive = np.zeros(0, dtype=bool)
+        self._group_codes = {}  # 그룹 → 코드
+        self._tags = {}         # 태그 → 문서 ID별 포함 여부 (검색 필터, 예: 감정)
+        self.removed = 0
+
+    def add(self, key, weights, group=None, tags=()):
+        """
+        문서 추가 (이미 있으면 제거 후 다시 추가)
+        weights: {term: weight} - 단위 벡터로 정규화된 가중치 (0 이하 가중치는 무시)
+        group: 검색 시 점수 배수를 고를 그룹 (예: 언어)
+        tags: 검색 시 tag로 걸러낼 태그 목록
+        """
+        if key in self._ids:
+            self.remove(key)
+
+        doc_id = len(self._keys)
+        self._keys.append(key)
+        self._ids[key] = doc_id
+        self._ensure_capacity(doc_id + 1)
+        self._groups[doc_id] = self._group_codes.setdefault(group, len(self._group_codes))
+        self._alive[doc_id] = True
+        for tag in tags:
+            self._tag_mask(tag)[doc_id] = True
+
+        terms = []
+        for term, weight in weights.items():
+            if weight <= 0:
+                continue
+            self._append_posting(term, doc_id, weight)
+            terms.append(term)
+        self._doc_terms[key] = terms
+
+    def tag(self, key, tag):
+        """문서에 태그 추가 (없는 문서면 False)"""
+        doc_id = self._ids.get(key)
+        if doc_id is None:
+            return False
+        self._tag_mask(tag)[doc_id] = True
+        return True
+
+    def _tag_mask(self, tag):
+        mask = self._tags.get(tag)
+        if mask is None:
+            mask = self._tags[tag] = np.zeros(len(self._alive), dtype=bool)
+        return mask
+
+    def _ensure_capacity(self, size):
+        if size <= len(self._alive):
+            return
+        capacity = max(1024, size * 2)
+        padding = np.zeros(capacity - len(self._alive), dtype=bool)
+        self._groups = np.resize(self._groups, capacity)
+        self._alive = np.concatenate([self._alive, padding])
+        for tag, mask in self._tags.items():
+            self._tags[tag] = np.concatenate([mask, padding])
+
+    def _append_posting(self, term, doc_id, weight):
+        posting = self._postings.get(term)
+        if posting is None:
+            posting = self._postings[term] = [np.empty(4, dtype=np.int32), np.empty(4, dtype=np.float64), 0]
+        ids, values, size = posting
+        if size == len(ids):
+            posting[0] = ids = np.resize(ids, size * 2)
+            posting[1] = values = np.resize(values, size * 2)
+        ids[size] = doc_id
+        values[size] = weight
+        posting[2] = size + 1
+        if weight > self._max_weight.get(term, 0.0):
+            self._max_weight[term] = weight
+
+    def remove(self, key):
+        """문서 제거 (없으면 False) - 포스팅은 ID 재할당 때 정리"""
+        doc_id = self._ids.pop(key, None)
+        if doc_id is None:
+            return False
+        del self._doc_terms[key]
+        self._keys[doc_id] = None
+        self._alive[doc_id] = False
+        self.removed += 1
+
+        if self.removed * 2 > len(self._keys) and self.removed >= 1024:
+            self._compact()
+        return True
+
+    def _compact(self):
+        """제거된 문서를 포스팅에서 빼고 남은 문서 ID를 0부터 다시 매김 (순서 유지)"""
+        num_ids = len(self._keys)
+        alive = self._alive[:num_ids]
+        new_ids = np.cumsum(alive, dtype=np.int64) - 1
+
+        for term in list(self._postings):
+            ids, values, size = self._postings[term]
+            keep = alive[ids[:size]]
+            if not keep.any():
+                del self._postings[term]
+                del self._max_weight[term]
+                continue
+            kept_values = values[:size][keep]
+            self._postings[term] = [new_ids[ids[:size][keep]].astype(np.int32), kept_values, int(keep.sum())]
+            self._max_weight[term] = float(kept_values.max())
+
+        self._groups = self._groups[:num_ids][alive].copy()
+        self._tags = {tag: mask[:num_ids][alive].copy() for tag, mask in self._tags.items()}
+        self._keys = [key for key in self._keys if key is not None]
+        self._ids = {key: doc_id for doc_id, key in enumerate(self._keys)}
+        self._alive = np.ones(len(self._keys), dtype=bool)
+        self.removed = 0
+
+    def search(self, query, k, group_boost=None, exclude=(), tag=None):
+        """
+        점수 상위 k개 [(key, score), ...] (점수 내림차순, 같으면 먼저 추가된 문서 먼저)
+        query: {term: weight} - 정규화하지 않은 질의 벡터 (취향 벡터 그대로)
+        group_boost: {group: 점수 배수} - 없는 그룹은 1
+        exclude: 제외할 key 집합
+        tag: 주어지면 이 태그가 붙은 문서만 검색
+        """
+        query_norm = vector_norm(query)
+        num_ids = len(self._keys)
+        if k <= 0 or query_norm == 0 or num_ids == 0:
+            return []
+
+        # 문서별 점수 배수 (제거 / 제외 문서는 0 → 후보에서 빠짐)
+        boost_table = np.ones(len(self._group_codes), dtype=np.float64)
+        for group, boost in (group_boost or {}).items():
+            code = self._group_codes.get(group)
+            if code is not None:
+                boost_table[code] = boost
+        multipliers = boost_table[self._groups[:num_ids]] * self._alive[:num_ids]
+        excluded = [self._ids[key] for key in exclude if key in self._ids]
+        if excluded:
+            multipliers[excluded] = 0.0
+        if tag is not None:
+            multipliers *= self._tags[tag][:num_ids] if tag in self._tags else 0.0
+        term_postings = []
+        for term, weight in query.items():
+            if weight > 0 and term in self._postings:
+                ids, values, size = self._postings[term]
+                term_postings.append((weight * self._max_weight[term], weight, ids[:size], values[:size]))
+
+        doc_ids, scores = pruned_top_k(term_postings, multipliers, k, query_norm)
+        return [(self._keys[doc_id], score) for doc_id, score in zip(doc_ids.tolist(), scores.tolist())]
+
+    def tags(self, key):
+        """문서에 붙은 태그 목록"""
+        doc_id = self._ids.get(key)
+        if doc_id is None:
+            return []
+        return [tag for tag, mask in self._tags.items() if mask[doc_id]]
+
+    def export(self):
+        """
+        남아 있는 포스팅 전체 (스냅샷 저장용)
+        반환: [(term, [key, ...], 가중치 배열), ...] - key는 추가 순서
+        """
+        alive = self._alive[:len(self._keys)]
+        exported = []
+        for term, (ids, values, size) in self._postings.items():
+            keep = alive[ids[:size]]
+            if keep.any():
+                exported.append((term, [self._keys[doc_id] for doc_id in ids[:size][keep].tolist()], values[:size][keep]))
+        return exported
+
+    def __len__(self):
+        return len(self._ids)
+
+    def stats(self):
+        return {
+            'documents': len(self._ids),
+            'terms': len(self._postings),
+            'postings': sum(size for _, _, size in self._postings.values()),
+            'removed': self.removed
+        }
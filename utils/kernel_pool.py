@@ -0,0 +1,171 @@
+"""
+CPU 작업(프로필 생성 / 채점 커널) 오프로딩용 프로세스 풀
+- 요청 스레드는 파싱 / 응답만 처리하고 커널은 풀에 넘긴 뒤 결과를 기다림
+  → 큰 재생 기록을 보낸 요청이 있어도 다른 요청의 스레드가 막히지 않음 (GIL 영향 없음)
+- 동시에 맡길 수 있는 작업 수 제한 (실행 중 max_workers + 대기 max_queue), 넘치면 PoolSaturated
+- 요청별 기한: 기한 안에 결과가 없으면 DeadlineExceeded → 호출 측에서 미정렬 결과로 응답
+- max_workers=0이면 풀 없이 호출 스레드에서 바로 실행 (기본값, 기존 동작과 동일)
+
+프로세스(pre-fork 워커)마다 별도 풀을 만들고, 자식은 fork로 생성해 이미 로드한 모듈 / 정규식을 그대로 사용
+(fork를 지원하지 않는 플랫폼에서는 풀 없이 실행)
+자식 프로세스에서 부모 상태를 바꾸면 안 되는 객체(코퍼스 IDF 등)는 initializer에서 읽기 전용으로 전환
+"""
+
+import concurrent.futures
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger('recommendation.kernel_pool')
+
+
+class PoolSaturated(Exception):
+    """실행 중 + 대기 중인 작업이 한도에 도달"""
+
+
+class DeadlineExceeded(Exception):
+    """기한 안에 커널 결과를 받지 못함"""
+
+
+def _ready():
+    """자식 프로세스 생성 확인용 빈 작업"""
+    return os.getpid()
+
+
+class KernelPool:
+    """
+    크기 / 대기열이 제한된 프로세스 풀
+    fn은 모듈 최상위 함수여야 하고 (pickle 가능) 요청 컨텍스트(flask.g 등)를 사용하면 안 됨
+    initializer: 자식 프로세스마다 시작할 때 한 번 호출할 함수
+    """
+
+    def __init__(self, max_workers=0, max_queue=None, initializer=None):
+        self.initializer = initializer
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self._pending = 0
+        # 풀을 새로 만들 때마다 증가 - 버린 풀의 작업이 끝나며 반환하는 슬롯은 무시 (_pending 음수 방지)
+        self._generation = 0
+
+        self.rejected = 0
+        self.timeouts = 0
+        self.configure(max_workers, max_queue)
+
+    def configure(self, max_workers, max_queue=None):
+        """
+        풀 크기 / 대기열 길이 설정 (풀을 시작하기 전에 호출)
+        max_queue를 생략하면 max_workers * 2
+        """
+        self.max_workers = max(0, max_workers)
+        self.max_queue = self.max_workers * 2 if max_queue is None else max(0, max_queue)
+
+    @property
+    def enabled(self):
+        return self.max_workers > 0 and 'fork' in multiprocessing.get_all_start_methods()
+
+    def start(self):
+        """
+        현재 프로세스의 풀 생성 (이미 있으면 그대로)
+        ProcessPoolExecutor는 첫 submit 때 자식을 만들므로 자식 수만큼 빈 작업을 보내 여기서 모두 fork함
+        → 요청 처리 스레드가 생기기 전(워커 초기화 시점)에 호출하면 요청 스레드가 있는 상태에서 fork하지 않음
+        (자식이 비정상 종료해 풀을 다시 만들 때는 요청 스레드에서 fork됨)
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            if self._executor_pid != os.getpid():
+                executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('fork'),
+                    initializer=self.initializer
+                )
+                concurrent.futures.wait([executor.submit(_ready) for _ in range(self.max_workers)])
+                self._executor = executor
+                self._executor_pid = os.getpid()
+                self._pending = 0
+                self._generation += 1
+            return self._executor
+
+    def run(self, fn, *args, timeout=None):
+        """
+        fn(*args)를 풀에서 실행하고 결과 반환
+        timeout: 결과를 기다릴 최대 시간(초), None이면 무제한
+        예외: PoolSaturated (대기열 가득 참), DeadlineExceeded (기한 초과)
+        풀이 꺼져 있으면 호출 스레드에서 바로 실행 (기한 적용 안 됨)
+        """
+        executor = self.start()
+        if executor is None:
+            return fn(*args)
+
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise PoolSaturated(f"커널 대기열이 가득 찼습니다 ({self._pending}개 처리 중)")
+            self._pending += 1
+            generation = self._generation
+
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._release(generation)
+            self._discard_executor(executor)
+            raise
+        except Exception:
+            self._release(generation)
+            raise
+
+        # 슬롯은 작업이 실제로 끝날 때 반환 (기한을 넘겨도 실행 중인 작업은 계속 슬롯을 차지)
+        future.add_done_callback(functools.partial(self._release, generation))
+
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()  # 아직 대기 중이면 취소
+            with self._lock:
+                self.timeouts += 1
+            raise DeadlineExceeded(f"커널이 {timeout:.3f}초 안에 끝나지 않았습니다")
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            raise
+
+    def _release(self, generation, future=None):
+        """슬롯 반환 (슬롯을 차지한 뒤 풀이 다시 만들어졌으면 이미 0으로 초기화했으므로 무시)"""
+        with self._lock:
+            if generation == self._generation:
+                self._pending -= 1
+
+    def _discard_executor(self, executor):
+        """자식 프로세스가 비정상 종료된 풀은 버리고 다음 요청에서 새로 생성"""
+        logger.warning("[Kernel Pool] 자식 프로세스 비정상 종료 - 풀 재생성")
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self._executor_pid = None
+                self._pending = 0
+                self._generation += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """대기 중인 작업 취소 후 풀 종료 (현재 프로세스의 풀만)"""
+        with self._lock:
+            executor = self._executor if self._executor_pid == os.getpid() else None
+            self._executor = None
+            self._executor_pid = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        """풀 통계 (/health 응답용)"""
+        return {
+            'enabled': self.enabled,
+            'workers': self.max_workers,
+            'maxQueue': self.max_queue,
+            'pending': self._pending if self._executor_pid == os.getpid() else 0,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts
+        }
@@ -0,0 +1,82 @@
+"""
+크기 제한 + TTL LRU 캐시
+추천 서버의 프로세스 내 캐시 (분석 결과 등)
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+
+class LRUCache:
+    """
+    스레드 안전한 LRU 캐시
+    max_size: 최대 항목 수 (초과 시 가장 오래 사용되지 않은 항목부터 제거)
+    ttl: 항목 유효 시간(초), None이면 만료 없음
+    """
+
+    def __init__(self, max_size=1000, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()  # key → (만료 시각, 값)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """캐시 조회 (조회된 항목은 가장 최근 사용으로 이동)"""
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """캐시 저장 (크기 초과 시 LRU 항목 제거)"""
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """전체 항목 삭제 (통계는 유지)"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """캐시 통계 (/health 응답용)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxSize': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hitRate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
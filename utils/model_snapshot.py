@@ -0,0 +1,240 @@
+"""
+버전이 있는 배열 스냅샷 파일 (메모리 매핑으로 읽기)
+재시작 시 다시 계산하지 않고 파일을 mmap해 배열을 그대로 사용
+- 읽기 전용 매핑이므로 같은 파일을 연 워커 프로세스들은 OS 페이지 캐시를 공유 (워커별 사본 없음)
+- pre-fork 운영 모드에서는 마스터가 연 매핑을 워커가 그대로 물려받음
+
+파일 구조 (리틀 엔디언)
+    magic(8) | 형식 버전(uint32) | 헤더 길이(uint32) | 헤더 JSON | 배열 데이터 (64바이트 정렬)
+헤더: {"kind", "createdAt", "meta", "arrays": {name: {"dtype", "shape", "offset", "crc32"}}}
+"""
+
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows (개발 서버는 프로세스 하나이므로 잠금 없이 저장)
+    fcntl = None
+
+MAGIC = b'MUSNAP\x00\x00'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct('<8sII')
+
+
+class SnapshotError(Exception):
+    """스냅샷 파일 형식 / 버전 / 체크섬 오류"""
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_snapshot(path, kind, arrays, meta=None):
+    """
+    배열 스냅샷 저장 (임시 파일에 쓴 뒤 교체하므로 중간에 죽어도 기존 파일 유지)
+    kind: 스냅샷 종류 (열 때 확인)
+    arrays: {name: np.ndarray}
+    meta: 헤더에 함께 저장할 JSON 직렬화 가능한 값
+    반환: 파일 크기(바이트)
+    """
+    arrays = {
+        name: np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+        for name, array in arrays.items()
+    }
+
+    # 헤더 크기가 배열 오프셋에 영향을 주므로 오프셋은 헤더 뒤 상대 위치로 먼저 계산
+    layout = {}
+    relative = 0
+    for name, array in arrays.items():
+        relative = _aligned(relative)
+        layout[name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': relative,
+            'crc32': zlib.crc32(array.tobytes())
+        }
+        relative += array.nbytes
+
+    header = {
+        'kind': kind,
+        'createdAt': time.time(),
+        'meta': meta or {},
+        'arrays': layout
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    data_start = _aligned(_PREAMBLE.size + len(header_bytes))
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + relative)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    return data_start + relative
+
+
+@contextmanager
+def file_lock(path):
+    """스냅샷 파일 쓰기 잠금 (프로세스 간 - path.lock 파일, 한 번에 한 프로세스만 읽기-합치기-쓰기)"""
+    if fcntl is None:
+        yield
+        return
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(f"{path}.lock", 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def file_state(path):
+    """파일 식별 정보 (inode, mtime, 크기) - 다른 프로세스가 교체했는지 비교용, 파일이 없으면 None"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+class Snapshot:
+    """
+    메모리 매핑된 스냅샷 (읽기 전용)
+    arrays의 배열은 파일을 직접 가리키는 뷰 - 수정 불가, 필요한 페이지만 읽힘
+    """
+
+    def __init__(self, path, kind=None):
+        self.path = path
+
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            self.file_state = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if size < _PREAMBLE.size:
+                raise SnapshotError(f"스냅샷 파일이 너무 작습니다: {path}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_length = _PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"스냅샷 파일이 아닙니다: {path}")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"지원하지 않는 스냅샷 형식 버전입니다: {version} (지원: {FORMAT_VERSION})")
+
+        try:
+            header = json.loads(self._mmap[_PREAMBLE.size:_PREAMBLE.size + header_length].decode('utf-8'))
+        except ValueError as e:
+            raise SnapshotError(f"스냅샷 헤더를 읽을 수 없습니다: {e}")
+        if kind is not None and header['kind'] != kind:
+            raise SnapshotError(f"스냅샷 종류가 다릅니다: {header['kind']} (필요: {kind})")
+
+        self.kind = header['kind']
+        self.created_at = header['createdAt']
+        self.meta = header['meta']
+        self.layout = header['arrays']
+        self.size = size
+
+        data_start = _aligned(_PREAMBLE.size + header_length)
+        self.arrays = {}
+        for name, spec in self.layout.items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            offset = data_start + spec['offset']
+            if offset + count * dtype.itemsize > size:
+                raise SnapshotError(f"스냅샷 파일이 잘렸습니다 ({name})")
+            self.arrays[name] = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offset).reshape(spec['shape'])
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def verify(self):
+        """
+        배열별 CRC32 확인 (파일 전체를 읽음 - 시작 경로가 아니라 빌드 / 점검 도구에서 사용)
+        반환: 체크섬이 다른 배열 이름 목록
+        """
+        return [
+            name for name, spec in self.layout.items()
+            if zlib.crc32(self.arrays[name].tobytes()) != spec['crc32']
+        ]
+
+    def info(self):
+        """스냅샷 요약 (/health, 점검 도구 출력용)"""
+        return {
+            'path': self.path,
+            'kind': self.kind,
+            'version': FORMAT_VERSION,
+            'createdAt': self.created_at,
+            'bytes': self.size,
+            'meta': self.meta
+        }
+
+
+# ========================================
+# 문자열 테이블 (UTF-8 바이트 + 오프셋 배열)
+# ========================================
+
+def pack_strings(strings):
+    """문자열 목록 → (UTF-8 바이트 배열, 오프셋 배열(len + 1))"""
+    encoded = [value.encode('utf-8') for value in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8) if encoded else np.zeros(0, dtype=np.uint8)
+    return blob, offsets
+
+
+class StringTable:
+    """pack_strings로 저장한 문자열을 필요할 때만 디코딩"""
+
+    def __init__(self, blob, offsets, order=None):
+        """order: 바이트 순으로 정렬한 인덱스 배열 (None이면 테이블 자체가 바이트 순으로 정렬되어 있음)"""
+        self.blob = blob
+        self.offsets = offsets
+        self.order = order
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def raw(self, index):
+        return self.blob[self.offsets[index]:self.offsets[index + 1]].tobytes()
+
+    def __getitem__(self, index):
+        return self.raw(index).decode('utf-8')
+
+    def find(self, value):
+        """value의 인덱스 (없으면 -1) - 이분 탐색"""
+        target = value.encode('utf-8')
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.raw(self._sorted_index(mid)) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self.raw(self._sorted_index(lo)) == target:
+            return self._sorted_index(lo)
+        return -1
+
+    def _sorted_index(self, position):
+        return position if self.order is None else int(self.order[position])
@@ -0,0 +1,148 @@
+"""
+근사 중복 후보 묶기 (MinHash + LSH)
+키워드 검색 결과에는 같은 곡의 재업로드 / 가사 영상 / 라이브 버전처럼 제목 토큰이 거의 같은 후보가 많음
+→ 채점 전에 먼저 온 후보 하나만 남기고 나머지를 묶음
+
+- MinHash: 토큰 집합마다 num_perm개 해시의 최솟값 (두 서명의 같은 자리 값이 같을 확률 = 자카드 유사도)
+  토큰 해시는 blake2b 32비트, 해시 함수는 multiply-shift ((a × h + b) mod 2^64의 상위 32비트) - 문서 전체를 한 번에 numpy로 계산
+- LSH: 서명을 bands개 구간으로 나눠 구간별 버킷에 넣고, 같은 버킷에 들어간 대표 후보와만 실제 자카드 유사도 비교
+  → 모든 쌍을 비교하지 않으므로 후보 수에 거의 선형
+  기본값(48개 해시, 16구간 × 3행)에서 자카드 0.5인 쌍이 비교 대상이 될 확률 약 88%, 0.7이면 99.7%
+"""
+
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+
+EMPTY_SIGNATURE = 1 << 32  # 토큰이 없는 문서의 서명 값 (어떤 해시 값보다 큼)
+
+
+@lru_cache(maxsize=8)
+def _hash_functions(num_perm, seed):
+    """
+    MinHash 해시 함수 계수 (a: 홀수, b) - 같은 (num_perm, seed)면 프로세스와 무관하게 같은 값
+    uint64 배열 연산은 2^64에서 조용히 넘치므로 mod 2^64가 그대로 계산됨
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 1 << 64, size=num_perm, dtype=np.uint64, endpoint=False) | np.uint64(1)
+    b = rng.integers(0, 1 << 64, size=num_perm, dtype=np.uint64, endpoint=False)
+    return a, b
+
+
+def token_hashes(tokens):
+    """토큰 목록 → 32비트 해시 배열 (uint64) - Python hash()와 달리 프로세스마다 같은 값"""
+    digests = b''.join(hashlib.blake2b(token.encode('utf-8'), digest_size=4).digest() for token in tokens)
+    return np.frombuffer(digests, dtype='<u4').astype(np.uint64)
+
+
+def minhash_signatures(token_sets, num_perm=48, seed=1):
+    """
+    토큰 집합 목록 → (문서 수 × num_perm) uint64 MinHash 서명
+    전체 토큰을 한 배열로 해시한 뒤 문서별 최솟값을 reduceat으로 계산 (빈 문서는 EMPTY_SIGNATURE)
+    token_sets의 각 원소는 중복 없는 토큰 모음 (frozenset 등)
+    """
+    a, b = _hash_functions(num_perm, seed)
+    lengths = np.fromiter((len(tokens) for tokens in token_sets), dtype=np.int64, count=len(token_sets))
+    signatures = np.full((len(token_sets), num_perm), EMPTY_SIGNATURE, dtype=np.uint64)
+
+    nonempty = np.flatnonzero(lengths)
+    if len(nonempty) == 0:
+        return signatures
+
+    # 같은 토큰(곡 제목 / 채널명이 반복되는 검색 결과)은 한 번만 해시
+    unique = {}
+    positions = np.fromiter(
+        (unique.setdefault(token, len(unique)) for tokens in token_sets for token in tokens),
+        dtype=np.int64, count=int(lengths.sum())
+    )
+    hashes = token_hashes(unique)
+    values = ((hashes[:, None] * a + b) >> np.uint64(32))[positions]
+    starts = (np.cumsum(lengths) - lengths)[nonempty]
+    signatures[nonempty] = np.minimum.reduceat(values, starts, axis=0)
+    return signatures
+
+
+def jaccard(tokens1, tokens2):
+    """두 토큰 집합의 자카드 유사도"""
+    if not tokens1 or not tokens2:
+        return 0.0
+    intersection = len(tokens1 & tokens2)
+    return intersection / (len(tokens1) + len(tokens2) - intersection)
+
+
+class NearDuplicateFilter:
+    """
+    증분 근사 중복 필터 (요청 하나 동안 사용 - 스트리밍 요청은 같은 필터로 청크마다 keep 호출)
+    버킷에는 남긴 대표 후보만 넣으므로 메모리는 대표 후보 수에 비례
+
+    threshold: 대표 후보와의 자카드 유사도가 이 값 이상이면 중복
+    num_perm: MinHash 해시 수, bands: LSH 구간 수 (num_perm의 약수)
+    """
+
+    def __init__(self, threshold=0.5, num_perm=48, bands=16, seed=1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm({num_perm})은 bands({bands})의 배수여야 합니다.")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.seed = seed
+
+        # 구간(행 rows개)을 uint64 하나로 줄이는 구간별 계수 - 구간마다 계수가 달라 한 딕셔너리에 함께 보관
+        # (해시가 충돌해도 실제 자카드로 다시 확인하므로 결과에는 영향 없음)
+        rows = num_perm // bands
+        self._band_mix = np.random.default_rng(seed + 1).integers(
+            0, 1 << 64, size=(bands, rows), dtype=np.uint64, endpoint=False) | np.uint64(1)
+
+        self._buckets = {}     # 구간 해시 → [대표 번호, ...]
+        self._token_sets = []  # 대표 번호 → 토큰 집합
+
+        self.seen = 0
+        self.collapsed = 0
+
+    def _band_keys(self, signatures):
+        """서명 → (문서 수 × bands) 구간 해시"""
+        banded = signatures.reshape(len(signatures), self.bands, -1)
+        return (banded * self._band_mix).sum(axis=2, dtype=np.uint64)
+
+    def keep(self, token_lists):
+        """
+        토큰 목록들을 순서대로 처리해 남길지 판단 (앞서 남긴 대표 후보와 중복이면 False)
+        토큰이 없는 문서는 비교할 근거가 없으므로 항상 남김
+        반환: 입력과 같은 길이의 bool 목록
+        """
+        documents = [frozenset(tokens) for tokens in token_lists]
+        band_keys = self._band_keys(minhash_signatures(documents, self.num_perm, self.seed)).tolist()
+        buckets = self._buckets
+        token_sets = self._token_sets
+
+        kept = []
+        for tokens, keys in zip(documents, band_keys):
+            self.seen += 1
+            if not tokens:
+                kept.append(True)
+                continue
+
+            candidates = set()
+            for key in keys:
+                reps = buckets.get(key)
+                if reps:
+                    candidates.update(reps)
+
+            if candidates and any(jaccard(tokens, token_sets[rep]) >= self.threshold for rep in candidates):
+                self.collapsed += 1
+                kept.append(False)
+                continue
+
+            rep = len(token_sets)
+            token_sets.append(tokens)
+            for key in keys:
+                reps = buckets.get(key)
+                if reps is None:
+                    buckets[key] = [rep]
+                else:
+                    reps.append(rep)
+            kept.append(True)
+
+        return kept
@@ -0,0 +1,187 @@
+"""
+사용자 취향 프로필 저장소 (SQLite)
+userId + 감정별로 미리 계산한 TF-IDF 프로필과 언어 선호도를 보관
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+
+class ProfileStore:
+    """
+    (userId, emotion) → 프로필 저장소
+    emotion이 빈 문자열('')이면 감정 구분 없는 전체 프로필
+    스레드마다 별도 연결을 사용하고, WAL 모드로 여러 프로세스에서 동시에 읽을 수 있음
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS user_profiles (
+                user_id TEXT NOT NULL,
+                emotion TEXT NOT NULL DEFAULT '',
+                profile TEXT NOT NULL,
+                language_preference TEXT NOT NULL,
+                music_count INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL,
+                state TEXT,
+                PRIMARY KEY (user_id, emotion)
+            )
+            '''
+        )
+
+        # state 컬럼이 없던 기존 DB 마이그레이션
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(user_profiles)')}
+        if 'state' not in columns:
+            conn.execute('ALTER TABLE user_profiles ADD COLUMN state TEXT')
+
+        conn.commit()
+
+    def _connect(self):
+        """
+        현재 스레드의 SQLite 연결 반환 (없으면 생성)
+        fork 이전에 만든 연결은 자식 프로세스에서 공유하면 안 되므로 프로세스가 바뀌면 새로 연결
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, user_id, emotion='', include_state=False):
+        """
+        저장된 프로필 조회
+        반환: {'userId', 'emotion', 'profile', 'languagePreference', 'musicCount', 'updatedAt'} 또는 None
+        include_state: True면 증분 갱신용 상태('state')도 포함
+        """
+        row = self._connect().execute(
+            '''
+            SELECT profile, language_preference, music_count, updated_at, state
+            FROM user_profiles WHERE user_id = ? AND emotion = ?
+            ''',
+            (str(user_id), emotion or '')
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        profile, language_preference, music_count, updated_at, state = row
+        stored_profile = {
+            'userId': str(user_id),
+            'emotion': emotion or '',
+            'profile': json.loads(profile),
+            'languagePreference': json.loads(language_preference),
+            'musicCount': music_count,
+            'updatedAt': updated_at
+        }
+
+        if include_state:
+            stored_profile['state'] = json.loads(state) if state else None
+
+        return stored_profile
+
+    def save(self, user_id, emotion, profile, language_preference, music_count, state=None):
+        """
+        프로필 저장 (같은 userId + emotion이면 덮어씀)
+        state: 증분 갱신용 상태 (최근 재생 윈도우, 문서 빈도 등)
+        """
+        conn = self._connect()
+        self._write(conn, user_id, emotion, profile, language_preference, music_count, state)
+        conn.commit()
+
+        return self.get(user_id, emotion)
+
+    def save_many(self, profiles):
+        """
+        프로필 여러 개를 한 트랜잭션으로 저장 (일괄 재계산 결과 적재용, 같은 userId + emotion이면 덮어씀)
+        profiles: [{'userId', 'emotion', 'profile', 'languagePreference', 'musicCount', 'state'}, ...]
+        반환: 저장한 프로필 수
+        """
+        conn = self._connect()
+        count = 0
+        try:
+            for profile in profiles:
+                self._write(
+                    conn,
+                    profile['userId'],
+                    profile['emotion'],
+                    profile['profile'],
+                    profile['languagePreference'],
+                    profile['musicCount'],
+                    profile.get('state')
+                )
+                count += 1
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        return count
+
+    def update(self, user_id, emotion, updater):
+        """
+        읽기-수정-쓰기를 하나의 트랜잭션으로 처리 (동시 증분 갱신 시 유실 방지)
+        updater(stored_profile 또는 None) → {'profile', 'languagePreference', 'musicCount', 'state'}
+                                          (None이면 변경 없음)
+        반환: 갱신된 프로필
+        """
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            current = self.get(user_id, emotion, include_state=True)
+            updated = updater(current)
+            if updated is None:
+                conn.rollback()
+                return self.get(user_id, emotion)
+
+            self._write(
+                conn, user_id, emotion,
+                updated['profile'],
+                updated['languagePreference'],
+                updated['musicCount'],
+                updated['state']
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        return self.get(user_id, emotion)
+
+    def _write(self, conn, user_id, emotion, profile, language_preference, music_count, state):
+        """프로필 행 쓰기 (커밋은 호출자가 처리)"""
+        updated_at = datetime.now(timezone.utc).isoformat()
+
+        conn.execute(
+            '''
+            INSERT OR REPLACE INTO user_profiles
+                (user_id, emotion, profile, language_preference, music_count, updated_at, state)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''',
+            (
+                str(user_id),
+                emotion or '',
+                json.dumps(profile, ensure_ascii=False),
+                json.dumps(language_preference, ensure_ascii=False),
+                music_count,
+                updated_at,
+                json.dumps(state, ensure_ascii=False) if state is not None else None
+            )
+        )
+
+    def count(self):
+        """저장된 프로필 수"""
+        return self._connect().execute('SELECT COUNT(*) FROM user_profiles').fetchone()[0]
@@ -0,0 +1,128 @@
+"""
+페이지 커서용 채점 결과 저장소 (워커 간 공유 SQLite + 워커별 LRU 캐시)
+gunicorn 워커는 메모리를 공유하지 않으므로 첫 페이지를 채점한 워커와 다음 페이지를 받은 워커가 달라도
+같은 채점 결과를 이어서 읽을 수 있도록 파일(SQLite, WAL)에 보관
+같은 워커로 온 다음 페이지 요청은 워커별 LRU 캐시에서 바로 읽음
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from lru_cache import LRUCache
+
+
+class RankingStore:
+    """
+    ranking_id → 채점 결과 (JSON으로 저장할 수 있는 딕셔너리)
+    path가 없으면 워커별 캐시만 사용 (다른 워커로 간 커서는 만료와 같이 처리됨)
+    max_size: 파일에 보관할 최대 항목 수 (정리할 때 만료 시각이 가까운 항목부터 삭제)
+    ttl: 항목 유효 시간(초) - 워커 간에 비교하므로 벽시계 시각(time.time) 기준
+    """
+
+    def __init__(self, path=None, max_size=1000, ttl=600, cache_size=None, cleanup_every=100):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cleanup_every = cleanup_every
+
+        self.cache = LRUCache(max_size=cache_size or max_size, ttl=ttl)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.shared_hits = 0  # 다른 워커가 저장한 결과를 파일에서 읽은 횟수
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = self._connect()
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS rankings (
+                    ranking_id TEXT PRIMARY KEY,
+                    ranking TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                '''
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS rankings_expires_at ON rankings (expires_at)')
+            conn.commit()
+
+    def _connect(self):
+        """
+        현재 스레드의 SQLite 연결 반환 (없으면 생성)
+        fork 이전에 만든 연결은 자식 프로세스에서 공유하면 안 되므로 프로세스가 바뀌면 새로 연결
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA synchronous=NORMAL')  # WAL에서는 커밋마다 fsync하지 않아도 손상되지 않음
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, ranking_id):
+        """채점 결과 조회 (만료됐거나 없으면 None)"""
+        ranking = self.cache.get(ranking_id)
+        if ranking is not None or not self.path:
+            return ranking
+
+        row = self._connect().execute(
+            'SELECT ranking FROM rankings WHERE ranking_id = ? AND expires_at > ?',
+            (ranking_id, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+
+        ranking = json.loads(row[0])
+        self.cache.set(ranking_id, ranking)
+        with self._lock:
+            self.shared_hits += 1
+        return ranking
+
+    def set(self, ranking_id, ranking):
+        """채점 결과 저장 (cleanup_every번 저장할 때마다 만료 / 초과 항목 정리)"""
+        self.cache.set(ranking_id, ranking)
+        if not self.path:
+            return
+
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO rankings (ranking_id, ranking, expires_at) VALUES (?, ?, ?)',
+            (ranking_id, json.dumps(ranking, ensure_ascii=False), time.time() + self.ttl)
+        )
+        conn.commit()
+
+        with self._lock:
+            self._writes += 1
+            cleanup = self._writes % self.cleanup_every == 0
+        if cleanup:
+            self.cleanup()
+
+    def cleanup(self):
+        """만료된 항목 삭제 + max_size개 초과분 삭제 (만료 시각이 가까운 항목부터)"""
+        if not self.path:
+            return
+        conn = self._connect()
+        conn.execute('DELETE FROM rankings WHERE expires_at <= ?', (time.time(),))
+        conn.execute(
+            '''
+            DELETE FROM rankings WHERE ranking_id NOT IN (
+                SELECT ranking_id FROM rankings ORDER BY expires_at DESC LIMIT ?
+            )
+            ''',
+            (self.max_size,)
+        )
+        conn.commit()
+
+    def stats(self):
+        """저장소 통계 (/health 응답용 - 워커별 캐시 통계 + 파일에서 읽은 횟수)"""
+        stats = self.cache.stats()
+        stats.update(path=self.path, sharedHits=self.shared_hits)
+        return stats
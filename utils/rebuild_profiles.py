@@ -0,0 +1,377 @@
+"""
+사용자 프로필 일괄 재계산 도구 (music_history 덤프 → 프로필 파일 → 프로필 저장소)
+토큰화 / 가중치 계산을 바꾼 뒤 전체 사용자 프로필을 사용자별 HTTP 호출(updateUserProfile) 없이 다시 만들 때 사용
+
+    mongoexport --collection music_history --sort '{userId: 1}' --out music_history.jsonl
+    mongoexport --collection emotions --fields _id,emotion --out emotions.jsonl
+    python utils/rebuild_profiles.py build --input music_history.jsonl --emotions emotions.jsonl --sorted \
+        --out profiles.jsonl --corpus-out corpus_idf.rebuild.json
+    python utils/rebuild_profiles.py corpus-install corpus_idf.rebuild.json
+    python utils/rebuild_profiles.py load profiles.jsonl --store utils/data/profiles.sqlite3
+
+    python utils/rebuild_profiles.py build --input music_history.jsonl --emotions emotions.jsonl --format mongo --out user_profiles.jsonl
+    mongoimport --collection user_profiles --mode upsert --upsertFields userId --file user_profiles.jsonl
+
+- 사용자별 최근 재생 기록 --history-limit개(Node의 MUSIC.HISTORY_LIMIT)로 /profile/refresh와 같은 프로필 계산
+  (store: 전체 프로필('') + 기록에 등장한 감정별 프로필, mongo: 전체 프로필만 - UserProfile 모델 형식)
+- 사용자를 --chunk-size명씩 묶어 프로세스 풀(fork)에 나눠 처리 (진행 중인 묶음은 워커 수의 2배까지만 유지)
+- --sorted: 입력이 userId 순이면 사용자 하나씩 흘려보내므로 메모리가 사용자 수와 무관
+  (없으면 사용자별 최근 기록만 메모리에 모은 뒤 처리)
+- 코퍼스 IDF 모드(IDF_MODE=corpus, 기본)에서는 덤프의 모든 영상을 코퍼스에 먼저 반영한 뒤 계산
+  서버의 코퍼스 파일(CORPUS_IDF_PATH)은 읽기만 하고 반영한 코퍼스는 --corpus-out 경로에 저장
+  → 서버 파일 교체는 corpus-install로 따로 수행 (프로필은 이 코퍼스 기준이므로 load 전에 설치)
+"""
+
+import argparse
+import functools
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from profile_store import ProfileStore
+
+# fork한 워커가 그대로 사용 (build_command에서 로드)
+service = None
+corpus = None  # 서버 코퍼스 IDF의 메모리 사본 (코퍼스 IDF 모드가 아니면 None)
+
+
+# ========================================
+# 1. 입력 (mongoexport JSONL)
+# ========================================
+
+def read_jsonl(path):
+    """JSONL 파일 → 레코드 (빈 줄은 건너뜀, 잘못된 줄은 줄 번호와 함께 ValueError)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_number}: JSON 형식이 아닙니다 ({e})")
+
+
+def iso_timestamp(moment):
+    """datetime → JavaScript Date.toISOString() 형식 (Node가 보내는 playedAt과 같은 문자열)"""
+    moment = moment.astimezone(timezone.utc)
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.') + f"{moment.microsecond // 1000:03d}Z"
+
+
+def mongo_value(value):
+    """mongoexport 확장 JSON 값 → 문자열 ({"$oid"} → ID, {"$date"} → ISO 시각)"""
+    if not isinstance(value, dict):
+        return value
+    if '$oid' in value:
+        return value['$oid']
+    if '$date' in value:
+        date = value['$date']
+        if isinstance(date, dict):
+            date = int(date['$numberLong'])
+        if isinstance(date, (int, float)):
+            return iso_timestamp(datetime.fromtimestamp(date / 1000, tz=timezone.utc))
+        return iso_timestamp(datetime.fromisoformat(date.replace('Z', '+00:00')))
+    return value
+
+
+def load_emotion_names(path):
+    """emotions 덤프 → {emotionId: 감정 이름}"""
+    if not path:
+        return {}
+    return {mongo_value(record['_id']): record.get('emotion') for record in read_jsonl(path)}
+
+
+def read_history(path, emotion_names):
+    """
+    music_history 덤프 → (userId, 재생 기록 항목) - 항목은 Node가 /profile/refresh로 보내는 형식과 같음
+    감정: emotionId를 emotions 덤프에서 조회 (populate된 덤프면 emotionId.emotion, 찾지 못하면 Node처럼 'unknown')
+    """
+    for record in read_jsonl(path):
+        emotion_id = record.get('emotionId')
+        if isinstance(emotion_id, dict) and 'emotion' in emotion_id:
+            emotion = emotion_id['emotion']
+        else:
+            emotion = emotion_names.get(mongo_value(emotion_id))
+
+        yield mongo_value(record['userId']), {
+            'videoId': record.get('youtubeVideoId'),
+            'title': record.get('videoTitle', ''),
+            'channelTitle': record.get('channelTitle', ''),
+            'playedAt': mongo_value(record.get('playedAt', '')),
+            'emotion': emotion or 'unknown'
+        }
+
+
+# ========================================
+# 2. 사용자별 최근 재생 기록
+# ========================================
+
+def push_recent(window, music, limit, order):
+    """window(최소 힙)에 재생 기록 추가 - 최근 limit개만 유지 (playedAt이 같으면 나중에 읽은 기록 우선)"""
+    entry = (music['playedAt'], next(order), music)
+    if len(window) < limit:
+        heapq.heappush(window, entry)
+    elif entry[:2] > window[0][:2]:
+        heapq.heapreplace(window, entry)
+
+
+def recent_history(window):
+    """힙 → 재생 기록 (playedAt 내림차순 - Node의 sort({playedAt: -1}).limit(HISTORY_LIMIT)와 같음)"""
+    return [music for _, _, music in sorted(window, key=lambda entry: entry[:2], reverse=True)]
+
+
+def group_sorted_history(rows, limit):
+    """
+    userId 순으로 정렬된 재생 기록 → (userId, 최근 재생 기록) - 사용자 하나씩 흘려보냄
+    이미 끝난 userId가 다시 나오면 ValueError (정렬되지 않은 입력)
+    """
+    order = itertools.count()
+    finished = set()
+    user_id = None
+    window = []
+
+    for row_user_id, music in rows:
+        if row_user_id != user_id:
+            if user_id is not None:
+                yield user_id, recent_history(window)
+                finished.add(user_id)
+            if row_user_id in finished:
+                raise ValueError(f"입력이 userId 순으로 정렬되어 있지 않습니다 ({row_user_id}) - --sorted 없이 실행하세요.")
+            user_id = row_user_id
+            window = []
+        push_recent(window, music, limit, order)
+
+    if user_id is not None:
+        yield user_id, recent_history(window)
+
+
+def group_history(rows, limit):
+    """정렬되지 않은 재생 기록 → (userId, 최근 재생 기록) - 사용자별 최근 limit개만 메모리에 보관"""
+    order = itertools.count()
+    windows = {}
+    for user_id, music in rows:
+        push_recent(windows.setdefault(user_id, []), music, limit, order)
+
+    for user_id, window in windows.items():
+        yield user_id, recent_history(window)
+
+
+# ========================================
+# 3. 병렬 처리
+# ========================================
+
+def chunked(iterable, size):
+    """size개씩 묶은 목록"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def map_chunks(executor, fn, chunks, max_pending):
+    """
+    묶음을 풀에 나눠 보내고 결과를 입력 순서대로 반환 (진행 중인 묶음은 max_pending개까지 - 입력을 미리 다 읽지 않음)
+    executor가 None이면 현재 프로세스에서 차례로 실행
+    """
+    if executor is None:
+        for chunk in chunks:
+            yield fn(chunk)
+        return
+
+    pending = deque()
+    for chunk in chunks:
+        pending.append(executor.submit(fn, chunk))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def create_executor(workers):
+    """fork 프로세스 풀 (워커가 1개 이하이거나 fork를 지원하지 않으면 None)"""
+    if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+
+
+def is_object_id(value):
+    """MongoDB ObjectId 문자열(16진수 24자리)인지"""
+    return isinstance(value, str) and len(value) == 24 and all(c in '0123456789abcdef' for c in value.lower())
+
+
+def analyze_chunk(music_list):
+    """워커: 재생 기록 항목 → [(videoId, 토큰), ...] (코퍼스 집계용)"""
+    return [(music['videoId'], service.analyze_music(music)['tokens']) for music in music_list]
+
+
+def build_chunk(users, output_format='store'):
+    """
+    워커: [(userId, 최근 재생 기록), ...] → (사용자 수, 출력 줄 목록 (JSON 문자열))
+    store: (userId, 감정)별 profile_store 행, mongo: 전체 프로필을 UserProfile 모델 형식으로
+    """
+    lines = []
+    for user_id, history in users:
+        if output_format == 'mongo':
+            computed = service.compute_user_profile('', history, corpus=corpus)
+            lines.append(json.dumps({
+                'userId': {'$oid': user_id} if is_object_id(user_id) else user_id,
+                'profileVector': computed['profile'],
+                'musicCount': computed['musicCount'],
+                'lastUpdated': {'$date': iso_timestamp(datetime.now(timezone.utc))}
+            }, ensure_ascii=False))
+            continue
+
+        for emotion in service.profile_emotions(history):
+            computed = service.compute_user_profile(emotion, history, corpus=corpus)
+            lines.append(json.dumps({'userId': user_id, 'emotion': emotion, **computed}, ensure_ascii=False))
+    return len(users), lines
+
+
+# ========================================
+# 4. 명령
+# ========================================
+
+def unseen_music(rows, corpus):
+    """코퍼스에 아직 없는 영상의 재생 기록 항목 (영상마다 한 번)"""
+    queued = set()
+    for _, music in rows:
+        video_id = music['videoId']
+        if video_id and video_id not in corpus.seen and video_id not in queued:
+            queued.add(video_id)
+            yield music
+
+
+def build_command(args):
+    global service, corpus
+    import recommendation_service
+    service = recommendation_service
+
+    workers = args.workers or os.cpu_count() or 1
+    emotion_names = load_emotion_names(args.emotions)
+    started = time.perf_counter()
+
+    # 1. 코퍼스 IDF 모드면 덤프의 영상을 먼저 코퍼스 사본에 반영 (이후 워커는 고정된 사본을 fork로 물려받음)
+    #    서버 파일은 읽기만 함 - 서버가 같은 파일에 저장하는 중이어도 덮어쓰지 않음
+    corpus = service.corpus_idf.offline_copy() if service.corpus_idf is not None else None
+    if corpus is not None:
+        executor = create_executor(workers)
+        added = 0
+        try:
+            for analyzed in map_chunks(
+                executor, analyze_chunk,
+                chunked(unseen_music(read_history(args.input, emotion_names), corpus), args.chunk_size * 10),
+                workers * 2
+            ):
+                added += corpus.add_documents(analyzed)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        corpus.refresh()
+        print(f"코퍼스: {added}개 영상 추가 (전체 {corpus.num_docs}개, {time.perf_counter() - started:.1f}초)")
+        if args.corpus_out:
+            corpus.write(args.corpus_out)
+            print(f"코퍼스 IDF 저장: {args.corpus_out} (서버 파일에 반영하려면 corpus-install)")
+        else:
+            print("--corpus-out이 없어 코퍼스 사본은 저장하지 않음 (프로필은 서버 코퍼스와 다른 IDF 기준)")
+    elif args.corpus_out:
+        print("코퍼스 IDF 모드가 아니므로 --corpus-out은 저장하지 않음")
+
+    # 2. 사용자별 프로필 계산
+    rows = read_history(args.input, emotion_names)
+    users = group_sorted_history(rows, args.history_limit) if args.sorted else group_history(rows, args.history_limit)
+
+    user_count = 0
+    line_count = 0
+    executor = create_executor(workers)
+    tmp_path = f"{args.out}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as out:
+            for chunk_user_count, lines in map_chunks(
+                executor, functools.partial(build_chunk, output_format=args.format),
+                chunked(users, args.chunk_size), workers * 2
+            ):
+                if lines:
+                    out.write('\n'.join(lines) + '\n')
+                user_count += chunk_user_count
+                line_count += len(lines)
+        os.replace(tmp_path, args.out)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    elapsed = time.perf_counter() - started
+    print(f"저장: {args.out} (사용자 {user_count}명, 프로필 {line_count}개, 워커 {workers}개, {elapsed:.1f}초)")
+    return 0
+
+
+def load_command(args):
+    """build로 만든 store 형식 파일 → 프로필 저장소 (--batch-size개씩 한 트랜잭션)"""
+    store = ProfileStore(args.store)
+    started = time.perf_counter()
+
+    loaded = 0
+    for batch in chunked(read_jsonl(args.path), args.batch_size):
+        loaded += store.save_many(batch)
+
+    print(f"적재: {args.store} (프로필 {loaded}개, {time.perf_counter() - started:.1f}초)")
+    return 0
+
+
+def corpus_install_command(args):
+    """build --corpus-out으로 만든 코퍼스 IDF를 서버 파일로 교체 (서버 실행 중에도 가능 - 파일 잠금 + revision 증가)"""
+    from corpus_idf import CorpusIDF
+
+    corpus = CorpusIDF(args.corpus, snapshot_interval=0)
+    before = corpus.revision
+    table = corpus.install(args.path)
+    print(f"설치: {args.path} → {args.corpus} (revision {before} → {table.revision}, 문서 {table.num_docs}개)")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='사용자 프로필 일괄 재계산 / 적재')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='music_history 덤프(JSONL)로 프로필 파일 생성')
+    build.add_argument('--input', required=True, help='music_history 덤프 (mongoexport JSONL)')
+    build.add_argument('--emotions', help='emotions 덤프 (emotionId → 감정 이름)')
+    build.add_argument('--out', required=True, help='저장할 프로필 파일 (JSONL)')
+    build.add_argument('--format', choices=('store', 'mongo'), default='store',
+                       help='store: 프로필 저장소(load 명령), mongo: user_profiles 컬렉션(mongoimport)')
+    build.add_argument('--sorted', action='store_true', help='입력이 userId 순으로 정렬되어 있음 (메모리 사용 최소화)')
+    build.add_argument('--workers', type=int, default=0, help='프로세스 수 (기본: CPU 코어 수, 1이면 풀 없이 실행)')
+    build.add_argument('--chunk-size', type=int, default=200, help='워커에 한 번에 넘기는 사용자 수')
+    build.add_argument('--history-limit', type=int, default=20, help='사용자별 최근 재생 기록 수 (Node의 MUSIC.HISTORY_LIMIT)')
+    build.add_argument('--corpus-out', help='덤프의 영상을 반영한 코퍼스 IDF를 저장할 경로 (서버의 CORPUS_IDF_PATH와 다른 경로)')
+    build.set_defaults(handler=build_command)
+
+    install = commands.add_parser('corpus-install', help='build --corpus-out 파일을 서버 코퍼스 IDF 파일로 교체')
+    install.add_argument('path')
+    install.add_argument('--corpus', default=os.environ.get(
+        'CORPUS_IDF_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'corpus_idf.json')))
+    install.set_defaults(handler=corpus_install_command)
+
+    load = commands.add_parser('load', help='store 형식 프로필 파일을 프로필 저장소에 적재')
+    load.add_argument('path')
+    load.add_argument('--store', default=os.environ.get(
+        'PROFILE_STORE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'profiles.sqlite3')))
+    load.add_argument('--batch-size', type=int, default=1000)
+    load.set_defaults(handler=load_command)
+
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    sys.exit(arguments.handler(arguments))
@@ -1,4 +1,5 @@
 const axios = require("axios");
+const { PassThrough } = require("stream");
 const { getMultilingualKeywordsBatch } = require("./emotionMapper");
 const { MUSIC, KEYWORDS, API } = require("../config/constants");
 
@@ -56,10 +57,27 @@ const generateKeywords = async (emotion, playedHistory) => {
  * @returns {Promise<Array>} 추천된 음악 목록
  */
 const getRecommendations = async (userId, emotion, candidateMusic, playedHistory) => {
+  const { musicList } = await getRecommendationPage(userId, emotion, candidateMusic, playedHistory);
+  return musicList;
+};
+
+/**
+ * Python 추천 서버 호출 (상위 k개만 받고 나머지는 커서로 이어서 요청)
+ * 간결 응답(videoId / 점수 배열)을 받아 가지고 있던 후보 메타데이터와 합침
+ * @param {string} userId - 사용자 ID
+ * @param {string} emotion - 현재 감정
+ * @param {Array} candidateMusic - 후보 음악 목록
+ * @param {Array} playedHistory - 재생 기록
+ * @param {number} [k] - 페이지 크기 (생략하면 전체)
+ * @returns {Promise<{musicList: Array, totalCount: number, nextCursor: string|null}>}
+ */
+const getRecommendationPage = async (userId, emotion, candidateMusic, playedHistory, k) => {
   try {
     const recommendResponse = await axios.post(`${RECOMMENDATION_API_URL}/recommend`, {
       userId: userId,
       emotion: emotion,
+      k: k,
+      compact: true,
       candidateMusic: candidateMusic.map(music => ({
         videoId: music.videoId,
         title: music.title,
@@ -79,19 +97,247 @@ const getRecommendations = async (userId, emotion, candidateMusic, playedHistory
     });
 
     if (recommendResponse.data.success) {
-      console.log(`[Music] 추천 서버 응답 성공 - ${recommendResponse.data.data.recommendedMusic.length}개 정렬됨`);
-      return recommendResponse.data.data.recommendedMusic;
+      const { videoIds, scores, totalCount, nextCursor } = recommendResponse.data.data;
+      const candidateById = new Map(candidateMusic.map(music => [music.videoId, music]));
+      const musicList = videoIds.map((videoId, index) => ({
+        ...candidateById.get(videoId),
+        score: scores[index]
+      }));
+
+      console.log(`[Music] 추천 서버 응답 성공 - ${musicList.length}개 정렬됨`);
+      return {
+        musicList,
+        totalCount: totalCount ?? musicList.length,
+        nextCursor: nextCursor || null
+      };
     } else {
       console.warn(`[Music] 추천 서버 응답 실패 - 원본 순서 사용`);
-      return candidateMusic;
     }
   } catch (error) {
     console.error(`[Music] 추천 서버 호출 실패:`, error.message);
-    return candidateMusic;
+  }
+
+  return {
+    musicList: k ? candidateMusic.slice(0, k) : candidateMusic,
+    totalCount: candidateMusic.length,
+    nextCursor: null
+  };
+};
+
+/**
+ * Python 추천 서버 스트리밍 호출 (NDJSON - /recommend/stream)
+ * 후보를 모두 모을 때까지 기다리지 않고 send로 보내는 대로 Python 서버가 채점 (상위 k개만 유지)
+ * 상위 k개만 받으므로 nextCursor는 항상 null (추가 로딩은 카탈로그 / YouTube 검색)
+ * @param {string} userId - 사용자 ID
+ * @param {string} emotion - 현재 감정
+ * @param {Array} playedHistory - 재생 기록
+ * @param {number} k - 받을 개수
+ * @returns {{send: function(Array): void, finish: function(): Promise<{musicList: Array, totalCount: number, nextCursor: null}>}}
+ */
+const openRecommendationStream = (userId, emotion, playedHistory, k) => {
+  const body = new PassThrough();
+  const candidateById = new Map();
+
+  // 응답은 본문을 모두 보낸 뒤에 오므로 오류는 finish에서 처리
+  const responsePromise = axios.post(`${RECOMMENDATION_API_URL}/recommend/stream`, body, {
+    headers: { "Content-Type": "application/x-ndjson" },
+    responseType: "text",
+    maxBodyLength: Infinity
+  }).catch(error => ({ error }));
+
+  // 첫 줄: 요청 옵션
+  body.write(JSON.stringify({
+    userId: userId,
+    emotion: emotion,
+    k: k,
+    compact: true,
+    playedHistory: playedHistory.map(music => ({
+      videoId: music.youtubeVideoId,
+      title: music.videoTitle,
+      channelTitle: music.channelTitle,
+      playedAt: music.playedAt,
+      emotion: music.emotionId?.emotion || 'unknown'
+    }))
+  }) + "\n");
+
+  const send = (musicList) => {
+    musicList.forEach(music => candidateById.set(music.videoId, music));
+    body.write(JSON.stringify(musicList.map(music => ({
+      videoId: music.videoId,
+      title: music.title,
+      description: music.description || '',
+      channelTitle: music.channelTitle,
+      thumbnailUrl: music.thumbnailUrl,
+      duration: music.duration,
+      tags: music.tags || []
+    }))) + "\n");
+  };
+
+  const finish = async () => {
+    body.end();
+    const response = await responsePromise;
+
+    try {
+      if (response.error) throw response.error;
+
+      // 첫 줄: 요약, 이후: 점수 순 추천 항목
+      const [summary, ...items] = response.data.split("\n").filter(line => line).map(line => JSON.parse(line));
+      if (summary.success) {
+        const musicList = items.map(({ videoId, score }) => ({ ...candidateById.get(videoId), score }));
+        console.log(`[Music] 추천 서버 스트리밍 응답 성공 - ${summary.data.totalCount}개 중 ${musicList.length}개`);
+        return { musicList, totalCount: summary.data.totalCount, nextCursor: null };
+      }
+      console.warn(`[Music] 추천 서버 스트리밍 응답 실패 - 원본 순서 사용`);
+    } catch (error) {
+      console.error(`[Music] 추천 서버 스트리밍 호출 실패:`, error.message);
+    }
+
+    const candidateMusic = Array.from(candidateById.values());
+    return { musicList: candidateMusic.slice(0, k), totalCount: candidateMusic.length, nextCursor: null };
+  };
+
+  return { send, finish };
+};
+
+/**
+ * 이전 추천 결과의 다음 페이지 요청 (Python 서버가 채점 결과를 재사용하므로 재검색 / 재채점 없음)
+ * @param {string} userId - 사용자 ID
+ * @param {string} cursor - 이전 응답의 nextCursor
+ * @param {number} [k] - 페이지 크기 (생략하면 첫 요청과 동일)
+ * @returns {Promise<{musicList: Array, totalCount: number, nextCursor: string|null}|null>} 커서가 만료되었으면 null
+ */
+const getNextRecommendationPage = async (userId, cursor, k) => {
+  try {
+    const recommendResponse = await axios.post(`${RECOMMENDATION_API_URL}/recommend`, {
+      userId: userId,
+      cursor: cursor,
+      k: k
+    });
+
+    if (!recommendResponse.data.success) {
+      return null;
+    }
+
+    const { recommendedMusic, totalCount, nextCursor } = recommendResponse.data.data;
+    return { musicList: recommendedMusic, totalCount, nextCursor: nextCursor || null };
+  } catch (error) {
+    // 404: 커서 만료 → 호출 측에서 새로 검색
+    if (error.response?.status !== 404) {
+      console.error(`[Music] 추천 다음 페이지 요청 실패:`, error.message);
+    }
+    return null;
+  }
+};
+
+/**
+ * Python 추천 서버의 로컬 카탈로그(이전에 본 후보 음악)에서 추천 요청 (YouTube 검색 없음)
+ * 카탈로그는 Python 워커 프로세스별 (스냅샷 이후 색인한 후보는 그 후보를 받은 워커에만 있음)
+ * 다음 페이지는 getNextRecommendationPage로 요청 (워커 간 공유되는 커서 - 같은 순서로 이어짐)
+ * @param {string} userId - 사용자 ID
+ * @param {string} emotion - 현재 감정 (이 감정으로 받은 후보만 추천)
+ * @param {Array} playedHistory - 재생 기록
+ * @param {string[]} excludeVideoIds - 이미 받은 음악 videoId
+ * @param {number} k - 페이지 크기
+ * @returns {Promise<{musicList: Array, totalCount: number, nextCursor: string|null}|null>} 카탈로그를 쓸 수 없으면 null
+ */
+const getCatalogRecommendations = async (userId, emotion, playedHistory, excludeVideoIds, k) => {
+  try {
+    const catalogResponse = await axios.post(`${RECOMMENDATION_API_URL}/recommend/catalog`, {
+      userId: userId,
+      emotion: emotion,
+      k: k,
+      excludeVideoIds: excludeVideoIds,
+      playedHistory: playedHistory.map(music => ({
+        videoId: music.youtubeVideoId,
+        title: music.videoTitle,
+        channelTitle: music.channelTitle,
+        playedAt: music.playedAt,
+        emotion: music.emotionId?.emotion || 'unknown'
+      }))
+    });
+
+    if (!catalogResponse.data.success) {
+      return null;
+    }
+
+    const { recommendedMusic, totalCount, nextCursor } = catalogResponse.data.data;
+    console.log(`[Music] 카탈로그 추천 - ${recommendedMusic.length}개 (카탈로그 ${catalogResponse.data.data.catalogSize}개)`);
+    return { musicList: recommendedMusic, totalCount, nextCursor: nextCursor || null };
+  } catch (error) {
+    // 503: 카탈로그 비활성화 → 호출 측에서 YouTube 검색
+    if (error.response?.status !== 503) {
+      console.error(`[Music] 카탈로그 추천 요청 실패:`, error.message);
+    }
+    return null;
+  }
+};
+
+/**
+ * Python 추천 서버에 사용자 프로필 재계산 요청
+ * (전체 프로필 + 재생 기록에 등장한 감정별 프로필을 Python 서버에 저장)
+ * @param {string} userId - 사용자 ID
+ * @param {Array} playedHistory - 재생 기록
+ * @returns {Promise<Object|null>} 감정 구분 없는 전체 프로필 (실패 시 null)
+ */
+const refreshUserProfile = async (userId, playedHistory) => {
+  const profileResponse = await axios.post(`${RECOMMENDATION_API_URL}/profile/refresh`, {
+    userId: userId,
+    playedHistory: playedHistory.map(music => ({
+      videoId: music.youtubeVideoId,
+      title: music.videoTitle,
+      channelTitle: music.channelTitle,
+      playedAt: music.playedAt,
+      emotion: music.emotionId?.emotion || 'unknown'
+    }))
+  });
+
+  if (!profileResponse.data.success) {
+    return null;
+  }
+
+  return profileResponse.data.data.profiles.find(profile => profile.emotion === '') || null;
+};
+
+/**
+ * Python 추천 서버에 새로 재생한 음악 하나를 프로필에 증분 반영 요청
+ * @param {string} userId - 사용자 ID
+ * @param {Object} music - 새로 재생한 음악 (재생 기록 항목)
+ * @returns {Promise<Object|null>} 감정 구분 없는 전체 프로필 (Python에 저장된 프로필이 없으면 null)
+ */
+const appendUserProfile = async (userId, music) => {
+  try {
+    const profileResponse = await axios.post(`${RECOMMENDATION_API_URL}/profile/append`, {
+      userId: userId,
+      music: {
+        videoId: music.youtubeVideoId,
+        title: music.videoTitle,
+        channelTitle: music.channelTitle,
+        playedAt: music.playedAt,
+        emotion: music.emotionId?.emotion || 'unknown'
+      }
+    });
+
+    if (!profileResponse.data.success) {
+      return null;
+    }
+
+    return profileResponse.data.data.profiles.find(profile => profile.emotion === '') || null;
+  } catch (error) {
+    // 404: 아직 프로필이 없음 → 호출 측에서 전체 재계산
+    if (error.response?.status === 404) {
+      return null;
+    }
+    throw error;
   }
 };
 
 module.exports = {
   generateKeywords,
-  getRecommendations
+  getRecommendations,
+  getRecommendationPage,
+  openRecommendationStream,
+  getNextRecommendationPage,
+  getCatalogRecommendations,
+  refreshUserProfile,
+  appendUserProfile
 };
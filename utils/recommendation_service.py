@@ -3,44 +3,201 @@
 Flask API Server
 """
 
-from flask import Flask, request, jsonify
+import time
+
+# 모듈 로드 시작 시각 (Flask / numpy 등 import를 포함한 로드 시간을 /ready에 보고)
+IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 import numpy as np
-from collections import defaultdict
+from collections import defaultdict, Counter
+import os
 import re
 import math
+import heapq
 import random
+import uuid
+import json
+import hashlib
 from datetime import datetime
+import atexit
+
+from lru_cache import LRUCache
+from corpus_idf import CorpusIDF, RevisionUnavailable
+from profile_store import ProfileStore
+from ranking_store import RankingStore
+from service_logging import setup_logging, should_sample_debug
+from service_metrics import MetricsRegistry, SIZE_BUCKETS
+from service_codec import (
+    setup_content_negotiation, decode_request_body, compress_response, iter_ndjson, ndjson_response, NDJSON_MIMETYPES
+)
+from kernel_pool import KernelPool, PoolSaturated, DeadlineExceeded
+from catalog_index import CatalogIndex
+from model_snapshot import SnapshotError
+from term_vectors import TermVector, vocabulary as term_vocabulary
+from single_flight import SingleFlight
+from near_duplicates import NearDuplicateFilter
 
 app = Flask(__name__)
 CORS(app)  # CORS 허용 (Node.js에서 호출 가능하도록)
+setup_content_negotiation(app)  # JSON 기본, MessagePack / gzip 협상
+
+logger = setup_logging()
+
+# 메트릭 (/metrics, METRICS_ENABLED=0이면 기록하지 않음)
+metrics = MetricsRegistry(enabled=os.environ.get('METRICS_ENABLED', '1') != '0')
+request_counter = metrics.counter(
+    'recommendation_requests_total', '엔드포인트 / 결과별 요청 수', ('endpoint', 'outcome'))
+request_duration = metrics.histogram(
+    'recommendation_request_duration_seconds', '엔드포인트별 전체 처리 시간', ('endpoint',))
+stage_duration = metrics.histogram(
+    'recommendation_stage_duration_seconds', '엔드포인트 / 단계별 처리 시간', ('endpoint', 'stage'))
+request_size = metrics.histogram(
+    'recommendation_request_bytes', '엔드포인트별 요청 본문 크기', ('endpoint',), buckets=SIZE_BUCKETS)
+response_size = metrics.histogram(
+    'recommendation_response_bytes', '엔드포인트별 응답 본문 크기', ('endpoint',), buckets=SIZE_BUCKETS)
+
+
+def request_endpoint():
+    """메트릭 라벨용 엔드포인트 (경로 변수는 규칙 그대로 - 예: /profile/<user_id>)"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def status_outcome(status_code):
+    """log_fields에 outcome이 없을 때 상태 코드로 결과 분류"""
+    if status_code < 400:
+        return 'ok'
+    if status_code == 404:
+        return 'not_found'
+    if status_code < 500:
+        return 'invalid_request'
+    return 'error'
+
+
+def mark_stage(stage):
+    """
+    직전 단계 종료 시각부터 지금까지를 stage 처리 시간으로 기록
+    (parse → filter → profile → ... 순서로 호출)
+    """
+    if not metrics.enabled:
+        return
+    now = time.perf_counter()
+    stage_duration.observe((request_endpoint(), stage), now - g.stage_started)
+    g.stage_started = now
+
+
+def record_stages(stage_timings):
+    """
+    다른 프로세스(커널 풀)에서 측정한 단계별 시간 기록 [(stage, 초), ...]
+    기록한 시간만큼 단계 시작 시각을 옮기므로 다음 mark_stage에는 대기 / 전송 시간만 남음
+    """
+    if not metrics.enabled:
+        return
+    endpoint = request_endpoint()
+    for stage, seconds in stage_timings:
+        stage_duration.observe((endpoint, stage), seconds)
+    g.stage_started += sum(seconds for _, seconds in stage_timings)
+
+
+@app.before_request
+def start_request_log():
+    """요청 ID 부여 (X-Request-Id 헤더가 있으면 그대로 사용) 및 처리 시간 측정 시작"""
+    g.request_id = request.headers.get('X-Request-Id') or uuid.uuid4().hex
+    g.debug_sampled = should_sample_debug()
+    g.request_started = time.perf_counter()
+    g.stage_started = g.request_started
+    g.log_fields = {}
+
+
+# gzip 요청 본문은 라우트 전에 크기 제한 안에서 풀어 둠 (초과하면 413 - 요청 로그 / 메트릭은 그대로 기록)
+app.before_request(decode_request_body)
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    """요청 본문 크기 초과 (gzip 본문을 푼 크기 포함)"""
+    log_fields(outcome='too_large')
+    return jsonify({
+        'success': False,
+        'message': e.description
+    }), 413
+
+
+@app.after_request
+def finish_request_log(response):
+    """요청당 한 줄 구조화 로그 (엔드포인트, 상태 코드, 처리 시간, 요청별 요약 필드) + 응답 압축 / 메트릭 기록"""
+    mark_stage('serialize')
+    response = compress_response(response)
+    mark_stage('compress')
+    duration_ms = (time.perf_counter() - g.request_started) * 1000
+
+    if metrics.enabled:
+        endpoint = request_endpoint()
+        outcome = g.log_fields.get('outcome') or status_outcome(response.status_code)
+        request_counter.inc((endpoint, outcome))
+        request_duration.observe((endpoint,), duration_ms / 1000)
+        if request.content_length is not None:
+            request_size.observe((endpoint,), request.content_length)
+        if response.content_length is not None:
+            response_size.observe((endpoint,), response.content_length)
+
+    logger.info(
+        "%s %s %s %.1fms", request.method, request.path, response.status_code, duration_ms,
+        extra={
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'durationMs': round(duration_ms, 2),
+            'requestBytes': request.content_length,
+            **g.log_fields
+        }
+    )
+
+    response.headers['X-Request-Id'] = g.request_id
+    return response
+
+
+def log_fields(**fields):
+    """요청 완료 로그에 함께 남길 요약 필드 추가"""
+    g.log_fields.update(fields)
 
 # ========================================
 # 1. 언어 감지
 # ========================================
 
-def detect_language(text):
+# 한글 / 영어 / 일본어 문자 구간을 한 번의 스캔으로 찾는 정규식 (모듈 로드 시 한 번만 컴파일)
+SCRIPT_RUN_PATTERN = re.compile(r'([가-힣]+)|([a-zA-Z]+)|([ぁ-んァ-ヶ一-龯]+)')
+
+
+def count_script_chars(text):
     """
-    텍스트에서 언어 감지 (한글, 영어, 일본어, 기타)
+    텍스트의 언어별 문자 수 계산 (한글, 영어, 일본어)
+    반환: {'ko': n, 'en': n, 'ja': n}
     """
-    if not text:
-        return 'unknown'
+    korean_chars = english_chars = japanese_chars = 0
+
+    if text:
+        for korean, english, japanese in SCRIPT_RUN_PATTERN.findall(text):
+            korean_chars += len(korean)
+            english_chars += len(english)
+            japanese_chars += len(japanese)
+
+    return {'ko': korean_chars, 'en': english_chars, 'ja': japanese_chars}
 
-    # 각 언어 문자 개수 계산
-    korean_chars = len(re.findall(r'[가-힣]', text))
-    english_chars = len(re.findall(r'[a-zA-Z]', text))
-    japanese_chars = len(re.findall(r'[ぁ-んァ-ヶ一-龯]', text))
 
-    total_chars = korean_chars + english_chars + japanese_chars
+def detect_language_from_counts(char_counts):
+    """
+    언어별 문자 수로부터 언어 판정
+    """
+    total_chars = sum(char_counts.values())
 
     if total_chars == 0:
         return 'unknown'
 
     # 가장 많이 사용된 언어 반환
-    max_lang = max(
-        [('ko', korean_chars), ('en', english_chars), ('ja', japanese_chars)],
-        key=lambda x: x[1]
-    )
+    max_lang = max(char_counts.items(), key=lambda x: x[1])
 
     # 최소 30% 이상이어야 해당 언어로 판정
     if max_lang[1] / total_chars >= 0.3:
@@ -49,10 +206,28 @@ def detect_language(text):
     return 'unknown'
 
 
+def detect_language(text):
+    """
+    텍스트에서 언어 감지 (한글, 영어, 일본어, 기타)
+    """
+    if not text:
+        return 'unknown'
+
+    return detect_language_from_counts(count_script_chars(text))
+
+
 # ========================================
 # 2. 텍스트 전처리
 # ========================================
 
+# 토큰 패턴: 소문자 변환 후 알파벳, 숫자, 한글이 연속된 구간
+TOKEN_PATTERN = re.compile(r'[a-z0-9가-힣]+')
+
+# 불용어 (간단한 영어 불용어만)
+STOPWORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'is', 'are', 'was', 'were',
+                       'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from', 'as'})
+
+
 def preprocess_text(text):
     """
     텍스트 전처리: 소문자 변환, 특수문자 제거, 토큰화
@@ -60,24 +235,67 @@ def preprocess_text(text):
     if not text:
         return []
 
-    # 소문자 변환
-    text = text.lower()
+    # 소문자 변환 후 알파벳, 숫자, 한글 구간만 토큰으로 추출
+    # (특수문자 → 공백 치환 후 공백 기준 분리와 동일)
+    tokens = TOKEN_PATTERN.findall(text.lower())
+
+    # 불용어 및 한 글자 토큰 제거
+    return [token for token in tokens if len(token) > 1 and token not in STOPWORDS]
+
+
+def analyze_text(text):
+    """
+    단일 패스 텍스트 분석: 토큰, 언어별 문자 수, 감지된 언어를 함께 반환
+    반환: {'tokens': [...], 'charCounts': {'ko', 'en', 'ja'}, 'language': 'ko'}
+    """
+    char_counts = count_script_chars(text)
+
+    return {
+        'tokens': preprocess_text(text),
+        'charCounts': char_counts,
+        'language': detect_language_from_counts(char_counts)
+    }
+
+
+# 분석 결과 캐시 (videoId + 내용 해시 기준, 후보/재생 기록에 반복 등장하는 인기 영상 재사용)
+analysis_cache = LRUCache(
+    max_size=int(os.environ.get('ANALYSIS_CACHE_SIZE', 20000)),
+    ttl=int(os.environ.get('ANALYSIS_CACHE_TTL', 3600))
+)
+
+
+def analyze_music(music, include_tags=False):
+    """
+    음악 메타데이터(제목, 설명, 채널명) 분석 - videoId가 있으면 캐시 사용
+    include_tags: True면 태그 토큰도 포함 (언어 감지는 태그 제외 텍스트 기준)
+    반환값은 캐시와 공유되므로 수정하지 말 것
+    """
+    title = music.get('title', '')
+    description = music.get('description', '')
+    channel_title = music.get('channelTitle', '')
+    tags = music.get('tags', []) if include_tags else []
+
+    video_id = music.get('videoId')
+    cache_key = None
+    if video_id:
+        # 같은 videoId라도 제목/설명 등이 바뀌면 다시 분석
+        content_hash = hash((title, description, channel_title, tuple(tags)))
+        cache_key = (video_id, include_tags, content_hash)
+        cached = analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-    # 특수문자 제거 (알파벳, 숫자, 공백만 남김)
-    text = re.sub(r'[^a-z0-9\s가-힣]', ' ', text)
+    analysis = analyze_text(f"{title} {description} {channel_title}")
 
-    # 연속된 공백 제거
-    text = re.sub(r'\s+', ' ', text).strip()
+    if tags:
+        analysis['tokens'] = analysis['tokens'] + preprocess_text(' '.join(tags))
 
-    # 토큰화 (공백 기준)
-    tokens = text.split()
+    analysis['termCounts'] = dict(Counter(analysis['tokens']))
 
-    # 불용어 제거 (간단한 영어 불용어만)
-    stopwords = {'the', 'a', 'an', 'and', 'or', 'but', 'is', 'are', 'was', 'were',
-                 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from', 'as'}
-    tokens = [token for token in tokens if token not in stopwords and len(token) > 1]
+    if cache_key is not None:
+        analysis_cache.set(cache_key, analysis)
 
-    return tokens
+    return analysis
 
 
 # ========================================
@@ -91,8 +309,7 @@ def calculate_user_language_preference(played_history):
     language_counts = defaultdict(int)
 
     for music in played_history:
-        text = f"{music.get('title', '')} {music.get('description', '')} {music.get('channelTitle', '')}"
-        language = detect_language(text)
+        language = analyze_music(music)['language']
         language_counts[language] += 1
 
     total = sum(language_counts.values())
@@ -117,22 +334,26 @@ def calculate_tf(tokens):
     """
     Term Frequency 계산: 단어 빈도수 / 전체 단어 수
     """
-    tf = defaultdict(float)
-    total_terms = len(tokens)
-
-    if total_terms == 0:
-        return tf
+    if len(tokens) == 0:
+        return defaultdict(float)
 
     # 각 단어의 빈도수 계산
     term_counts = defaultdict(int)
     for token in tokens:
         term_counts[token] += 1
 
-    # TF 계산 (빈도수 / 전체 단어 수)
-    for term, count in term_counts.items():
-        tf[term] = count / total_terms
+    return calculate_tf_from_counts(term_counts, len(tokens))
+
+
+def calculate_tf_from_counts(term_counts, total_terms):
+    """
+    단어별 빈도수로부터 TF 계산 (분석 캐시의 termCounts 재사용)
+    """
+    if total_terms == 0:
+        return {}
 
-    return dict(tf)
+    # TF 계산 (빈도수 / 전체 단어 수)
+    return {term: count / total_terms for term, count in term_counts.items()}
 
 
 def calculate_idf(documents):
@@ -170,6 +391,49 @@ def calculate_tfidf(tf, idf):
     return tfidf
 
 
+# 전체 코퍼스 IDF (지금까지 본 모든 후보 / 재생 기록 기준, CORPUS_SNAPSHOT_INTERVAL초마다 새 revision 공개 + 디스크에 저장)
+# IDF_MODE=request면 이전처럼 요청마다 후보(또는 재생 기록) 기준으로 IDF 계산
+if os.environ.get('IDF_MODE', 'corpus') == 'corpus':
+    corpus_idf = CorpusIDF(
+        os.environ.get('CORPUS_IDF_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'corpus_idf.json')),
+        snapshot_interval=int(os.environ.get('CORPUS_SNAPSHOT_INTERVAL', 300)),
+        max_seen=int(os.environ.get('CORPUS_MAX_SEEN', 200000))
+    )
+    atexit.register(corpus_idf.save)
+else:
+    corpus_idf = None
+
+# 공개된 코퍼스 문서가 이보다 적으면 요청별 IDF로 채점 (처음 시작한 서버는 첫 갱신 전까지 문서가 0개라
+# 코퍼스 IDF를 쓰면 모든 단어의 IDF가 1 → TF만으로 순위가 정해짐), 문서 집계는 그대로 계속함
+CORPUS_MIN_DOCS = int(os.environ.get('CORPUS_MIN_DOCS', 100))
+
+
+def current_corpus():
+    """
+    요청 하나에 고정해서 사용할 코퍼스 IDF (IDFTable)
+    요청 시작 시 한 번 받아 취향 벡터 / 후보 채점에 같은 값을 넘김
+    IDF_MODE=request이거나 공개된 문서가 CORPUS_MIN_DOCS개 미만이면 None (요청별 IDF)
+    """
+    if corpus_idf is None:
+        return None
+    corpus = corpus_idf.current()
+    return corpus if corpus.num_docs >= CORPUS_MIN_DOCS else None
+
+
+def corpus_documents(music_list, include_tags=False):
+    """코퍼스 집계용 [(videoId, 토큰), ...] (분석 캐시 사용)"""
+    return [(music.get('videoId'), analyze_music(music, include_tags=include_tags)['tokens']) for music in music_list]
+
+
+def record_corpus_documents(documents):
+    """
+    요청에서 본 문서를 코퍼스에 집계 (다음 revision부터 IDF에 반영 - 현재 요청의 점수는 바뀌지 않음)
+    documents: [(videoId, 토큰), ...], 워밍업 샘플 요청은 집계하지 않음
+    """
+    if corpus_idf is not None and not service_state['warming']:
+        corpus_idf.add_documents(documents)
+
+
 # ========================================
 # 3. 코사인 유사도 계산
 # ========================================
@@ -199,220 +463,1317 @@ def cosine_similarity(vec1, vec2):
 
 
 # ========================================
-# 4. 사용자 취향 벡터 생성
+# 3-1. 후보 음악 일괄 유사도 계산 (희소 행렬)
 # ========================================
 
-def create_user_profile(played_history, top_n=10):
+def build_candidate_matrix(token_lists, corpus=None):
     """
-    사용자의 재생 기록으로부터 취향 벡터 생성
-    played_history: [{'videoId', 'title', 'description', 'playedAt'}, ...]
-    top_n: 최근 N개 음악만 사용
+    후보 문서 전체를 한 번에 TF-IDF 희소 행렬(CSR 형식)로 변환
+    token_lists: [[token, ...], ...] (후보 순서 유지)
+    corpus: IDFTable - 주어지면 코퍼스 IDF 사용, 없으면 calculate_idf와 동일하게 후보 문서 전체 기준으로 계산
+    반환: {'vocabulary': {term: index}, 'termIds', 'indptr', 'indices', 'data'}
+          termIds: 어휘 테이블(TermTable) → 열별 단어 ID 캐시 (column_term_ids로 채점할 때 채움)
     """
-    if not played_history:
-        return {}
+    num_docs = len(token_lists)
+    vocabulary = {}
+
+    # 단어 → 인덱스 매핑과 토큰별 단어 인덱스 배열
+    doc_lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=num_docs)
+    term_ids = np.fromiter(
+        (vocabulary.setdefault(token, len(vocabulary)) for tokens in token_lists for token in tokens),
+        dtype=np.int64,
+        count=int(doc_lengths.sum())
+    )
+    vocab_size = len(vocabulary)
+
+    if vocab_size == 0:
+        return {
+            'vocabulary': vocabulary,
+            'termIds': {},
+            'indptr': np.zeros(num_docs + 1, dtype=np.int64),
+            'indices': np.zeros(0, dtype=np.int64),
+            'data': np.zeros(0, dtype=np.float64)
+        }
 
-    # 최근 N개만 사용 (playedAt 기준 정렬)
-    sorted_history = sorted(
-        played_history,
-        key=lambda x: x.get('playedAt', ''),
-        reverse=True
-    )[:top_n]
+    # (문서, 단어) 쌍별 등장 횟수 - 정렬된 키이므로 그대로 CSR 순서가 됨
+    doc_ids = np.repeat(np.arange(num_docs, dtype=np.int64), doc_lengths)
+    pair_keys, pair_counts = np.unique(doc_ids * vocab_size + term_ids, return_counts=True)
+    rows = pair_keys // vocab_size
+    indices = pair_keys % vocab_size
+
+    indptr = np.zeros(num_docs + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_docs), out=indptr[1:])
+
+    # TF (빈도수 / 전체 단어 수)
+    tf = pair_counts / doc_lengths[rows]
+
+    # IDF: log((전체 문서 수 + 1) / (단어가 등장한 문서 수 + 1)) + 1
+    if corpus is not None:
+        idf = np.fromiter(corpus.idf_map(vocabulary).values(), dtype=np.float64, count=vocab_size)
+    else:
+        doc_freq = np.bincount(indices, minlength=vocab_size)
+        idf = np.log((num_docs + 1) / (doc_freq + 1)) + 1
+
+    return {
+        'vocabulary': vocabulary,
+        'termIds': {},
+        'indptr': indptr,
+        'indices': indices,
+        'data': tf * idf[indices]
+    }
 
-    # 각 음악의 텍스트 토큰화
-    documents = []
-    for music in sorted_history:
-        text = f"{music.get('title', '')} {music.get('description', '')} {music.get('channelTitle', '')}"
-        tokens = preprocess_text(text)
-        documents.append({
-            'videoId': music.get('videoId'),
-            'tokens': tokens
-        })
 
-    # IDF 계산 (전체 재생 기록 기준)
-    idf = calculate_idf(documents)
+def column_term_ids(candidate_matrix, table):
+    """
+    후보 행렬 열별 단어 ID (취향 벡터의 어휘 테이블 기준, 없는 단어는 -1)
+    행렬을 만든 뒤에 만든 취향 벡터의 단어도 찾도록 채점할 때 조회하고, 테이블별로 한 번만 계산해 행렬에 보관
+    """
+    cache = candidate_matrix['termIds']
+    term_ids = cache.get(table)
+    if term_ids is None:
+        term_ids = cache[table] = table.lookup_all(candidate_matrix['vocabulary'])
+    return term_ids
 
-    # 각 음악의 TF-IDF 벡터 생성
-    tfidf_vectors = []
-    for doc in documents:
-        tf = calculate_tf(doc['tokens'])
-        tfidf = calculate_tfidf(tf, idf)
-        tfidf_vectors.append(tfidf)
 
-    # 평균 벡터 계산 (사용자 취향)
-    user_profile = defaultdict(float)
-    for vec in tfidf_vectors:
-        for term, weight in vec.items():
-            user_profile[term] += weight
+def score_candidates(user_profile, candidate_matrix):
+    """
+    사용자 취향 벡터와 후보 희소 행렬 전체의 코사인 유사도를 한 번에 계산
+    user_profile: TermVector ({term: weight} 딕셔너리도 허용)
+    반환: 후보 순서대로 코사인 유사도 (np.ndarray)
+    cosine_similarity를 후보마다 호출한 결과와 같은 값이지만, 취향 벡터 가중치를 float32로 보관하므로
+    완전히 같지는 않고 상대 오차 1e-6 정도 안에서 일치 (tests/test_scoring.py)
+    """
+    indptr = candidate_matrix['indptr']
+    indices = candidate_matrix['indices']
+    data = candidate_matrix['data']
+    num_docs = len(indptr) - 1
 
-    # 평균 계산
-    num_vectors = len(tfidf_vectors)
-    if num_vectors > 0:
-        for term in user_profile:
-            user_profile[term] /= num_vectors
+    scores = np.zeros(num_docs, dtype=np.float64)
+    if num_docs == 0 or not user_profile:
+        return scores
 
-    return dict(user_profile)
+    # 사용자 벡터 크기는 벡터를 만들 때 미리 계산됨
+    user_profile = TermVector.from_dict(user_profile)
+    profile_magnitude = user_profile.norm
+    if profile_magnitude == 0:
+        return scores
 
+    # 후보 어휘 공간으로 사용자 벡터 투영 (후보에 없는 단어는 내적에 기여하지 않음)
+    profile_weights = user_profile.project(column_term_ids(candidate_matrix, user_profile.table))
 
-# ========================================
-# 5. 음악 추천 API
-# ========================================
+    rows = np.repeat(np.arange(num_docs, dtype=np.int64), np.diff(indptr))
+    dot_products = np.bincount(rows, weights=data * profile_weights[indices], minlength=num_docs)
+    magnitudes = np.sqrt(np.bincount(rows, weights=data * data, minlength=num_docs))
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """서버 헬스체크"""
-    return jsonify({
-        'status': 'ok',
-        'message': 'Recommendation service is running'
-    })
+    denominators = magnitudes * profile_magnitude
+    np.divide(dot_products, denominators, out=scores, where=denominators > 0)
+    return scores
 
 
-@app.route('/generate-keywords', methods=['POST'])
-def generate_keywords():
+def score_candidates_batch(user_profiles, candidate_matrix, chunk_size=256):
     """
-    사용자 맞춤 검색 키워드 생성 API
+    여러 사용자 취향 벡터와 후보 전체의 코사인 유사도를 행렬 곱으로 한 번에 계산
+    user_profiles: [TermVector, ...]
+    반환: (사용자 수 × 후보 수) np.ndarray - 각 행은 score_candidates 결과와 같은 값
+    """
+    vocabulary = candidate_matrix['vocabulary']
+    indptr = candidate_matrix['indptr']
+    indices = candidate_matrix['indices']
+    data = candidate_matrix['data']
+    num_docs = len(indptr) - 1
+    vocab_size = len(vocabulary)
+
+    scores = np.zeros((len(user_profiles), num_docs), dtype=np.float64)
+    if num_docs == 0 or vocab_size == 0:
+        return scores
+
+    # 후보 행렬은 요청당 한 번만 밀집 행렬로 변환 (후보 수 × 어휘 수)
+    rows = np.repeat(np.arange(num_docs, dtype=np.int64), np.diff(indptr))
+    candidate_dense = np.zeros((num_docs, vocab_size), dtype=np.float64)
+    candidate_dense[rows, indices] = data
+    candidate_magnitudes = np.sqrt(np.bincount(rows, weights=data * data, minlength=num_docs))
+
+    # 사용자 수가 많으면 메모리 사용량을 제한하기 위해 나누어 계산
+    for start in range(0, len(user_profiles), chunk_size):
+        chunk = user_profiles[start:start + chunk_size]
+        profile_dense = np.zeros((len(chunk), vocab_size), dtype=np.float64)
+        profile_magnitudes = np.zeros(len(chunk), dtype=np.float64)
+
+        for row, user_profile in enumerate(chunk):
+            if not user_profile:
+                continue
+            user_profile = TermVector.from_dict(user_profile)
+            profile_magnitudes[row] = user_profile.norm
+            profile_dense[row] = user_profile.project(column_term_ids(candidate_matrix, user_profile.table))
+
+        dot_products = profile_dense @ candidate_dense.T
+        denominators = np.outer(profile_magnitudes, candidate_magnitudes)
+        np.divide(dot_products, denominators, out=scores[start:start + len(chunk)], where=denominators > 0)
+
+    return scores
+
+
+def vectorize_candidates(candidate_music, corpus=None):
+    """
+    후보 음악 분석 + TF-IDF 희소 행렬 생성
+    corpus: IDFTable (current_corpus()) - 주어지면 코퍼스 IDF 사용, 없으면 후보 음악 전체 기준 IDF
+            (코퍼스 집계는 호출 측에서 record_corpus_documents로)
+    반환: (candidate_documents, candidate_matrix)
+    """
+    candidate_documents = []
+    for music in candidate_music:
+        # 토큰(태그 포함)과 언어를 한 번의 분석으로 함께 계산
+        analysis = analyze_music(music, include_tags=True)
+        candidate_documents.append({
+            'videoId': music['videoId'],
+            'tokens': analysis['tokens'],
+            'language': analysis['language'],
+            'music': music
+        })
 
-    Request Body:
-    {
-        "emotion": "happy",
-        "playedHistory": [
-            {
-                "videoId": "xyz789",
-                "title": "Chill Vibes",
-                "description": "Relaxing calm...",
-                "channelTitle": "Music Channel"
-            },
-            ...
-        ]
-    }
+    candidate_matrix = build_candidate_matrix([doc['tokens'] for doc in candidate_documents], corpus=corpus)
 
-    Response:
-    {
-        "success": true,
-        "data": {
-            "keywords": ["keyword1", "keyword2", ...],
-            "languagePreference": {"ko": 0.9, "en": 0.1},
-            "topTerms": ["term1", "term2", ...]
-        }
-    }
-    """
-    try:
-        data = request.json
+    return candidate_documents, candidate_matrix
 
-        emotion = data.get('emotion', '')
-        played_history = data.get('playedHistory', [])
 
-        print(f"[Keyword Generation] 요청 - Emotion: {emotion}, 기록: {len(played_history)}개")
+def apply_language_boost(similarity, music_language, user_language_pref):
+    """
+    사용자가 선호하는 언어면 점수 상승 (최대 50% 보너스)
+    """
+    language_boost = user_language_pref.get(music_language, 0) * 0.5
+    return similarity * (1 + language_boost)
 
-        # 현재 감정과 동일한 감정일 때 들었던 음악만 필터링
-        if emotion:
-            filtered_history = [
-                music for music in played_history
-                if music.get('emotion', '') == emotion
-            ]
-            print(f"[Keyword Generation] 감정 필터링: {len(played_history)}개 → {len(filtered_history)}개 (감정: {emotion})")
-            played_history = filtered_history
 
-        # 1. 재생 기록이 부족하면 기본 키워드 반환
-        if not played_history or len(played_history) < 5:
-            print("[Keyword Generation] 재생 기록 부족 - 기본 키워드 반환")
-            return jsonify({
-                'success': True,
-                'message': '재생 기록 부족 - 기본 키워드 사용',
-                'data': {
-                    'keywords': [],  # 빈 배열이면 Node.js에서 기본 키워드 사용
-                    'languagePreference': {},
-                    'topTerms': []
-                }
-            })
+# ========================================
+# 3-2. 상위 K개 선택 / 페이지네이션
+# ========================================
 
-        # 2. 사용자 언어 선호도 계산
-        user_language_pref = calculate_user_language_preference(played_history)
-        print(f"[Keyword Generation] 언어 선호도: {user_language_pref}")
+# 채점 결과 저장소 (커서로 다음 페이지를 요청하면 재채점 없이 재사용)
+# 워커 간에 공유하는 SQLite 파일에 보관하므로 다음 페이지 요청이 다른 gunicorn 워커로 가도 이어서 읽음
+# (같은 워커면 워커별 LRU 캐시에서 바로 읽음, RANKING_STORE_PATH=''이면 워커별 캐시만 사용)
+ranking_store = RankingStore(
+    os.environ.get('RANKING_STORE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'rankings.sqlite3')),
+    max_size=int(os.environ.get('RANKING_CACHE_SIZE', 1000)),
+    ttl=int(os.environ.get('RANKING_CACHE_TTL', 600))
+)
 
-        # 3. 사용자 프로필 생성 (TF-IDF)
-        user_profile = create_user_profile(played_history, top_n=10)
 
-        if not user_profile:
-            print("[Keyword Generation] 프로필 생성 실패 - 기본 키워드 반환")
-            return jsonify({
-                'success': True,
-                'message': '프로필 생성 실패 - 기본 키워드 사용',
-                'data': {
-                    'keywords': [],
-                    'languagePreference': user_language_pref,
-                    'topTerms': []
-                }
-            })
+def select_top_k(scores, k=None, offset=0):
+    """
+    점수 내림차순으로 [offset, offset + k) 구간의 인덱스 반환
+    k가 있으면 힙으로 offset + k개만 선택 (전체 정렬 없음), 없으면 전체 정렬
+    점수가 같으면 원래 순서 유지 (전체 정렬 결과와 동일)
+    """
+    indices = range(len(scores))
+    if k is None:
+        return sorted(indices, key=scores.__getitem__, reverse=True)[offset:]
+    return heapq.nlargest(offset + k, indices, key=scores.__getitem__)[offset:]
+
+
+def format_recommendation(music, score, language=None):
+    """응답용 추천 항목 (후보 메타데이터 + 점수)"""
+    result = {
+        'videoId': music['videoId'],
+        'score': score,
+        'title': music.get('title', ''),
+        'description': music.get('description', ''),
+        'channelTitle': music.get('channelTitle', ''),
+        'thumbnailUrl': music.get('thumbnailUrl', ''),
+        'duration': music.get('duration', 0),
+        'tags': music.get('tags', [])
+    }
+    if language is not None:
+        result['language'] = language  # 디버깅용
+    return result
 
-        # 4. 상위 중요 단어 추출 (TF-IDF 가중치 높은 순)
-        sorted_terms = sorted(user_profile.items(), key=lambda x: x[1], reverse=True)
-        top_terms = [term for term, weight in sorted_terms[:10]]  # 상위 10개
 
-        print(f"[Keyword Generation] 상위 단어: {top_terms[:5]}")
+def create_ranking(user_id, candidate_music, scores, languages=None, k=None):
+    """
+    채점 결과 (페이지 단위로 잘라 응답, 다음 페이지가 있으면 ranking_store에 보관)
+    scores: 후보 순서대로 반올림된 최종 점수
+    languages: 후보별 언어 (None이면 응답에 language 생략)
+    """
+    return {
+        'id': None,
+        'userId': user_id,
+        'music': candidate_music,
+        'scores': scores,
+        'languages': languages,
+        'k': k
+    }
 
-        # 5. 감정 키워드 매핑 (각 언어별)
-        emotion_keywords = {
-            'happy': {
-                'ko': ['행복한', '즐거운', '신나는', '밝은', '경쾌한'],
-                'en': ['happy', 'cheerful', 'upbeat', 'energetic', 'joyful'],
-                'ja': ['楽しい', '明るい', 'ハッピー', '元気', '陽気']
-            },
-            'crying': {
-                'ko': ['슬픈', '눈물', '애절한', '감성적인', '우울한'],
-                'en': ['sad', 'crying', 'tearful', 'emotional', 'heartbreaking'],
-                'ja': ['泣ける', '悲しい', '涙', '感動的', '切ない']
-            },
-            'angry': {
-                'ko': ['화난', '강렬한', '격렬한', '빠른', '파워풀'],
-                'en': ['angry', 'intense', 'aggressive', 'powerful', 'fierce'],
-                'ja': ['激しい', '怒り', 'パワフル', '強烈', 'アグレッシブ']
-            },
-            'sleep': {
-                'ko': ['수면', '자장가', '편안한', '잔잔한', '힐링'],
-                'en': ['sleep', 'lullaby', 'peaceful', 'calm', 'relaxing'],
-                'ja': ['睡眠', '子守唄', '静か', 'リラックス', '癒し']
-            },
-            'love': {
-                'ko': ['사랑', '로맨틱', '달콤한', '감성적인', '따뜻한'],
-                'en': ['love', 'romantic', 'sweet', 'emotional', 'tender'],
-                'ja': ['愛', 'ロマンチック', '甘い', 'ラブソング', '優しい']
-            },
-            'excited': {
-                'ko': ['신나는', '흥겨운', '활기찬', '에너지', '업템포'],
-                'en': ['excited', 'energetic', 'lively', 'dynamic', 'upbeat'],
-                'ja': ['エキサイティング', '活気', 'ダイナミック', '元気', 'アップテンポ']
-            }
-        }
 
-        # 6. 언어별 키워드 개수 결정
-        keywords = []
+def ranking_page(ranking, k=None, offset=0):
+    """
+    채점 결과의 한 페이지
+    반환: (후보 인덱스 목록, 다음 페이지 커서 또는 None)
+    """
+    indices = select_top_k(ranking['scores'], k, offset)
 
-        # 주 언어 결정 (50% 이상이면 주 언어)
-        primary_language = None
-        for lang, ratio in user_language_pref.items():
-            if ratio >= 0.5:
-                primary_language = lang
-                break
+    next_offset = offset + len(indices)
+    if k is None or next_offset >= len(ranking['scores']):
+        return indices, None
 
-        # 감정 키워드 풀 생성
-        emotion_kw = emotion_keywords.get(emotion, emotion_keywords['happy'])
+    if ranking['id'] is None:
+        ranking['id'] = uuid.uuid4().hex
+        ranking_store.set(ranking['id'], ranking)
 
-        if primary_language and primary_language in ['ko', 'en', 'ja']:
-            # 주 언어가 명확한 경우 (50% 이상)
-            print(f"[Keyword Generation] 주 언어: {primary_language} ({user_language_pref[primary_language]:.1%})")
+    return indices, f"{ranking['id']}.{next_offset}"
 
-            # 감정 키워드 풀 (주 언어만)
-            emotion_pool = emotion_kw[primary_language].copy()
 
-            # 사용자 프로필 단어 필터링 (주 언어만, 3글자 이상)
-            user_pool = [
-                term for term in top_terms
-                if detect_language(term) == primary_language and len(term) >= 3
+def ranking_response(ranking, options, k=None, offset=0, user_profile=None):
+    """
+    /recommend 응답 data
+    options: parse_response_options 결과
+    - 기본: recommendedMusic (후보 메타데이터 포함)
+    - compact: videoIds / scores (/ languages) 병렬 배열만 - 메타데이터는 호출 측이 이미 가지고 있음
+    user_profile: None이 아니면 userProfileSize 포함 (userProfile 자체는 includeProfile일 때만)
+    """
+    indices, next_cursor = ranking_page(ranking, k, offset)
+    scores = ranking['scores']
+    languages = ranking['languages']
+
+    if options['compact']:
+        response_data = {
+            'videoIds': [ranking['music'][i]['videoId'] for i in indices],
+            'scores': [scores[i] for i in indices]
+        }
+        if options['includeLanguage'] and languages is not None:
+            response_data['languages'] = [languages[i] for i in indices]
+    else:
+        response_data = {
+            'recommendedMusic': [
+                format_recommendation(ranking['music'][i], scores[i], languages[i] if languages else None)
+                for i in indices
             ]
+        }
 
-            # 감정 키워드 4개 랜덤 선택
-            random.shuffle(emotion_pool)
-            keywords.extend(emotion_pool[:4])
+    if user_profile is not None:
+        if options['includeProfile']:
+            response_data['userProfile'] = user_profile.to_dict()
+        response_data['userProfileSize'] = len(user_profile)
+
+    if k is not None:
+        response_data.update(totalCount=len(scores), nextCursor=next_cursor)
+
+    return response_data
+
+
+def load_ranking(cursor, user_id):
+    """
+    커서 → (채점 결과, offset), 만료됐거나 다른 사용자의 커서면 (None, 0)
+    """
+    ranking_id, _, offset = str(cursor).partition('.')
+    ranking = ranking_store.get(ranking_id)
+    if ranking is None or ranking['userId'] != user_id or not offset.isdigit():
+        return None, 0
+    return ranking, int(offset)
+
+
+def parse_response_options(data):
+    """
+    응답 형식 옵션
+    compact: True면 병렬 배열 응답 (기본 False)
+    includeLanguage: compact 응답에 languages 포함 (기본 False)
+    includeProfile: userProfile 포함 (기본: compact가 아니면 True)
+    """
+    compact = bool(data.get('compact', False))
+    return {
+        'compact': compact,
+        'includeLanguage': bool(data.get('includeLanguage', False)),
+        'includeProfile': bool(data.get('includeProfile', not compact))
+    }
+
+
+def parse_page_size(value, name='k'):
+    """요청의 k(또는 name 필드) 검증 (생략하면 None = 전체), 잘못된 값이면 ValueError"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise ValueError(f'{name}는 1 이상의 정수여야 합니다.')
+    return value
+
+
+# ========================================
+# 3-3. 음악 카탈로그 (SimHash 근사 최근접 이웃)
+# ========================================
+
+# 지금까지 본 후보 음악 카탈로그 - /recommend/catalog에서 YouTube 검색 없이 추천 (CATALOG_ENABLED=0이면 사용 안 함)
+# 워커 프로세스별 메모리, /recommend 후보는 백그라운드 스레드에서 색인
+# → 시작 시 연결한 스냅샷은 모든 워커가 같지만, 그 뒤에 색인한 후보는 그 요청을 처리한 워커의 카탈로그에만 있음
+#   (같은 사용자의 카탈로그 추천도 어느 워커가 받느냐에 따라 결과가 다를 수 있음 - /health의 catalog.scope)
+#   첫 페이지 이후는 공유 저장소의 페이지 커서로 이어서 읽으므로 추가 로딩은 커서를 먼저 사용 (mainController.loadMore)
+if os.environ.get('CATALOG_ENABLED', '1') != '0':
+    catalog = CatalogIndex(
+        analyzer=lambda music: analyze_music(music, include_tags=True),
+        corpus=corpus_idf,
+        max_size=int(os.environ.get('CATALOG_MAX_SIZE', 200000)),
+        num_bits=int(os.environ.get('CATALOG_SIGNATURE_BITS', 256))
+    )
+else:
+    catalog = None
+
+# 카탈로그 스냅샷 (시작 시 메모리 매핑으로 연결, 종료 시 워커마다 변경분을 디스크의 최신 스냅샷에 합쳐 저장)
+# 빌드 / 점검: python utils/catalog_snapshot.py build|verify|info
+CATALOG_SNAPSHOT_PATH = os.environ.get(
+    'CATALOG_SNAPSHOT_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'catalog.snapshot')
+)
+
+
+def load_catalog_snapshot():
+    """스냅샷이 있으면 카탈로그 기본 계층으로 연결 (잘못된 스냅샷은 건너뛰고 빈 카탈로그로 시작)"""
+    if catalog is None or not CATALOG_SNAPSHOT_PATH or not os.path.exists(CATALOG_SNAPSHOT_PATH):
+        return
+    started = time.perf_counter()
+    try:
+        catalog.load_snapshot(CATALOG_SNAPSHOT_PATH)
+    except (OSError, SnapshotError) as e:
+        logger.warning("[Catalog] 스냅샷 로드 실패 (%s): %s", CATALOG_SNAPSHOT_PATH, e)
+        return
+    logger.info(
+        "[Catalog] 스냅샷 로드: %s (%d개, %.1fms)",
+        CATALOG_SNAPSHOT_PATH, len(catalog), (time.perf_counter() - started) * 1000
+    )
+
+
+def save_catalog_snapshot():
+    """
+    카탈로그가 바뀌었으면 변경분을 스냅샷 파일에 합쳐 저장 (워커마다 종료 시 호출)
+    파일 잠금 안에서 먼저 종료한 워커가 저장한 최신 스냅샷에 합치므로 다른 워커가 색인한 문서를 덮어쓰지 않음
+    """
+    if catalog is None or not CATALOG_SNAPSHOT_PATH or not catalog.dirty:
+        return
+    try:
+        catalog.merge_snapshot(CATALOG_SNAPSHOT_PATH)
+    except (OSError, SnapshotError) as e:
+        logger.warning("[Catalog] 스냅샷 저장 실패: %s", e)
+
+
+load_catalog_snapshot()
+atexit.register(save_catalog_snapshot)
+
+CATALOG_CANDIDATES = int(os.environ.get('CATALOG_CANDIDATES', 2000))  # 카탈로그 검색으로 순위를 매길 최대 문서 수
+
+# ann: SimHash 근사 후보 → 현재 IDF로 재채점 (기본, /recommend/catalog 도입 때부터의 동작)
+# exact: 역색인 정확한 top-K (상한 기반 가지치기 - 전체 채점과 같은 결과, 점수는 색인 시점 IDF 기준)
+CATALOG_SEARCH = os.environ.get('CATALOG_SEARCH', 'ann')
+CATALOG_DEFAULT_K = 50
+
+
+def index_candidates(candidate_music, emotion=None):
+    """
+    요청으로 받은 후보 음악을 카탈로그 색인 대기열에 추가 (응답 지연 없음, 워밍업 샘플은 색인하지 않음)
+    emotion: 후보를 검색한 감정 - 카탈로그 문서에 태그로 기록 (감정이 하나로 정해지지 않으면 None)
+    """
+    if catalog is not None and not service_state['warming']:
+        catalog.enqueue(candidate_music, emotion or None)
+
+
+def search_catalog(user_profile, user_language_pref, exclude=(), corpus=None, emotion=None):
+    """
+    카탈로그에서 취향 벡터와 가까운 문서 최대 CATALOG_CANDIDATES개 검색
+    corpus: 요청에 고정한 IDFTable (ann 모드 재채점에 사용)
+    emotion: 주어지면 이 감정으로 받은 문서만 검색
+    반환: (문서 목록, 반올림된 최종 점수) - exact 모드는 점수 내림차순
+    """
+    if CATALOG_SEARCH == 'ann':
+        documents = catalog.query(user_profile, limit=CATALOG_CANDIDATES, exclude=exclude, emotion=emotion)
+        return documents, score_catalog_documents(documents, user_profile, user_language_pref, corpus)
+
+    # 언어 가중치는 언어별 점수 배수로 넘겨 가지치기 상한에 반영
+    language_boost = {
+        language: apply_language_boost(1.0, language, user_language_pref)
+        for language in user_language_pref
+    }
+    results = catalog.search(
+        user_profile, CATALOG_CANDIDATES, language_boost=language_boost, exclude=exclude, emotion=emotion
+    )
+    return [doc for doc, _ in results], [round(score, 4) for _, score in results]
+
+
+def score_catalog_documents(documents, user_profile, user_language_pref, corpus=None):
+    """
+    카탈로그 문서 채점 (/recommend와 같은 방식 - TF-IDF 코사인 유사도 + 언어 가중치)
+    corpus: 요청에 고정한 IDFTable
+    반환: 문서 순서대로 반올림된 최종 점수
+    """
+    candidate_matrix = build_candidate_matrix([doc['tokens'] for doc in documents], corpus=corpus)
+    similarities = score_candidates(user_profile, candidate_matrix)
+    return [
+        round(apply_language_boost(similarity, doc['language'], user_language_pref), 4)
+        for doc, similarity in zip(documents, similarities.tolist())
+    ]
+
+
+# ========================================
+# 3-4. 근사 중복 후보 묶기 (MinHash + LSH)
+# ========================================
+
+# 제목 토큰의 자카드 유사도가 이 값 이상이면 같은 곡으로 보고 먼저 온 후보만 채점 (0이면 사용 안 함 - 기본값)
+# 같은 가수의 다른 곡도 가수명 토큰을 공유하므로 (BTS 'Butter' / 'Dynamite' = 0.5) 켤 때는 0.8 정도로 높게 설정
+DEDUP_THRESHOLD = float(os.environ.get('DEDUP_THRESHOLD', 0))
+
+# 근사 중복 비교용 토큰 패턴: TOKEN_PATTERN + 일본어 가나 / CJK 한자
+# (띄어쓰기 없는 일본어 제목도 곡 이름이 토큰으로 남도록 - TOKEN_PATTERN으로는 모두 사라져 같은 채널 영상이 전부 같아짐)
+DEDUP_TOKEN_PATTERN = re.compile(r'[a-z0-9가-힣\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff]+')
+
+# 영상 종류 / 버전 표기 - 같은 곡의 공식 영상 / 가사 영상 / 라이브가 같은 제목으로 비교되도록 제외
+DEDUP_IGNORED_WORDS = frozenset({'official', 'mv', 'music', 'video', 'audio', 'lyric', 'lyrics', 'live',
+                                 'visualizer', 'hd', '4k', 'ver', 'version', '가사', '공식', '라이브', '뮤직비디오'})
+
+
+def dedup_tokens(music):
+    """
+    근사 중복 비교에 사용하는 제목 토큰
+    채널명은 제외 (같은 채널의 다른 곡이 채널명 토큰만으로 비슷해지지 않도록), 설명은 영상마다 달라 제외
+    한 글자 토큰은 영문 / 숫자만 제외 (한 글자 한자 / 한글 제목 유지)
+    """
+    tokens = DEDUP_TOKEN_PATTERN.findall(music.get('title', '').lower())
+    return [
+        token for token in tokens
+        if (len(token) > 1 or not token.isascii()) and token not in STOPWORDS and token not in DEDUP_IGNORED_WORDS
+    ]
+
+
+def collapse_near_duplicates(candidate_music, dedup_filter=None):
+    """
+    재업로드 / 가사 영상 / 라이브 버전 등 근사 중복 후보를 먼저 온 후보 하나로 묶음 (채점 전에 호출)
+    dedup_filter: 여러 번 나눠 호출할 때(스트리밍) 공유하는 NearDuplicateFilter (없으면 새로 생성)
+    반환: (남은 후보 목록 (원래 순서 유지), 묶인 후보 수)
+    """
+    if DEDUP_THRESHOLD <= 0 or not candidate_music:
+        return candidate_music, 0
+
+    if dedup_filter is None:
+        dedup_filter = NearDuplicateFilter(DEDUP_THRESHOLD)
+    kept = dedup_filter.keep([dedup_tokens(music) for music in candidate_music])
+    unique = [music for music, keep in zip(candidate_music, kept) if keep]
+    return unique, len(candidate_music) - len(unique)
+
+
+# ========================================
+# 3-5. 스트리밍 채점 (NDJSON 후보)
+# ========================================
+
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 256))  # 한 번에 분석 / 채점하는 후보 수
+STREAM_DEFAULT_K = 50
+
+
+def chunk_candidates(records, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    NDJSON 후보 레코드 → chunk_size개씩 묶은 후보 목록 (videoId가 같은 후보는 처음 것만 사용)
+    레코드는 후보 하나 또는 후보 배열 (키워드 하나의 검색 결과를 한 줄로 보낼 수 있음)
+    메모리에는 현재 청크와 지금까지 본 videoId만 유지
+    """
+    seen = set()
+    chunk = []
+    for record in records:
+        for music in (record if isinstance(record, list) else [record]):
+            if not isinstance(music, dict) or not music.get('videoId'):
+                raise ValueError('후보 음악에는 videoId가 필요합니다.')
+            if music['videoId'] in seen:
+                continue
+            seen.add(music['videoId'])
+            chunk.append(music)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def collapse_candidate_chunks(chunks, dedup_filter):
+    """
+    청크별 근사 중복 묶기 - 필터를 청크 사이에 공유하므로 앞 청크의 후보와도 비교
+    (필터는 남긴 후보의 토큰 집합만 보관)
+    """
+    for chunk in chunks:
+        chunk, _ = collapse_near_duplicates(chunk, dedup_filter)
+        if chunk:
+            yield chunk
+
+
+def score_candidate_chunks(chunks, user_profile, user_language_pref, corpus=None, emotion=None):
+    """
+    후보 청크별 벡터화 + 채점 (/recommend와 같은 점수 - 코퍼스 IDF가 없으면 IDF만 청크 기준)
+    corpus: 요청에 고정한 IDFTable (청크가 집계되어도 같은 요청의 IDF는 바뀌지 않음)
+    emotion: 후보를 검색한 감정 (카탈로그 태그)
+    반환: (후보, 언어, 반올림된 최종 점수)를 도착 순서대로 내보내는 제너레이터
+    """
+    for chunk in chunks:
+        index_candidates(chunk, emotion)
+        candidate_documents, candidate_matrix = vectorize_candidates(chunk, corpus=corpus)
+        record_corpus_documents((doc['videoId'], doc['tokens']) for doc in candidate_documents)
+        similarities = score_candidates(user_profile, candidate_matrix)
+        for doc, similarity in zip(candidate_documents, similarities.tolist()):
+            yield doc['music'], doc['language'], round(apply_language_boost(similarity, doc['language'], user_language_pref), 4)
+
+
+def stream_top_k(scored, k):
+    """
+    채점 결과 스트림에서 점수 상위 k개만 최소 힙으로 유지 (힙 크기 k - 후보 수와 무관)
+    반환: ([(후보, 언어, 점수), ...] 점수 내림차순 (같으면 먼저 온 후보 먼저 - select_top_k와 동일), 전체 후보 수)
+    """
+    heap = []
+    count = 0
+    for count, (music, language, score) in enumerate(scored, start=1):
+        entry = (score, -count, music, language)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    heap.sort(key=lambda entry: entry[:2], reverse=True)
+    return [(music, language, score) for score, _, music, language in heap], count
+
+
+# ========================================
+# 4. 사용자 취향 벡터 생성
+# ========================================
+
+def recent_history(played_history, top_n=10):
+    """최근 N개 재생 기록 (playedAt 내림차순) - 취향 벡터 / 코퍼스 집계 대상"""
+    return sorted(
+        played_history,
+        key=lambda x: x.get('playedAt', ''),
+        reverse=True
+    )[:top_n]
+
+
+def create_user_profile(played_history, top_n=10, corpus=None):
+    """
+    사용자의 재생 기록으로부터 취향 벡터 생성
+    played_history: [{'videoId', 'title', 'description', 'playedAt'}, ...]
+    top_n: 최근 N개 음악만 사용
+    corpus: IDFTable (current_corpus()) - 주어지면 코퍼스 IDF 사용
+            (재생 기록의 코퍼스 집계는 호출 측에서 record_history_documents로)
+    반환: TermVector (API 응답 / 저장할 때만 to_dict()로 단어 문자열 딕셔너리로 변환)
+    """
+    if not played_history:
+        return TermVector()
+
+    # 최근 N개만 사용 (playedAt 기준 정렬)
+    sorted_history = recent_history(played_history, top_n)
+
+    # 각 음악의 텍스트 토큰화
+    documents = []
+    for music in sorted_history:
+        analysis = analyze_music(music)
+        documents.append({
+            'videoId': music.get('videoId'),
+            'tokens': analysis['tokens'],
+            'termCounts': analysis['termCounts']
+        })
+
+    # IDF 계산 (코퍼스 기준, 코퍼스가 없으면 전체 재생 기록 기준)
+    if corpus is not None:
+        idf = corpus.idf_map({term for doc in documents for term in doc['termCounts']})
+    else:
+        idf = calculate_idf(documents)
+
+    # 각 음악의 TF-IDF (TF × IDF)를 (단어, 가중치) 배열로 모음
+    terms = []
+    weights = []
+    for doc in documents:
+        total_terms = len(doc['tokens'])
+        for term, count in doc['termCounts'].items():
+            terms.append(term)
+            weights.append(count / total_terms * idf.get(term, 0))
+
+    # 평균 벡터 계산 (사용자 취향) - 단어 ID별 합계 / 음악 수
+    return TermVector.from_terms(terms, np.array(weights) / len(documents))
+
+
+def record_history_documents(played_history, top_n=10):
+    """취향 벡터에 사용한 최근 N개 재생 기록을 코퍼스에 집계"""
+    record_corpus_documents(corpus_documents(recent_history(played_history, top_n)))
+
+
+# ========================================
+# 4-1. 사용자 취향 벡터 증분 갱신
+# ========================================
+
+PROFILE_TOP_N = 10          # 프로필에 사용하는 최근 음악 수 (create_user_profile의 top_n)
+PROFILE_HISTORY_LIMIT = 20  # 언어 선호도에 사용하는 최근 기록 수 (Node의 MUSIC.HISTORY_LIMIT)
+
+
+def create_profile_state(top_n=PROFILE_TOP_N, history_limit=PROFILE_HISTORY_LIMIT):
+    """
+    증분 갱신용 빈 프로필 상태
+    window: 최근 재생 문서 (playedAt 내림차순, 최대 history_limit개)
+    docFreq, tfSum: window 상위 top_n개 문서의 단어별 문서 빈도 / TF 합
+    languageCounts: window 전체의 언어별 곡 수
+    """
+    return {
+        'topN': top_n,
+        'historyLimit': history_limit,
+        'window': [],
+        'docFreq': {},
+        'tfSum': {},
+        'languageCounts': {}
+    }
+
+
+def update_document_stats(state, doc, sign):
+    """
+    문서 하나의 TF를 상위 N개 통계에 더하거나(sign=1) 뺌(sign=-1)
+    비용: 해당 문서의 단어 수에 비례
+    """
+    doc_freq = state['docFreq']
+    tf_sum = state['tfSum']
+    total_terms = doc['totalTerms']
+
+    for term, count in doc['termCounts'].items():
+        doc_freq[term] = doc_freq.get(term, 0) + sign
+        if doc_freq[term] <= 0:
+            # 더 이상 등장하지 않는 단어는 제거 (부동소수 오차 누적 방지)
+            del doc_freq[term]
+            tf_sum.pop(term, None)
+        else:
+            tf_sum[term] = tf_sum.get(term, 0.0) + sign * count / total_terms
+
+
+def append_to_profile_state(state, music):
+    """
+    재생한 음악 하나를 프로필 상태에 반영 (전체 재계산 없이 새 곡과 밀려난 곡의 단어만 갱신)
+    반환: 상태가 바뀌었으면 True
+    """
+    analysis = analyze_music(music)
+    doc = {
+        'videoId': music.get('videoId'),
+        'playedAt': music.get('playedAt', ''),
+        'termCounts': analysis['termCounts'],
+        'totalTerms': len(analysis['tokens']),
+        'language': analysis['language']
+    }
+
+    window = state['window']
+    top_n = state['topN']
+
+    # 같은 재생(videoId + playedAt)이 이미 반영되어 있으면 무시
+    if any(item['videoId'] == doc['videoId'] and item['playedAt'] == doc['playedAt'] for item in window):
+        return False
+
+    # playedAt 내림차순 위치에 삽입 (create_user_profile의 정렬과 동일)
+    position = next((i for i, item in enumerate(window) if item['playedAt'] < doc['playedAt']), len(window))
+    if position >= state['historyLimit']:
+        return False
+
+    window.insert(position, doc)
+    language_counts = state['languageCounts']
+    language_counts[doc['language']] = language_counts.get(doc['language'], 0) + 1
+
+    # 상위 N개 슬라이딩 윈도우 갱신
+    if position < top_n:
+        update_document_stats(state, doc, 1)
+        if len(window) > top_n:
+            update_document_stats(state, window[top_n], -1)
+
+    # 언어 선호도 윈도우 갱신
+    if len(window) > state['historyLimit']:
+        removed = window.pop()
+        language_counts[removed['language']] -= 1
+        if language_counts[removed['language']] == 0:
+            del language_counts[removed['language']]
+
+    return True
+
+
+def build_profile_state(played_history, top_n=PROFILE_TOP_N, history_limit=PROFILE_HISTORY_LIMIT):
+    """
+    재생 기록 전체로부터 프로필 상태 생성 (/profile/refresh)
+    """
+    state = create_profile_state(top_n, history_limit)
+
+    sorted_history = sorted(
+        played_history,
+        key=lambda x: x.get('playedAt', ''),
+        reverse=True
+    )[:history_limit]
+
+    for music in sorted_history:
+        append_to_profile_state(state, music)
+
+    return state
+
+
+def profile_from_state(state, corpus=None):
+    """
+    프로필 상태로부터 취향 벡터와 언어 선호도 계산
+    취향 벡터는 create_user_profile과 같은 값 (상위 N개 문서의 평균 TF-IDF)
+    corpus: IDFTable - 주어지면 코퍼스 IDF, 없으면 상위 N개 문서 기준 IDF
+    반환: (TermVector, {언어: 비율})
+    """
+    num_docs = min(len(state['window']), state['topN'])
+    doc_freq = state['docFreq']
+    tf_sums = state['tfSum']
+
+    user_profile = TermVector()
+    if num_docs > 0 and tf_sums:
+        terms = list(tf_sums)
+        if corpus is not None:
+            idf = np.fromiter(corpus.idf_map(terms).values(), dtype=np.float64, count=len(terms))
+        else:
+            doc_freqs = np.fromiter((doc_freq[term] for term in terms), dtype=np.float64, count=len(terms))
+            idf = np.log((num_docs + 1) / (doc_freqs + 1)) + 1  # Smoothing
+        tf = np.fromiter(tf_sums.values(), dtype=np.float64, count=len(terms))
+        user_profile = TermVector.from_terms(terms, tf * idf / num_docs)
+
+    total = sum(state['languageCounts'].values())
+    language_preferences = {
+        lang: count / total
+        for lang, count in state['languageCounts'].items()
+    } if total else {}
+
+    return user_profile, language_preferences
+
+
+# ========================================
+# 4-2. 사용자 프로필 저장소
+# ========================================
+
+# (userId, 감정)별로 미리 계산한 프로필 - /recommend에서 재생 기록 없이 userId만 보내면 재사용
+profile_store = ProfileStore(
+    os.environ.get('PROFILE_STORE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'profiles.sqlite3'))
+)
+
+
+def filter_history_by_emotion(played_history, emotion):
+    """
+    현재 감정과 동일한 감정일 때 들었던 음악만 필터링 (emotion이 비어 있으면 전체)
+    """
+    if not emotion:
+        return played_history
+
+    return [music for music in played_history if music.get('emotion', '') == emotion]
+
+
+def profile_emotions(played_history):
+    """감정을 지정하지 않은 프로필 갱신 대상: 전체 프로필('') + 기록에 등장한 감정별 프로필"""
+    return [''] + sorted({music['emotion'] for music in played_history if music.get('emotion')})
+
+
+def compute_user_profile(emotion, played_history, top_n=PROFILE_TOP_N, corpus=None):
+    """
+    재생 기록으로 (감정) 프로필 계산 - 저장하지 않음 (/profile/refresh, 일괄 재계산 도구 rebuild_profiles.py)
+    반환: {'profile': {term: weight}, 'languagePreference', 'musicCount', 'state'}
+    """
+    history = filter_history_by_emotion(played_history, emotion)
+
+    return {
+        'profile': create_user_profile(history, top_n=top_n, corpus=corpus).to_dict(),
+        'languagePreference': calculate_user_language_preference(history),
+        'musicCount': min(len(history), top_n),
+        'state': build_profile_state(history, top_n=top_n)
+    }
+
+
+def refresh_user_profile(user_id, emotion, played_history, top_n=PROFILE_TOP_N, corpus=None):
+    """
+    재생 기록으로 (userId, 감정) 프로필을 다시 계산해 저장
+    corpus: 요청에 고정한 IDFTable (감정별 프로필을 같은 IDF로 계산)
+    반환: 저장된 프로필 (profile_store.get 형식)
+    """
+    computed = compute_user_profile(emotion, played_history, top_n=top_n, corpus=corpus)
+    record_history_documents(filter_history_by_emotion(played_history, emotion), top_n)
+
+    return profile_store.save(
+        user_id,
+        emotion,
+        computed['profile'],
+        computed['languagePreference'],
+        computed['musicCount'],
+        state=computed['state']
+    )
+
+
+def resolve_user_profile(user_id, emotion, played_history=None, corpus=None):
+    """
+    추천에 사용할 (취향 벡터, 언어 선호도) 결정
+    played_history가 None이면 저장된 (userId, 감정) 프로필 사용, 아니면 감정 필터링 후 새로 계산
+    corpus: 요청에 고정한 IDFTable
+    반환: (TermVector, language_preference) - 프로필을 만들 수 없으면 (빈 TermVector, {})
+    """
+    if played_history is None:
+        stored_profile = profile_store.get(user_id, emotion) if user_id else None
+        if stored_profile is None:
+            return TermVector(), {}
+        return TermVector.from_dict(stored_profile['profile']), stored_profile['languagePreference']
+
+    history = filter_history_by_emotion(played_history, emotion)
+    if not history:
+        return TermVector(), {}
+
+    user_profile = create_user_profile(history, top_n=PROFILE_TOP_N, corpus=corpus)
+    record_history_documents(history, PROFILE_TOP_N)
+    return user_profile, calculate_user_language_preference(history)
+
+
+def append_user_profile(user_id, emotion, music):
+    """
+    새로 재생한 음악 하나를 (userId, 감정) 프로필에 증분 반영해 저장
+    저장된 상태가 없으면 빈 상태에서 시작
+    반환: 저장된 프로필 (profile_store.get 형식)
+    """
+    corpus = current_corpus()
+    record_corpus_documents(corpus_documents([music]))
+
+    def updater(current):
+        state = current.get('state') if current else None
+        if state is None:
+            state = create_profile_state()
+
+        if not append_to_profile_state(state, music):
+            return None  # 이미 반영된 재생이거나 윈도우보다 오래된 기록
+
+        profile, language_pref = profile_from_state(state, corpus=corpus)
+        return {
+            'profile': profile.to_dict(),
+            'languagePreference': language_pref,
+            'musicCount': min(len(state['window']), state['topN']),
+            'state': state
+        }
+
+    return profile_store.update(user_id, emotion, updater)
+
+
+# ========================================
+# 4-3. 추천 채점 커널 (프로세스 풀 오프로딩)
+# ========================================
+
+def init_kernel_process():
+    """
+    커널 풀 자식 프로세스 초기화: 코퍼스 IDF는 읽기 전용 (집계 / 저장 / 스냅샷 스레드 없음)
+    자식은 요청에 고정된 revision을 받아 필요할 때 스냅샷 파일을 다시 읽음 (score_recommendation)
+    """
+    if corpus_idf is not None:
+        corpus_idf.read_only = True
+
+
+# KERNEL_POOL_WORKERS > 0이면 /recommend의 프로필 생성 + 채점을 프로세스 풀에서 실행
+# (운영 모드에서는 serve.py --offload-workers로 설정)
+kernel_pool = KernelPool(
+    max_workers=int(os.environ.get('KERNEL_POOL_WORKERS', 0)),
+    max_queue=int(os.environ['KERNEL_POOL_QUEUE']) if 'KERNEL_POOL_QUEUE' in os.environ else None,
+    initializer=init_kernel_process
+)
+
+# 요청 처리 기한 (밀리초, 요청 본문의 deadlineMs로 요청별 지정 가능) - 넘기면 미정렬 결과 반환
+KERNEL_DEADLINE_MS = int(os.environ.get('KERNEL_DEADLINE_MS', 3000))
+
+# 동시에 들어온 같은 요청(감정 더블탭, 프론트엔드 재시도 등)은 한 번만 계산하고 결과 공유
+# REQUEST_COALESCING=0이면 요청마다 따로 계산
+# 프로세스 안에서만 합침: pre-fork 워커(serve.py, 커널 풀이 꺼져 있으면 워커당 스레드 1개)는 동시에 요청을 하나만
+# 처리하므로 같은 워커로 온 요청끼리만 합쳐짐 - 워커 간 합치기가 필요하면 워커를 줄이고 --offload-workers 사용
+request_flights = SingleFlight(enabled=os.environ.get('REQUEST_COALESCING', '1') != '0')
+
+
+def recommendation_flight_key(user_id, emotion, played_history, candidate_music, stored_profile=None):
+    """
+    /recommend 채점 결과를 함께 쓸 수 있는 요청 키
+    (감정 필터링 후 재생 기록 지문 + 후보 videoId 순서 + 저장된 프로필의 갱신 시각)
+    """
+    return (
+        'recommend',
+        user_id,
+        emotion,
+        stored_profile['updatedAt'] if stored_profile is not None else None,
+        history_fingerprint(played_history),
+        tuple(music.get('videoId') for music in candidate_music)
+    )
+
+
+def score_recommendation(candidate_music, played_history, stored_profile=None, corpus_revision=None):
+    """
+    /recommend 채점 커널: 취향 벡터 생성 → 언어 선호도 → 후보 벡터화 → 유사도 / 언어 가중치
+    프로세스 풀에서도 실행되므로 요청 컨텍스트(g, request)를 사용하지 않고 코퍼스에도 집계하지 않음
+    corpus_revision: 요청에 고정한 코퍼스 IDF revision (자식 프로세스에 없는 revision이면 스냅샷 파일을 다시 읽음,
+                     None이면 요청별 IDF - current_corpus()가 None인 경우)
+    반환: {'userProfile', 'scores', 'languages', 'timings', 'documents'}
+          (프로필 생성에 실패하면 scores / languages는 None, timings는 [(단계, 초), ...],
+           documents는 코퍼스에 집계할 [(videoId, 토큰), ...] - 요청 처리 프로세스에서 record_corpus_documents)
+    예외: RevisionUnavailable (고정한 revision을 읽을 수 없음 - run_recommendation_kernel이 요청 처리 프로세스에서 다시 채점)
+    """
+    corpus = corpus_idf.sync(corpus_revision) if corpus_idf is not None and corpus_revision is not None else None
+    documents = []
+    timings = []
+    stage_started = time.perf_counter()
+
+    def mark(stage):
+        nonlocal stage_started
+        now = time.perf_counter()
+        timings.append((stage, now - stage_started))
+        stage_started = now
+
+    # 사용자 취향 벡터 생성 (저장된 프로필이 있으면 재사용)
+    if stored_profile is not None:
+        user_profile = TermVector.from_dict(stored_profile['profile'])
+    else:
+        user_profile = create_user_profile(played_history, top_n=10, corpus=corpus)
+        if corpus_idf is not None:
+            documents = corpus_documents(recent_history(played_history, 10))
+    mark('profile')
+
+    if not user_profile:
+        return {'userProfile': user_profile, 'scores': None, 'languages': None, 'timings': timings, 'documents': documents}
+
+    logger.debug("[Recommendation] 사용자 프로필 생성 완료 - %d개 단어", len(user_profile))
+
+    # 사용자 언어 선호도 계산
+    if stored_profile is not None:
+        user_language_pref = stored_profile['languagePreference']
+    else:
+        user_language_pref = calculate_user_language_preference(played_history)
+    logger.debug("[Recommendation] 언어 선호도: %s", user_language_pref)
+    mark('language')
+
+    # 후보 전체 TF-IDF 희소 행렬 생성
+    candidate_documents, candidate_matrix = vectorize_candidates(candidate_music, corpus=corpus)
+    if corpus_idf is not None:
+        documents.extend((doc['videoId'], doc['tokens']) for doc in candidate_documents)
+    mark('vectorize')
+
+    # 기본 TF-IDF 유사도 일괄 계산
+    similarities = score_candidates(user_profile, candidate_matrix)
+    mark('score')
+
+    # 각 후보 음악의 최종 점수 계산 (언어 가중치 적용, 언어는 벡터화 단계에서 이미 감지됨)
+    languages = [doc['language'] for doc in candidate_documents]
+    final_scores = [
+        round(apply_language_boost(similarity, language, user_language_pref), 4)
+        for language, similarity in zip(languages, similarities.tolist())
+    ]
+    mark('rank')
+
+    return {'userProfile': user_profile, 'scores': final_scores, 'languages': languages, 'timings': timings, 'documents': documents}
+
+
+def run_recommendation_kernel(candidate_music, played_history, stored_profile, corpus, timeout=None):
+    """
+    score_recommendation을 커널 풀에서 실행 (corpus: 요청에 고정한 IDFTable - 자식에는 revision 번호만 넘김)
+    자식이 고정한 revision을 읽지 못하면 (스냅샷 파일이 이미 다음 revision) 더 새 IDF로 채점하지 않고
+    고정한 revision을 가지고 있는 이 프로세스에서 다시 채점
+    """
+    revision = corpus.revision if corpus is not None else None
+    try:
+        return kernel_pool.run(
+            score_recommendation, candidate_music, played_history, stored_profile, revision, timeout=timeout
+        )
+    except RevisionUnavailable as e:
+        if not kernel_pool.enabled:
+            raise
+        logger.info("[Recommendation] %s - 요청 처리 프로세스에서 채점", e)
+        return score_recommendation(candidate_music, played_history, stored_profile, revision)
+
+
+def parse_deadline(value):
+    """요청의 deadlineMs 검증 (생략하면 KERNEL_DEADLINE_MS, 0이면 기한 없음), 잘못된 값이면 ValueError"""
+    if value is None:
+        return KERNEL_DEADLINE_MS
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+        raise ValueError('deadlineMs는 0 이상의 숫자(밀리초)여야 합니다.')
+    return value
+
+
+def remaining_deadline(deadline_ms):
+    """요청 시작부터 deadline_ms까지 남은 시간(초), 기한이 없으면 None"""
+    if not deadline_ms:
+        return None
+    return max(0.0, deadline_ms / 1000 - (time.perf_counter() - g.request_started))
+
+
+# ========================================
+# 5. 음악 추천 API
+# ========================================
+
+# 서비스 준비 상태 (/ready) - 워밍업(warm_up)이 끝난 뒤 준비 완료
+# (운영 모드(serve.py)에서는 워커 초기화 시점, 개발 서버는 app.run 직전)
+service_state = {
+    'ready': False,
+    'warming': False,
+    'importSeconds': None,
+    'warmup': None
+}
+
+
+def mark_ready(ready=True):
+    """준비 상태 변경 (/ready 응답에 반영)"""
+    service_state['ready'] = ready
+
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """
+    준비 상태 체크 (/health는 프로세스 생존 여부, /ready는 트래픽을 받을 수 있는지 여부)
+    오토스케일러 / 로드 밸런서는 /ready가 200일 때부터 트래픽을 보내야 첫 요청 지연이 없음
+    startup: 모듈 로드 시간, 워밍업 결과 (시간, 재생한 요청 수)
+    """
+    startup = {
+        'importSeconds': service_state['importSeconds'],
+        'warmup': service_state['warmup']
+    }
+
+    if not service_state['ready']:
+        return jsonify({
+            'status': 'warming' if service_state['warming'] else 'starting',
+            'message': 'Recommendation service is not ready',
+            'startup': startup
+        }), 503
+
+    return jsonify({
+        'status': 'ready',
+        'message': 'Recommendation service is ready',
+        'startup': startup
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus 메트릭"""
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """서버 헬스체크"""
+    return jsonify({
+        'status': 'ok',
+        'message': 'Recommendation service is running',
+        'caches': {
+            'analysis': analysis_cache.stats(),
+            'keywords': keyword_cache.stats(),
+            'ranking': ranking_store.stats()
+        },
+        'corpus': corpus_idf.stats() if corpus_idf is not None else None,
+        'kernelPool': kernel_pool.stats(),
+        'coalescing': request_flights.stats(),
+        'vocabulary': term_vocabulary.stats(),
+        'catalog': dict(catalog.stats(), scope='worker') if catalog is not None else None
+    })
+
+
+# 키워드 생성 분석 결과 캐시 (감정 + 필터링된 재생 기록 지문 → 언어 선호도 / 상위 단어)
+# 추천 → 추가 로딩이 반복되는 동안 같은 재생 기록으로 프로필을 다시 계산하지 않도록 재사용
+# (키워드 무작위 선택은 매 요청마다 새로 수행)
+keyword_cache = LRUCache(
+    max_size=int(os.environ.get('KEYWORD_CACHE_SIZE', 5000)),
+    ttl=int(os.environ.get('KEYWORD_CACHE_TTL', 300))
+)
+
+
+def history_fingerprint(played_history):
+    """
+    재생 기록 지문 (프로필 / 언어 선호도 계산에 쓰이는 필드 기준, 순서 포함)
+    정규화한 JSON의 BLAKE2b 해시 - 다른 사용자의 기록과 충돌하지 않고 프로세스가 달라도 같은 값
+    """
+    canonical = json.dumps(
+        [
+            [
+                music.get('videoId'),
+                music.get('playedAt', ''),
+                music.get('title', ''),
+                music.get('description', ''),
+                music.get('channelTitle', '')
+            ]
+            for music in played_history
+        ],
+        ensure_ascii=False,
+        separators=(',', ':')
+    )
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def analyze_keyword_history(emotion, played_history):
+    """
+    키워드 생성용 재생 기록 분석 (캐시 사용)
+    반환: {'languagePreference', 'topTerms'} - 프로필 생성에 실패하면 topTerms는 None
+    """
+    cache_key = (emotion, len(played_history), history_fingerprint(played_history))
+    cached = keyword_cache.get(cache_key)
+    if cached is not None:
+        log_fields(keywordCache='hit')
+        return cached
+
+    # 같은 분석이 다른 요청에서 진행 중이면 그 결과를 기다려 사용
+    analysis, coalesced = request_flights.run(('keywords',) + cache_key, build_keyword_analysis, cache_key, played_history)
+    log_fields(keywordCache='coalesced' if coalesced else 'miss')
+    if coalesced:
+        # 언어 / 프로필 단계 시간은 계산한 요청에서 기록 (여기서는 기다린 시간만 - /recommend와 동일)
+        mark_stage('coalesce')
+
+    return analysis
+
+
+def build_keyword_analysis(cache_key, played_history):
+    """재생 기록 분석 후 키워드 캐시에 저장 (analyze_keyword_history의 캐시 미스 경로)"""
+    # 사용자 언어 선호도 계산
+    user_language_pref = calculate_user_language_preference(played_history)
+    logger.debug("[Keyword Generation] 언어 선호도: %s", user_language_pref)
+    mark_stage('language')
+
+    # 사용자 프로필 생성 (TF-IDF)
+    user_profile = create_user_profile(played_history, top_n=10, corpus=current_corpus())
+    record_history_documents(played_history, 10)
+    mark_stage('profile')
+
+    # 상위 중요 단어 추출 (TF-IDF 가중치 높은 순)
+    top_terms = None
+    if user_profile:
+        top_terms = user_profile.top_terms(10)  # 상위 10개
+
+    analysis = {
+        'languagePreference': user_language_pref,
+        'topTerms': top_terms
+    }
+    keyword_cache.set(cache_key, analysis)
+
+    return analysis
+
+
+@app.route('/generate-keywords', methods=['POST'])
+def generate_keywords():
+    """
+    사용자 맞춤 검색 키워드 생성 API
+
+    Request Body:
+    {
+        "emotion": "happy",
+        "playedHistory": [
+            {
+                "videoId": "xyz789",
+                "title": "Chill Vibes",
+                "description": "Relaxing calm...",
+                "channelTitle": "Music Channel"
+            },
+            ...
+        ]
+    }
+
+    Response:
+    {
+        "success": true,
+        "data": {
+            "keywords": ["keyword1", "keyword2", ...],
+            "languagePreference": {"ko": 0.9, "en": 0.1},
+            "topTerms": ["term1", "term2", ...]
+        }
+    }
+    """
+    try:
+        data = request.json
+
+        emotion = data.get('emotion', '')
+        played_history = data.get('playedHistory', [])
+
+        log_fields(emotion=emotion, historyCount=len(played_history))
+        mark_stage('parse')
+
+        # 현재 감정과 동일한 감정일 때 들었던 음악만 필터링
+        if emotion:
+            filtered_history = [
+                music for music in played_history
+                if music.get('emotion', '') == emotion
+            ]
+            logger.debug("[Keyword Generation] 감정 필터링: %d개 → %d개 (감정: %s)", len(played_history), len(filtered_history), emotion)
+            played_history = filtered_history
+        mark_stage('filter')
+
+        # 1. 재생 기록이 부족하면 기본 키워드 반환
+        if not played_history or len(played_history) < 5:
+            log_fields(outcome='insufficient_history')
+            return jsonify({
+                'success': True,
+                'message': '재생 기록 부족 - 기본 키워드 사용',
+                'data': {
+                    'keywords': [],  # 빈 배열이면 Node.js에서 기본 키워드 사용
+                    'languagePreference': {},
+                    'topTerms': []
+                }
+            })
+
+        # 2~3. 사용자 언어 선호도 + 프로필 상위 단어 (같은 감정 / 재생 기록이면 캐시 재사용)
+        history_analysis = analyze_keyword_history(emotion, played_history)
+        user_language_pref = history_analysis['languagePreference']
+        top_terms = history_analysis['topTerms']
+
+        if top_terms is None:
+            log_fields(outcome='empty_profile')
+            return jsonify({
+                'success': True,
+                'message': '프로필 생성 실패 - 기본 키워드 사용',
+                'data': {
+                    'keywords': [],
+                    'languagePreference': user_language_pref,
+                    'topTerms': []
+                }
+            })
+
+        logger.debug("[Keyword Generation] 상위 단어: %s", top_terms[:5])
+
+        # 5. 감정 키워드 매핑 (각 언어별)
+        emotion_keywords = {
+            'happy': {
+                'ko': ['행복한', '즐거운', '신나는', '밝은', '경쾌한'],
+                'en': ['happy', 'cheerful', 'upbeat', 'energetic', 'joyful'],
+                'ja': ['楽しい', '明るい', 'ハッピー', '元気', '陽気']
+            },
+            'crying': {
+                'ko': ['슬픈', '눈물', '애절한', '감성적인', '우울한'],
+                'en': ['sad', 'crying', 'tearful', 'emotional', 'heartbreaking'],
+                'ja': ['泣ける', '悲しい', '涙', '感動的', '切ない']
+            },
+            'angry': {
+                'ko': ['화난', '강렬한', '격렬한', '빠른', '파워풀'],
+                'en': ['angry', 'intense', 'aggressive', 'powerful', 'fierce'],
+                'ja': ['激しい', '怒り', 'パワフル', '強烈', 'アグレッシブ']
+            },
+            'sleep': {
+                'ko': ['수면', '자장가', '편안한', '잔잔한', '힐링'],
+                'en': ['sleep', 'lullaby', 'peaceful', 'calm', 'relaxing'],
+                'ja': ['睡眠', '子守唄', '静か', 'リラックス', '癒し']
+            },
+            'love': {
+                'ko': ['사랑', '로맨틱', '달콤한', '감성적인', '따뜻한'],
+                'en': ['love', 'romantic', 'sweet', 'emotional', 'tender'],
+                'ja': ['愛', 'ロマンチック', '甘い', 'ラブソング', '優しい']
+            },
+            'excited': {
+                'ko': ['신나는', '흥겨운', '활기찬', '에너지', '업템포'],
+                'en': ['excited', 'energetic', 'lively', 'dynamic', 'upbeat'],
+                'ja': ['エキサイティング', '活気', 'ダイナミック', '元気', 'アップテンポ']
+            }
+        }
+
+        # 6. 언어별 키워드 개수 결정
+        keywords = []
+
+        # 주 언어 결정 (50% 이상이면 주 언어)
+        primary_language = None
+        for lang, ratio in user_language_pref.items():
+            if ratio >= 0.5:
+                primary_language = lang
+                break
+
+        # 감정 키워드 풀 생성
+        emotion_kw = emotion_keywords.get(emotion, emotion_keywords['happy'])
+
+        if primary_language and primary_language in ['ko', 'en', 'ja']:
+            # 주 언어가 명확한 경우 (50% 이상)
+            logger.debug("[Keyword Generation] 주 언어: %s (%.1f%%)", primary_language, user_language_pref[primary_language] * 100)
+
+            # 감정 키워드 풀 (주 언어만)
+            emotion_pool = emotion_kw[primary_language].copy()
+
+            # 사용자 프로필 단어 필터링 (주 언어만, 3글자 이상)
+            user_pool = [
+                term for term in top_terms
+                if detect_language(term) == primary_language and len(term) >= 3
+            ]
+
+            # 감정 키워드 4개 랜덤 선택
+            random.shuffle(emotion_pool)
+            keywords.extend(emotion_pool[:4])
 
             # 사용자 프로필 단어 2개 랜덤 선택
             if len(user_pool) >= 2:
@@ -424,7 +1785,7 @@ def generate_keywords():
 
         else:
             # 주 언어가 없는 경우 (다국어 사용자)
-            print(f"[Keyword Generation] 다국어 사용자")
+            logger.debug("[Keyword Generation] 다국어 사용자")
 
             # 언어별 비율에 따라 키워드 배분
             lang_pools = {}
@@ -436,96 +1797,683 @@ def generate_keywords():
                     if detect_language(term) == lang and len(term) >= 3
                 ]
 
-                # 합쳐서 섞기
-                combined = emotion_pool + user_pool
-                random.shuffle(combined)
-                lang_pools[lang] = combined
+                # 합쳐서 섞기
+                combined = emotion_pool + user_pool
+                random.shuffle(combined)
+                lang_pools[lang] = combined
+
+            # 언어별 키워드 개수 계산 (총 6개)
+            total_keywords = 6
+            lang_keyword_counts = {}
+
+            for lang in ['ko', 'en', 'ja']:
+                ratio = user_language_pref.get(lang, 0)
+                count = max(1, int(ratio * total_keywords))
+                lang_keyword_counts[lang] = count
+
+            # 총 6개로 정규화
+            while sum(lang_keyword_counts.values()) > total_keywords:
+                max_lang = max(lang_keyword_counts.items(), key=lambda x: x[1])[0]
+                lang_keyword_counts[max_lang] -= 1
+
+            logger.debug("[Keyword Generation] 언어별 키워드 개수: %s", lang_keyword_counts)
+
+            # 각 언어별로 키워드 추가
+            for lang, count in lang_keyword_counts.items():
+                if count > 0 and lang in lang_pools:
+                    keywords.extend(lang_pools[lang][:count])
+
+        # 중복 제거 (순서 유지)
+        seen = set()
+        unique_keywords = []
+        for kw in keywords:
+            if kw not in seen:
+                seen.add(kw)
+                unique_keywords.append(kw)
+
+        # 최종 6개로 제한
+        keywords = unique_keywords[:6]
+
+        # 부족하면 감정 키워드로 채움
+        if len(keywords) < 6:
+            for lang in ['ko', 'en', 'ja']:
+                for kw in emotion_kw[lang]:
+                    if kw not in keywords and len(keywords) < 6:
+                        keywords.append(kw)
+
+        logger.debug("[Keyword Generation] 생성된 키워드: %s", keywords)
+        log_fields(outcome='ok', keywordCount=len(keywords))
+        mark_stage('keywords')
+
+        return jsonify({
+            'success': True,
+            'message': '키워드 생성 완료',
+            'data': {
+                'keywords': keywords,
+                'languagePreference': user_language_pref,
+                'topTerms': top_terms[:10]
+            }
+        })
+
+    except Exception as e:
+        logger.exception("[Keyword Generation] 오류 발생: %s", e)
+        log_fields(outcome='error')
+
+        return jsonify({
+            'success': False,
+            'message': f'키워드 생성 중 오류 발생: {str(e)}'
+        }), 500
+
+
+@app.route('/recommend', methods=['POST'])
+def recommend_music():
+    """
+    음악 추천 API
+
+    Request Body:
+    (playedHistory를 생략하면 /profile/refresh로 저장해 둔 userId + emotion 프로필 사용)
+    (k를 주면 상위 k개만 반환하고 나머지는 nextCursor로 이어서 요청)
+    {
+        "userId": "user123",
+        "k": 30,                      // 선택: 페이지 크기 (생략하면 전체)
+        "candidateMusic": [
+            {
+                "videoId": "abc123",
+                "title": "Happy Music",
+                "description": "Upbeat energetic...",
+                "channelTitle": "Music Channel"
+            },
+            ...
+        ],
+        "playedHistory": [
+            {
+                "videoId": "xyz789",
+                "title": "Chill Vibes",
+                "description": "Relaxing calm...",
+                "playedAt": "2025-12-12T10:00:00Z"
+            },
+            ...
+        ]
+    }
+
+    Response:
+    {
+        "success": true,
+        "data": {
+            "recommendedMusic": [
+                {
+                    "videoId": "abc123",
+                    "score": 0.87,
+                    "title": "Happy Music"
+                },
+                ...
+            ],
+            "totalCount": 120,        // k를 준 경우
+            "nextCursor": "..."       // k를 준 경우, 마지막 페이지면 null
+        }
+    }
+
+    다음 페이지: {"userId": "user123", "cursor": "<nextCursor>", "k": 30}
+    (이전에 채점한 결과를 재사용 - 다른 워커가 채점한 결과도 공유 저장소에서 읽음, 커서가 만료되면 404 → 처음부터 다시 요청)
+
+    간결 응답: {"compact": true, "includeLanguage": true, "includeProfile": false, ...}
+    → "data": {"videoIds": ["abc123", ...], "scores": [0.87, ...], "languages": ["ko", ...], "userProfileSize": 25}
+    (후보 제목 / 설명 등은 다시 보내지 않음, userProfile은 includeProfile일 때만)
+
+    DEDUP_THRESHOLD가 설정되어 있으면 근사 중복 후보(제목 토큰의 자카드 유사도 DEDUP_THRESHOLD 이상)는
+    먼저 온 후보만 채점 / 반환 (기본은 사용 안 함, "dedup": false면 설정과 무관하게 모든 후보 반환, totalCount는 묶은 뒤 후보 수)
+
+    동시에 들어온 같은 요청(userId, 감정, 재생 기록, 후보 videoId가 같은 요청)은 한 번만 채점하고 결과 공유
+    (기다리는 요청도 deadlineMs가 지나면 원본 순서로 응답 - "partial": true)
+    합치기는 워커 프로세스 안에서만 동작 (다른 gunicorn 워커로 간 같은 요청은 각자 채점, /health의 coalescing.scope)
+
+    커널 풀 사용 시 (KERNEL_POOL_WORKERS > 0)
+    - deadlineMs(기본 KERNEL_DEADLINE_MS) 안에 채점이 끝나지 않으면 원본 순서로 응답 ("partial": true)
+    - 풀 대기열이 가득 차면 503 (Retry-After)
+    """
+    try:
+        data = request.json
+
+        user_id = data.get('userId')
+        current_emotion = data.get('emotion', '')  # 현재 감정
+        candidate_music = data.get('candidateMusic', [])
+        played_history = data.get('playedHistory')
+
+        options = parse_response_options(data)
+        try:
+            k = parse_page_size(data.get('k'))
+            deadline_ms = parse_deadline(data.get('deadlineMs'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        if data.get('cursor'):
+            return recommend_next_page(user_id, data['cursor'], k, options)
+
+        # 재생 기록 없이 userId만 보낸 경우 저장된 프로필 사용
+        stored_profile = None
+        if played_history is None:
+            played_history = []
+            if user_id:
+                stored_profile = profile_store.get(user_id, current_emotion)
+                log_fields(storedProfile=stored_profile is not None)
+
+        log_fields(
+            userId=user_id,
+            emotion=current_emotion,
+            candidateCount=len(candidate_music),
+            historyCount=len(played_history)
+        )
+        index_candidates(candidate_music, current_emotion)
+        mark_stage('parse')
+
+        # 근사 중복 후보(재업로드 / 가사 영상 / 라이브 버전)는 먼저 온 후보 하나만 채점 / 응답
+        if data.get('dedup', True):
+            candidate_music, collapsed_count = collapse_near_duplicates(candidate_music)
+            log_fields(collapsedCount=collapsed_count)
+            mark_stage('dedup')
+
+        # 현재 감정과 동일한 감정일 때 들었던 음악만 필터링
+        if current_emotion and stored_profile is None:
+            filtered_history = filter_history_by_emotion(played_history, current_emotion)
+            logger.debug("[Recommendation] 감정 필터링: %d개 → %d개 (감정: %s)", len(played_history), len(filtered_history), current_emotion)
+            played_history = filtered_history
+        mark_stage('filter')
+
+        # 1. 재생 기록(저장된 프로필)이 없으면 원본 순서 그대로 반환
+        if stored_profile is None and not played_history:
+            log_fields(outcome='no_history')
+            ranking = create_ranking(user_id, candidate_music, [0.0] * len(candidate_music), k=k)
+            response_data = ranking_response(ranking, options, k)
+
+            return jsonify({
+                'success': True,
+                'message': '추천 완료 (재생 기록 없음)',
+                'data': response_data
+            })
+
+        # 2~3. 사용자 취향 벡터 생성 + 후보 채점 (커널 풀이 켜져 있으면 다른 프로세스에서 실행)
+        # 같은 요청이 이미 채점 중이면 그 결과를 함께 사용 (예외도 그대로 전달됨, 기다리는 요청도 자기 기한까지만 기다림)
+        # 코퍼스 IDF는 revision 번호만 넘기고 자식 프로세스가 같은 revision으로 채점
+        deadline = remaining_deadline(deadline_ms)
+        corpus = current_corpus()
+        try:
+            scored, coalesced = request_flights.run(
+                recommendation_flight_key(user_id, current_emotion, played_history, candidate_music, stored_profile),
+                run_recommendation_kernel, candidate_music, played_history, stored_profile, corpus, deadline,
+                timeout=deadline
+            )
+        except PoolSaturated as e:
+            logger.warning("[Recommendation] %s", e)
+            log_fields(outcome='overloaded')
+            return jsonify({
+                'success': False,
+                'message': '추천 서버가 혼잡합니다. 잠시 후 다시 시도해주세요.'
+            }), 503, {'Retry-After': '1'}
+        except DeadlineExceeded as e:
+            logger.warning("[Recommendation] %s - 원본 순서로 응답", e)
+            log_fields(outcome='deadline_exceeded')
+            ranking = create_ranking(user_id, candidate_music, [0.0] * len(candidate_music), k=k)
+            response_data = ranking_response(ranking, options, k)
+            response_data['partial'] = True
+
+            return jsonify({
+                'success': True,
+                'message': '추천 완료 (처리 시간 초과 - 원본 순서)',
+                'data': response_data
+            })
+
+        if coalesced:
+            # 채점 단계 시간은 계산한 요청에서만 기록 (여기서는 기다린 시간만)
+            log_fields(coalesced=True)
+            mark_stage('coalesce')
+        else:
+            record_stages(scored['timings'])
+            record_corpus_documents(scored['documents'])
+            mark_stage('offload')
+        user_profile = scored['userProfile']
+
+        if scored['scores'] is None:
+            log_fields(outcome='empty_profile')
+            ranking = create_ranking(user_id, candidate_music, [0.0] * len(candidate_music), k=k)
+            response_data = ranking_response(ranking, options, k, user_profile=user_profile)
+
+            return jsonify({
+                'success': True,
+                'message': '추천 완료 (프로필 생성 실패)',
+                'data': response_data
+            })
+
+        # 4. 유사도 높은 순으로 정렬 (k를 주면 상위 k개만 선택)
+        final_scores = scored['scores']
+        ranking = create_ranking(user_id, candidate_music, final_scores, scored['languages'], k)
+        response_data = ranking_response(ranking, options, k, user_profile=user_profile)  # 사용자 프로필 벡터 반환
+        mark_stage('sort')
+
+        logger.debug("[Recommendation] 추천 완료 - 상위 3개 점수: %s", heapq.nlargest(3, final_scores))
+        log_fields(outcome='ok', profileSize=len(user_profile), compact=options['compact'])
+
+        return jsonify({
+            'success': True,
+            'message': '추천 완료',
+            'data': response_data
+        })
+
+    except Exception as e:
+        logger.exception("[Recommendation] 오류 발생: %s", e)
+        log_fields(outcome='error')
+
+        return jsonify({
+            'success': False,
+            'message': f'추천 중 오류 발생: {str(e)}'
+        }), 500
+
 
-            # 언어별 키워드 개수 계산 (총 6개)
-            total_keywords = 6
-            lang_keyword_counts = {}
+def recommend_next_page(user_id, cursor, k, options):
+    """
+    /recommend 다음 페이지 (이전 요청의 채점 결과 재사용)
+    k를 생략하면 첫 요청의 k 사용
+    """
+    ranking, offset = load_ranking(cursor, user_id)
+    mark_stage('parse')
 
-            for lang in ['ko', 'en', 'ja']:
-                ratio = user_language_pref.get(lang, 0)
-                count = max(1, int(ratio * total_keywords))
-                lang_keyword_counts[lang] = count
+    if ranking is None:
+        log_fields(outcome='cursor_expired', userId=user_id)
+        return jsonify({
+            'success': False,
+            'message': '페이지 커서가 만료되었습니다. 처음부터 다시 요청해주세요.'
+        }), 404
 
-            # 총 6개로 정규화
-            while sum(lang_keyword_counts.values()) > total_keywords:
-                max_lang = max(lang_keyword_counts.items(), key=lambda x: x[1])[0]
-                lang_keyword_counts[max_lang] -= 1
+    response_data = ranking_response(ranking, options, k or ranking['k'], offset)
+    mark_stage('sort')
 
-            print(f"[Keyword Generation] 언어별 키워드 개수: {lang_keyword_counts}")
+    log_fields(outcome='ok', userId=user_id, offset=offset, compact=options['compact'])
 
-            # 각 언어별로 키워드 추가
-            for lang, count in lang_keyword_counts.items():
-                if count > 0 and lang in lang_pools:
-                    keywords.extend(lang_pools[lang][:count])
+    return jsonify({
+        'success': True,
+        'message': '추천 완료',
+        'data': response_data
+    })
 
-        # 중복 제거 (순서 유지)
-        seen = set()
-        unique_keywords = []
-        for kw in keywords:
-            if kw not in seen:
-                seen.add(kw)
-                unique_keywords.append(kw)
 
-        # 최종 6개로 제한
-        keywords = unique_keywords[:6]
+@app.route('/recommend/batch', methods=['POST'])
+def recommend_music_batch():
+    """
+    여러 사용자 일괄 추천 API (공통 후보 목록을 한 번만 벡터화하고 전체 사용자를 행렬 곱으로 채점)
 
-        # 부족하면 감정 키워드로 채움
-        if len(keywords) < 6:
-            for lang in ['ko', 'en', 'ja']:
-                for kw in emotion_kw[lang]:
-                    if kw not in keywords and len(keywords) < 6:
-                        keywords.append(kw)
+    Request Body:
+    {
+        "candidateMusic": [{"videoId", "title", "description", "channelTitle", "tags"}, ...],
+        "requests": [
+            {
+                "userId": "user123",
+                "emotion": "happy",
+                "playedHistory": [...]    // 생략하면 저장된 프로필 사용
+            },
+            ...
+        ],
+        "limit": 50,                       // 사용자별 반환 개수 (1 이상의 정수, 생략하면 전체 - 잘못된 값이면 400)
+        "dedup": true                      // 근사 중복 후보 묶기 (/recommend와 동일, DEDUP_THRESHOLD가 0이면 사용 안 함)
+    }
+
+    Response:
+    {
+        "success": true,
+        "data": {
+            "results": [
+                {
+                    "userId": "user123",
+                    "emotion": "happy",
+                    "recommendedMusic": [{"videoId": "abc123", "score": 0.87, "language": "ko"}, ...],
+                    "userProfileSize": 25
+                },
+                ...
+            ]
+        }
+    }
+    (후보 메타데이터는 호출 측이 이미 가지고 있으므로 videoId, 점수, 언어만 반환)
+    """
+    try:
+        data = request.json
+
+        candidate_music = data.get('candidateMusic', [])
+        user_requests = data.get('requests', [])
+        try:
+            limit = parse_page_size(data.get('limit'), 'limit')
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        log_fields(userCount=len(user_requests), candidateCount=len(candidate_music))
+        # 모든 사용자가 같은 감정일 때만 후보를 그 감정으로 기록
+        request_emotions = {user_request.get('emotion') for user_request in user_requests}
+        index_candidates(candidate_music, request_emotions.pop() if len(request_emotions) == 1 else None)
+        mark_stage('parse')
+
+        if data.get('dedup', True):
+            candidate_music, collapsed_count = collapse_near_duplicates(candidate_music)
+            log_fields(collapsedCount=collapsed_count)
+            mark_stage('dedup')
+
+        # 1. 사용자별 취향 벡터 / 언어 선호도 (전체 사용자가 같은 코퍼스 IDF 사용)
+        corpus = current_corpus()
+        resolved = [
+            resolve_user_profile(
+                user_request.get('userId'),
+                user_request.get('emotion', ''),
+                user_request.get('playedHistory'),
+                corpus=corpus
+            )
+            for user_request in user_requests
+        ]
+        mark_stage('profile')
+
+        # 2. 후보 음악 벡터화 (한 번만)
+        candidate_documents, candidate_matrix = vectorize_candidates(candidate_music, corpus=corpus)
+        record_corpus_documents((doc['videoId'], doc['tokens']) for doc in candidate_documents)
+        mark_stage('vectorize')
+
+        # 3. 전체 사용자 × 후보 유사도 행렬
+        similarity_matrix = score_candidates_batch([profile for profile, _ in resolved], candidate_matrix)
+        mark_stage('score')
+
+        # 4. 사용자별 언어 가중치 적용 및 상위 limit개 선택
+        # (프로필이 없는 사용자는 점수가 모두 0이므로 원본 순서 유지)
+        results = []
+        for user_request, (user_profile, user_language_pref), similarities in zip(user_requests, resolved, similarity_matrix.tolist()):
+            final_scores = [
+                round(apply_language_boost(similarity, doc['language'], user_language_pref), 4)
+                for doc, similarity in zip(candidate_documents, similarities)
+            ]
+
+            results.append({
+                'userId': user_request.get('userId'),
+                'emotion': user_request.get('emotion', ''),
+                'recommendedMusic': [
+                    {
+                        'videoId': candidate_documents[i]['videoId'],
+                        'score': final_scores[i],
+                        'language': candidate_documents[i]['language']
+                    }
+                    for i in select_top_k(final_scores, limit)
+                ],
+                'userProfileSize': len(user_profile)
+            })
 
-        print(f"[Keyword Generation] 생성된 키워드: {keywords}")
+        mark_stage('rank')
+        log_fields(outcome='ok')
 
         return jsonify({
             'success': True,
-            'message': '키워드 생성 완료',
+            'message': '일괄 추천 완료',
             'data': {
-                'keywords': keywords,
-                'languagePreference': user_language_pref,
-                'topTerms': top_terms[:10]
+                'results': results
             }
         })
 
     except Exception as e:
-        print(f"[Keyword Generation] 오류 발생: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[Batch Recommendation] 오류 발생: %s", e)
+        log_fields(outcome='error')
 
         return jsonify({
             'success': False,
-            'message': f'키워드 생성 중 오류 발생: {str(e)}'
+            'message': f'일괄 추천 중 오류 발생: {str(e)}'
         }), 500
 
 
-@app.route('/recommend', methods=['POST'])
-def recommend_music():
+@app.route('/recommend/catalog', methods=['POST'])
+def recommend_from_catalog():
     """
-    음악 추천 API
+    카탈로그 추천 API (지금까지 본 후보 음악 중에서 추천 - YouTube 검색 없이)
 
     Request Body:
     {
         "userId": "user123",
-        "candidateMusic": [
-            {
-                "videoId": "abc123",
-                "title": "Happy Music",
-                "description": "Upbeat energetic...",
-                "channelTitle": "Music Channel"
-            },
-            ...
-        ],
+        "emotion": "happy",              // 이 감정으로 받은 후보만 추천 (생략하면 전체 카탈로그)
+        "playedHistory": [...],          // 생략하면 저장된 프로필 사용
+        "k": 50,                         // 페이지 크기 (기본 50)
+        "excludeVideoIds": ["abc123"],   // 이미 받은 음악 제외
+        "compact": true                  // /recommend와 같은 응답 옵션 (includeLanguage, includeProfile)
+    }
+
+    Response: /recommend와 같은 형식 (totalCount, nextCursor 포함)
+              + "catalogSize": 카탈로그 문서 수, "candidateCount": 검색으로 순위를 매긴 문서 수 (최대 CATALOG_CANDIDATES)
+    (카탈로그는 title, channelTitle, thumbnailUrl, duration만 보관 - description, tags는 빈 값)
+    다음 페이지: {"userId": "user123", "cursor": "<nextCursor>"}
+    (카탈로그는 워커 프로세스별 - 스냅샷 이후 색인한 후보는 그 후보를 받은 워커에서만 검색됨,
+     다음 페이지는 커서로 첫 페이지 채점 결과를 읽으므로 다른 워커로 가도 같은 순서)
+    """
+    try:
+        data = request.json
+
+        user_id = data.get('userId')
+        emotion = data.get('emotion', '')
+        played_history = data.get('playedHistory')
+        exclude = set(data.get('excludeVideoIds', []))
+
+        options = parse_response_options(data)
+        try:
+            k = parse_page_size(data.get('k')) or CATALOG_DEFAULT_K
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        if data.get('cursor'):
+            return recommend_next_page(user_id, data['cursor'], k, options)
+
+        if catalog is None:
+            log_fields(outcome='catalog_disabled')
+            return jsonify({
+                'success': False,
+                'message': '카탈로그가 비활성화되어 있습니다.'
+            }), 503
+
+        log_fields(userId=user_id, emotion=emotion, catalogSize=len(catalog))
+        mark_stage('parse')
+
+        # 1. 사용자 취향 벡터 / 언어 선호도
+        corpus = current_corpus()
+        user_profile, user_language_pref = resolve_user_profile(user_id, emotion, played_history, corpus=corpus)
+        mark_stage('profile')
+
+        # 2. 카탈로그 검색 + 채점
+        documents, final_scores = search_catalog(
+            user_profile, user_language_pref, exclude, corpus=corpus, emotion=emotion or None
+        )
+        mark_stage('retrieve')
+
+        # 3. 상위 k개 선택
+        ranking = create_ranking(
+            user_id,
+            [doc['music'] for doc in documents],
+            final_scores,
+            [doc['language'] for doc in documents],
+            k
+        )
+        response_data = ranking_response(ranking, options, k, user_profile=user_profile)
+        response_data.update(catalogSize=len(catalog), candidateCount=len(documents))
+        mark_stage('sort')
+
+        log_fields(
+            outcome='ok' if user_profile else 'empty_profile',
+            candidateCount=len(documents),
+            catalogSearch=CATALOG_SEARCH
+        )
+
+        return jsonify({
+            'success': True,
+            'message': '카탈로그 추천 완료',
+            'data': response_data
+        })
+
+    except Exception as e:
+        logger.exception("[Catalog Recommendation] 오류 발생: %s", e)
+        log_fields(outcome='error')
+
+        return jsonify({
+            'success': False,
+            'message': f'카탈로그 추천 중 오류 발생: {str(e)}'
+        }), 500
+
+
+@app.route('/recommend/stream', methods=['POST'])
+def recommend_stream():
+    """
+    스트리밍 추천 API (NDJSON) - 후보를 받는 대로 채점하고 상위 k개만 유지 (요청당 메모리가 후보 수와 무관)
+
+    Request Body (Content-Type: application/x-ndjson, 한 줄에 JSON 하나):
+    {"userId": "user123", "emotion": "happy", "playedHistory": [...], "k": 50, "compact": true}   // 첫 줄: 요청 옵션
+    {"videoId": "abc123", "title": "Happy Music", ...}                                            // 이후: 후보 음악
+    [{"videoId": "def456", ...}, ...]                                                             // 또는 후보 배열
+    (playedHistory를 생략하면 저장된 userId + emotion 프로필 사용, k 기본값 50, 같은 videoId는 처음 것만 사용)
+    (DEDUP_THRESHOLD가 설정되어 있으면 근사 중복 후보는 /recommend와 같이 먼저 온 후보만 채점 - 첫 줄에 "dedup": false면 사용 안 함)
+
+    Response (application/x-ndjson):
+    {"success": true, "message": "추천 완료", "data": {"totalCount": 1200, "count": 50, "userProfileSize": 25}}
+    {"videoId": "abc123", "score": 0.87, "title": "Happy Music", ...}    // 이후: 점수 내림차순 추천 항목
+    (compact면 항목은 videoId / score (/ language)만, 상위 k개만 보관하므로 nextCursor 없음)
+    """
+    if request.mimetype not in NDJSON_MIMETYPES:
+        return jsonify({
+            'success': False,
+            'message': 'Content-Type은 application/x-ndjson이어야 합니다.'
+        }), 415
+
+    try:
+        records = iter_ndjson(request)
+        try:
+            header = next(records, None)
+            if not isinstance(header, dict):
+                raise ValueError('첫 줄은 요청 옵션 객체여야 합니다.')
+            k = parse_page_size(header.get('k')) or STREAM_DEFAULT_K
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        user_id = header.get('userId')
+        emotion = header.get('emotion', '')
+        options = parse_response_options(header)
+
+        log_fields(userId=user_id, emotion=emotion, streamed=True)
+        mark_stage('parse')
+
+        # 1. 사용자 취향 벡터 / 언어 선호도 (코퍼스 IDF는 요청 시작 시점 revision으로 고정)
+        corpus = current_corpus()
+        user_profile, user_language_pref = resolve_user_profile(user_id, emotion, header.get('playedHistory'), corpus=corpus)
+        mark_stage('profile')
+
+        # 2. 후보 수신 → 청크별 근사 중복 묶기 / 분석 / 채점 → 상위 k개 힙 (제너레이터 파이프라인 - 현재 청크만 메모리에 유지)
+        chunks = chunk_candidates(records)
+        dedup_filter = None
+        if header.get('dedup', True) and DEDUP_THRESHOLD > 0:
+            dedup_filter = NearDuplicateFilter(DEDUP_THRESHOLD)
+            chunks = collapse_candidate_chunks(chunks, dedup_filter)
+        try:
+            top, total_count = stream_top_k(
+                score_candidate_chunks(chunks, user_profile, user_language_pref, corpus=corpus, emotion=emotion),
+                k
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        mark_stage('stream')
+
+        # 3. 요약 한 줄 + 추천 항목 한 줄씩
+        summary = {'totalCount': total_count, 'count': len(top)}
+        if options['includeProfile']:
+            summary['userProfile'] = user_profile.to_dict()
+        summary['userProfileSize'] = len(user_profile)
+
+        items = []
+        for music, language, score in top:
+            if options['compact']:
+                item = {'videoId': music['videoId'], 'score': score}
+                if options['includeLanguage']:
+                    item['language'] = language
+            else:
+                item = format_recommendation(music, score, language)
+            items.append(item)
+
+        log_fields(
+            outcome='ok' if user_profile else 'empty_profile',
+            candidateCount=total_count,
+            profileSize=len(user_profile)
+        )
+        if dedup_filter is not None:
+            log_fields(collapsedCount=dedup_filter.collapsed)
+
+        return ndjson_response([{'success': True, 'message': '추천 완료', 'data': summary}] + items)
+
+    except RequestEntityTooLarge as e:
+        log_fields(outcome='too_large')
+        return jsonify({
+            'success': False,
+            'message': e.description
+        }), 413
+
+    except Exception as e:
+        logger.exception("[Stream Recommendation] 오류 발생: %s", e)
+        log_fields(outcome='error')
+
+        return jsonify({
+            'success': False,
+            'message': f'스트리밍 추천 중 오류 발생: {str(e)}'
+        }), 500
+
+
+# ========================================
+# 5-1. 사용자 프로필 API
+# ========================================
+
+@app.route('/profile/<user_id>', methods=['GET'])
+def get_profile(user_id):
+    """
+    저장된 사용자 프로필 조회 API
+
+    Query: ?emotion=happy (생략하면 감정 구분 없는 전체 프로필)
+    """
+    emotion = request.args.get('emotion', '')
+    stored_profile = profile_store.get(user_id, emotion)
+
+    if stored_profile is None:
+        return jsonify({
+            'success': False,
+            'message': '저장된 프로필이 없습니다.'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'message': '프로필 조회 완료',
+        'data': stored_profile
+    })
+
+
+@app.route('/profile/refresh', methods=['POST'])
+def refresh_profile():
+    """
+    사용자 프로필 재계산 및 저장 API
+
+    Request Body:
+    {
+        "userId": "user123",
+        "emotion": "happy",          // 생략하면 전체 프로필 + 기록에 등장한 감정별 프로필 모두 갱신
         "playedHistory": [
             {
                 "videoId": "xyz789",
                 "title": "Chill Vibes",
-                "description": "Relaxing calm...",
-                "playedAt": "2025-12-12T10:00:00Z"
+                "channelTitle": "Music Channel",
+                "playedAt": "2025-12-12T10:00:00Z",
+                "emotion": "happy"
             },
             ...
         ]
@@ -535,14 +2483,7 @@ def recommend_music():
     {
         "success": true,
         "data": {
-            "recommendedMusic": [
-                {
-                    "videoId": "abc123",
-                    "score": 0.87,
-                    "title": "Happy Music"
-                },
-                ...
-            ]
+            "profiles": [{"userId", "emotion", "profile", "languagePreference", "musicCount", "updatedAt"}, ...]
         }
     }
     """
@@ -550,153 +2491,239 @@ def recommend_music():
         data = request.json
 
         user_id = data.get('userId')
-        current_emotion = data.get('emotion', '')  # 현재 감정
-        candidate_music = data.get('candidateMusic', [])
         played_history = data.get('playedHistory', [])
 
-        print(f"[Recommendation] 요청 - User: {user_id}, 감정: {current_emotion}, 후보: {len(candidate_music)}개, 기록: {len(played_history)}개")
+        if not user_id:
+            return jsonify({
+                'success': False,
+                'message': 'userId는 필수입니다.'
+            }), 400
 
-        # 현재 감정과 동일한 감정일 때 들었던 음악만 필터링
-        if current_emotion:
-            filtered_history = [
-                music for music in played_history
-                if music.get('emotion', '') == current_emotion
-            ]
-            print(f"[Recommendation] 감정 필터링: {len(played_history)}개 → {len(filtered_history)}개 (감정: {current_emotion})")
-            played_history = filtered_history
+        if data.get('emotion'):
+            emotions = [data['emotion']]
+        else:
+            emotions = profile_emotions(played_history)
+        mark_stage('parse')
 
-        # 1. 재생 기록이 없으면 원본 순서 그대로 반환
-        if not played_history or len(played_history) == 0:
-            print("[Recommendation] 재생 기록 없음 - 원본 순서 반환")
-            result = [
-                {
-                    'videoId': music['videoId'],
-                    'score': 0.0,
-                    'title': music.get('title', ''),
-                    'description': music.get('description', ''),
-                    'channelTitle': music.get('channelTitle', ''),
-                    'thumbnailUrl': music.get('thumbnailUrl', ''),
-                    'duration': music.get('duration', 0),
-                    'tags': music.get('tags', [])
-                }
-                for music in candidate_music
-            ]
+        corpus = current_corpus()
+        profiles = [
+            refresh_user_profile(user_id, emotion, played_history, corpus=corpus)
+            for emotion in emotions
+        ]
+        mark_stage('profile')
 
-            return jsonify({
-                'success': True,
-                'message': '추천 완료 (재생 기록 없음)',
-                'data': {
-                    'recommendedMusic': result
-                }
-            })
+        log_fields(outcome='ok', userId=user_id, emotions=emotions, historyCount=len(played_history))
 
-        # 2. 사용자 취향 벡터 생성
-        user_profile = create_user_profile(played_history, top_n=10)
+        return jsonify({
+            'success': True,
+            'message': '프로필 갱신 완료',
+            'data': {
+                'profiles': profiles
+            }
+        })
 
-        if not user_profile:
-            print("[Recommendation] 사용자 프로필 생성 실패 - 원본 순서 반환")
-            result = [
-                {
-                    'videoId': music['videoId'],
-                    'score': 0.0,
-                    'title': music.get('title', ''),
-                    'description': music.get('description', ''),
-                    'channelTitle': music.get('channelTitle', ''),
-                    'thumbnailUrl': music.get('thumbnailUrl', ''),
-                    'duration': music.get('duration', 0),
-                    'tags': music.get('tags', [])
-                }
-                for music in candidate_music
-            ]
+    except Exception as e:
+        logger.exception("[Profile] 오류 발생: %s", e)
+        log_fields(outcome='error')
 
-            return jsonify({
-                'success': True,
-                'message': '추천 완료 (프로필 생성 실패)',
-                'data': {
-                    'recommendedMusic': result,
-                    'userProfile': {},
-                    'userProfileSize': 0
-                }
-            })
+        return jsonify({
+            'success': False,
+            'message': f'프로필 갱신 중 오류 발생: {str(e)}'
+        }), 500
 
-        print(f"[Recommendation] 사용자 프로필 생성 완료 - {len(user_profile)}개 단어")
 
-        # 2-1. 사용자 언어 선호도 계산
-        user_language_pref = calculate_user_language_preference(played_history)
-        print(f"[Recommendation] 언어 선호도: {user_language_pref}")
-
-        # 3. 후보 음악 벡터화 및 유사도 계산
-        candidate_documents = []
-        for music in candidate_music:
-            text = f"{music.get('title', '')} {music.get('description', '')} {music.get('channelTitle', '')}"
-            tags_text = ' '.join(music.get('tags', []))
-            text = f"{text} {tags_text}"
-
-            tokens = preprocess_text(text)
-            candidate_documents.append({
-                'videoId': music['videoId'],
-                'tokens': tokens,
-                'music': music
-            })
+@app.route('/profile/append', methods=['POST'])
+def append_profile():
+    """
+    새로 재생한 음악 하나를 사용자 프로필에 증분 반영하는 API
+    (전체 프로필과 해당 곡 감정의 프로필을 갱신, 같은 재생을 다시 보내도 한 번만 반영)
 
-        # IDF 계산 (후보 음악 전체 기준)
-        idf = calculate_idf(candidate_documents)
-
-        # 각 후보 음악의 유사도 계산
-        scored_music = []
-        for doc in candidate_documents:
-            tf = calculate_tf(doc['tokens'])
-            tfidf = calculate_tfidf(tf, idf)
-
-            # 기본 TF-IDF 유사도 계산
-            similarity = cosine_similarity(user_profile, tfidf)
-
-            # 언어 감지 및 가중치 적용
-            music_text = f"{doc['music'].get('title', '')} {doc['music'].get('description', '')} {doc['music'].get('channelTitle', '')}"
-            music_language = detect_language(music_text)
-
-            # 사용자가 선호하는 언어면 점수 상승 (최대 50% 보너스)
-            language_boost = user_language_pref.get(music_language, 0) * 0.5
-            final_score = similarity * (1 + language_boost)
-
-            scored_music.append({
-                'videoId': doc['videoId'],
-                'score': round(final_score, 4),
-                'title': doc['music'].get('title', ''),
-                'description': doc['music'].get('description', ''),
-                'channelTitle': doc['music'].get('channelTitle', ''),
-                'thumbnailUrl': doc['music'].get('thumbnailUrl', ''),
-                'duration': doc['music'].get('duration', 0),
-                'tags': doc['music'].get('tags', []),
-                'language': music_language  # 디버깅용
-            })
+    Request Body:
+    {
+        "userId": "user123",
+        "music": {
+            "videoId": "xyz789",
+            "title": "Chill Vibes",
+            "channelTitle": "Music Channel",
+            "playedAt": "2025-12-12T10:00:00Z",
+            "emotion": "happy"
+        }
+    }
+
+    Response:
+    {
+        "success": true,
+        "data": {
+            "profiles": [{"userId", "emotion", "profile", "languagePreference", "musicCount", "updatedAt"}, ...]
+        }
+    }
+    (전체 프로필이 아직 없으면 404 - /profile/refresh로 먼저 생성)
+    """
+    try:
+        data = request.json
+
+        user_id = data.get('userId')
+        music = data.get('music')
 
-        # 4. 유사도 높은 순으로 정렬
-        scored_music.sort(key=lambda x: x['score'], reverse=True)
+        if not user_id or not music:
+            return jsonify({
+                'success': False,
+                'message': 'userId와 music은 필수입니다.'
+            }), 400
+
+        base_profile = profile_store.get(user_id, '', include_state=True)
+        if base_profile is None or base_profile['state'] is None:
+            return jsonify({
+                'success': False,
+                'message': '저장된 프로필이 없습니다. /profile/refresh로 먼저 생성해주세요.'
+            }), 404
+
+        emotions = ['']
+        if music.get('emotion'):
+            emotions.append(music['emotion'])
+        mark_stage('parse')
+
+        profiles = [
+            append_user_profile(user_id, emotion, music)
+            for emotion in emotions
+        ]
+        mark_stage('profile')
 
-        print(f"[Recommendation] 추천 완료 - 상위 3개 점수: {[m['score'] for m in scored_music[:3]]}")
+        log_fields(outcome='ok', userId=user_id, emotions=emotions, videoId=music.get('videoId'))
 
         return jsonify({
             'success': True,
-            'message': '추천 완료',
+            'message': '프로필 증분 갱신 완료',
             'data': {
-                'recommendedMusic': scored_music,
-                'userProfile': user_profile,  # 사용자 프로필 벡터 반환
-                'userProfileSize': len(user_profile)
+                'profiles': profiles
             }
         })
 
     except Exception as e:
-        print(f"[Recommendation] 오류 발생: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[Profile] 오류 발생: %s", e)
+        log_fields(outcome='error')
 
         return jsonify({
             'success': False,
-            'message': f'추천 중 오류 발생: {str(e)}'
+            'message': f'프로필 증분 갱신 중 오류 발생: {str(e)}'
         }), 500
 
 
+# ========================================
+# 5-2. 시작 워밍업
+# ========================================
+
+# 번들된 샘플 요청 (WARMUP_REPLAY=0이면 재생하지 않고 핫 패스 함수만 미리 실행)
+WARMUP_REQUESTS_PATH = os.environ.get(
+    'WARMUP_REQUESTS_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'warmup_requests.json')
+)
+WARMUP_REPLAY = os.environ.get('WARMUP_REPLAY', '1') != '0'
+
+# 미리 실행용 음악 (한국어 / 영어 / 일본어 - 언어 감지, 토큰화 정규식을 모두 거치도록)
+WARMUP_MUSIC = [
+    {'videoId': 'warmup-ko', 'title': '아이유 - 밤편지 (Official MV)', 'description': '잔잔한 발라드 플레이리스트', 'channelTitle': '1theK'},
+    {'videoId': 'warmup-en', 'title': 'Lofi Girl - chill beats to relax/study to', 'description': 'lofi hip hop radio', 'channelTitle': 'Lofi Girl'},
+    {'videoId': 'warmup-ja', 'title': 'YOASOBI「夜に駆ける」Official Music Video', 'description': '作業用 メドレー', 'channelTitle': 'Ayase / YOASOBI'}
+]
+
+
+def preload_hot_path():
+    """
+    /recommend 핫 패스 함수를 요청 없이 한 번씩 실행 (numpy 연산 / 정규식 첫 사용 비용을 시작 시점에 지불)
+    코퍼스 IDF 없이 계산하므로 저장 상태는 바뀌지 않음
+    """
+    profile = create_user_profile(WARMUP_MUSIC)
+    language_pref = calculate_user_language_preference(WARMUP_MUSIC)
+    candidate_documents, candidate_matrix = vectorize_candidates(WARMUP_MUSIC)
+    similarities = score_candidates(profile, candidate_matrix)
+    score_candidates_batch([profile, profile], candidate_matrix)
+    for doc, similarity in zip(candidate_documents, similarities.tolist()):
+        apply_language_boost(similarity, doc['language'], language_pref)
+    select_top_k(similarities.tolist(), k=2)
+    collapse_near_duplicates(WARMUP_MUSIC)
+    profile.to_dict()
+
+
+def load_warmup_requests(path=None):
+    """
+    샘플 요청 파일 {"requests": [{"method", "path", "headers", "json" 또는 "ndjson"}, ...]} 읽기
+    (ndjson은 줄 목록 - 첫 줄은 요청 옵션, 파일이 없으면 빈 목록)
+    """
+    path = path or WARMUP_REQUESTS_PATH
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['requests']
+
+
+def replay_warmup_requests(warmup_requests):
+    """
+    샘플 요청을 테스트 클라이언트로 재생 (라우팅 / 파싱 / 직렬화 / 압축까지 실제 요청과 같은 경로)
+    반환: (재생한 요청 수, 실패한 요청 수)
+    """
+    client = app.test_client()
+    failed = 0
+    for index, warmup_request in enumerate(warmup_requests):
+        headers = {'X-Request-Id': f"warmup-{index}", **warmup_request.get('headers', {})}
+        if 'ndjson' in warmup_request:
+            response = client.open(
+                warmup_request['path'], method=warmup_request.get('method', 'POST'), headers=headers,
+                data='\n'.join(json.dumps(line, ensure_ascii=False) for line in warmup_request['ndjson']),
+                content_type='application/x-ndjson'
+            )
+        else:
+            response = client.open(
+                warmup_request['path'], method=warmup_request.get('method', 'POST'), headers=headers,
+                json=warmup_request.get('json')
+            )
+        response.close()
+        if response.status_code >= 400:
+            failed += 1
+            logger.warning("[Warmup] %s %s → %d", warmup_request.get('method', 'POST'), warmup_request['path'], response.status_code)
+    return len(warmup_requests), failed
+
+
+def warm_up(replay=None):
+    """
+    시작 워밍업: 핫 패스 함수 미리 실행 → 번들된 샘플 요청 재생 (replay)
+    준비 완료(mark_ready) 전에 호출 - 첫 실제 요청이 import / 첫 사용 비용을 내지 않도록
+    샘플 요청은 코퍼스 IDF / 카탈로그 / 메트릭에 반영하지 않음 (워밍업 중에는 집계 / 색인을 건너뜀)
+    반환: 워밍업 결과 (/ready의 startup.warmup)
+    """
+    replay = WARMUP_REPLAY if replay is None else replay
+    started = time.perf_counter()
+    service_state['warming'] = True
+    metrics_enabled = metrics.enabled
+    try:
+        preload_hot_path()
+        preload_seconds = time.perf_counter() - started
+
+        replayed = failed = 0
+        if replay:
+            metrics.enabled = False
+            replayed, failed = replay_warmup_requests(load_warmup_requests())
+    finally:
+        metrics.enabled = metrics_enabled
+        service_state['warming'] = False
+
+    service_state['warmup'] = {
+        'seconds': round(time.perf_counter() - started, 3),
+        'preloadSeconds': round(preload_seconds, 3),
+        'requests': replayed,
+        'failed': failed
+    }
+    logger.info(
+        "[Warmup] 모듈 로드 %.3f초, 워밍업 %.3f초 (샘플 요청 %d개, 실패 %d개)",
+        service_state['importSeconds'], service_state['warmup']['seconds'], replayed, failed
+    )
+    return service_state['warmup']
+
+
+# 모듈 로드 완료 (import 시작부터 라우트 등록까지)
+service_state['importSeconds'] = round(time.perf_counter() - IMPORT_STARTED, 3)
+
+
 # ========================================
 # 6. 서버 실행
 # ========================================
@@ -715,8 +2742,22 @@ if __name__ == '__main__':
     print("=" * 60)
     print("URL: http://localhost:5000")
     print("Endpoints:")
-    print("   - GET  /health      : Health Check")
-    print("   - POST /recommend   : Music Recommendation")
+    print("   - GET  /health             : Health Check")
+    print("   - GET  /ready              : Readiness Check")
+    print("   - GET  /metrics            : Prometheus Metrics")
+    print("   - POST /recommend          : Music Recommendation")
+    print("   - POST /recommend/batch    : Batch Recommendation")
+    print("   - POST /recommend/catalog  : Recommendation from Local Catalog")
+    print("   - POST /recommend/stream   : Streaming Recommendation (NDJSON)")
+    print("   - GET  /profile/<userId>   : Stored User Profile")
+    print("   - POST /profile/refresh    : Rebuild User Profile")
+    print("   - POST /profile/append     : Append Played Music to Profile")
+    print("Development server only (FLASK_DEBUG=1 for debug mode, no reloader)")
+    print("Production: python utils/serve.py --workers 4")
     print("=" * 60)
 
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # 개발 서버 전용 (운영은 serve.py) - 리로더는 자식 프로세스에서 모듈을 다시 실행해 워밍업 / 종료 시
+    # 스냅샷 저장(atexit)이 두 번 일어나므로 끔, 디버그 모드는 FLASK_DEBUG=1일 때만
+    warm_up()
+    mark_ready()
+    app.run(host='0.0.0.0', port=5000, debug=os.environ.get('FLASK_DEBUG', '0') == '1', use_reloader=False)
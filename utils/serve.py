@@ -0,0 +1,144 @@
+"""
+추천 서버 운영 모드 실행 (gunicorn pre-fork 워커 풀)
+
+    python utils/serve.py --workers 4 --port 5000
+
+- 마스터 프로세스에서 recommendation_service를 먼저 import해 코퍼스 IDF, 정규식, numpy 등을
+  로드한 뒤 fork → 읽기 전용 데이터는 워커 간 copy-on-write로 공유
+  (카탈로그 스냅샷은 마스터가 메모리 매핑한 파일을 워커가 그대로 공유)
+- 워커마다 요청을 독립적으로 처리하므로 CPU 코어 수만큼 병렬 처리 (GIL 영향 없음)
+- SIGTERM: 리슨 소켓을 닫고 처리 중인 요청을 graceful-timeout 동안 마무리한 뒤 종료
+- /health는 프로세스 생존 여부, /ready는 워커 초기화 + 워밍업 완료 여부
+  (워커마다 핫 패스 미리 실행 + 번들된 샘플 요청 재생 후 준비 완료 - 로드 밸런서 / 오토스케일러는 /ready 사용)
+- --offload-workers N: 워커마다 N개 프로세스 풀에서 채점 커널 실행, 워커 스레드는 파싱 / 응답만 처리
+  (큰 요청이 스레드를 오래 붙잡지 않으므로 워커 수는 줄이고 스레드 수를 늘려서 사용)
+
+    python utils/serve.py --workers 1 --offload-workers 4
+
+gunicorn 필요 (pip install gunicorn, Windows 미지원 - 개발 서버는 recommendation_service.py 직접 실행)
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    print("gunicorn이 설치되어 있지 않습니다: pip install gunicorn")
+    print("개발 서버는 python utils/recommendation_service.py 로 실행하세요.")
+    sys.exit(1)
+
+# fork 이전에 로드 (워커들이 공유)
+import recommendation_service
+from service_logging import stop_logging
+
+
+def post_worker_init(worker):
+    """
+    워커 초기화 완료 → 커널 풀 시작 (요청 스레드가 생기기 전에 fork) → 워밍업 → 준비 상태
+    워밍업은 요청을 받기 전에 끝나므로 첫 요청이 첫 사용 비용을 내지 않음
+    """
+    recommendation_service.kernel_pool.start()
+    recommendation_service.warm_up()
+    recommendation_service.mark_ready()
+
+
+def worker_int(worker):
+    """종료 신호 수신 → 준비 상태 해제"""
+    recommendation_service.mark_ready(False)
+
+
+def worker_exit(server, worker):
+    """
+    워커 종료 시 커널 풀 종료 + 코퍼스 IDF / 카탈로그 스냅샷 저장 + 큐에 남은 로그 출력
+    (워커는 os._exit로 끝나 atexit가 실행되지 않으므로 여기서 직접 처리)
+    """
+    recommendation_service.kernel_pool.shutdown()
+    if recommendation_service.corpus_idf is not None:
+        try:
+            recommendation_service.corpus_idf.save()
+        except OSError as e:
+            server.log.warning(f"[Corpus IDF] 스냅샷 저장 실패: {str(e)}")
+    recommendation_service.save_catalog_snapshot()
+    stop_logging()
+
+
+class RecommendationServer(BaseApplication):
+    """이미 import한 Flask 앱을 gunicorn으로 실행"""
+
+    def __init__(self, application, options):
+        self.application = application
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def parse_args():
+    default_workers = int(os.environ.get('RECOMMENDATION_WORKERS', multiprocessing.cpu_count()))
+
+    parser = argparse.ArgumentParser(description='Music Recommendation System - Production Server')
+    parser.add_argument('--host', default=os.environ.get('RECOMMENDATION_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('RECOMMENDATION_PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=default_workers,
+                        help='워커 프로세스 수 (기본: CPU 코어 수)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('RECOMMENDATION_THREADS', 0)),
+                        help='워커당 스레드 수 (기본: 1, 커널 풀 사용 시 풀 크기 + 대기열 길이)')
+    parser.add_argument('--timeout', type=int, default=int(os.environ.get('RECOMMENDATION_TIMEOUT', 30)),
+                        help='요청 처리 제한 시간(초)')
+    parser.add_argument('--graceful-timeout', type=int,
+                        default=int(os.environ.get('RECOMMENDATION_GRACEFUL_TIMEOUT', 30)),
+                        help='종료 시 처리 중인 요청을 마무리할 시간(초)')
+    parser.add_argument('--offload-workers', type=int,
+                        default=int(os.environ.get('KERNEL_POOL_WORKERS', 0)),
+                        help='워커당 채점 커널 프로세스 수 (기본 0 = 워커 스레드에서 직접 실행)')
+    parser.add_argument('--offload-queue', type=int,
+                        default=int(os.environ['KERNEL_POOL_QUEUE']) if 'KERNEL_POOL_QUEUE' in os.environ else None,
+                        help='커널 대기열 길이, 넘치면 503 (기본: 커널 프로세스 수 * 2)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    kernel_pool = recommendation_service.kernel_pool
+    kernel_pool.configure(args.offload_workers, args.offload_queue)
+    if not args.threads:
+        args.threads = kernel_pool.max_workers + kernel_pool.max_queue if kernel_pool.enabled else 1
+
+    options = {
+        'bind': f"{args.host}:{args.port}",
+        'workers': args.workers,
+        'threads': args.threads,
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        'preload_app': True,
+        'post_worker_init': post_worker_init,
+        'worker_int': worker_int,
+        'worker_exit': worker_exit,
+        'accesslog': None,
+        'errorlog': '-',
+    }
+
+    print("=" * 60)
+    print("Music Recommendation System - Production Server")
+    print("=" * 60)
+    print(f"Bind: {options['bind']}, Workers: {args.workers}, Threads: {args.threads}")
+    print(f"Import: {recommendation_service.service_state['importSeconds']:.3f}s, "
+          f"Warmup replay: {'on' if recommendation_service.WARMUP_REPLAY else 'off'}")
+    if kernel_pool.enabled:
+        print(f"Kernel Pool: {kernel_pool.max_workers} processes/worker, queue {kernel_pool.max_queue}")
+    print("=" * 60)
+
+    RecommendationServer(recommendation_service.app, options).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""
+추천 서버 요청 / 응답 인코딩 (콘텐츠 협상)
+- 요청: Content-Type이 application/msgpack이면 MessagePack, 그 외는 JSON (라우트는 request.json 그대로 사용)
+        Content-Encoding: gzip 요청 본문도 지원 (풀린 크기가 REQUEST_MAX_DECOMPRESSED_BYTES를 넘으면 413)
+- 응답: Accept에서 application/msgpack을 JSON보다 우선하면 MessagePack, 기본은 JSON (jsonify 그대로 사용)
+        Accept-Encoding에 gzip이 있고 본문이 RESPONSE_GZIP_MIN_BYTES 이상이면 gzip 압축
+MessagePack은 msgpack 패키지가 있을 때만 사용 (pip install msgpack, 없으면 응답은 항상 JSON)
+NDJSON(application/x-ndjson) 요청 본문은 iter_ndjson으로 한 줄씩 읽음 (본문 전체를 메모리에 올리지 않음)
+"""
+
+import gzip
+import json
+import os
+import zlib
+
+from flask import Request, request, current_app, has_request_context
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+MSGPACK_MIMETYPES = frozenset({MSGPACK_MIMETYPE, 'application/x-msgpack'})
+NDJSON_MIMETYPE = 'application/x-ndjson'
+NDJSON_MIMETYPES = frozenset({NDJSON_MIMETYPE, 'application/jsonl'})
+
+# 응답 gzip 설정 (RESPONSE_GZIP_LEVEL=0이면 압축하지 않음)
+RESPONSE_GZIP_LEVEL = int(os.environ.get('RESPONSE_GZIP_LEVEL', 1))
+RESPONSE_GZIP_MIN_BYTES = int(os.environ.get('RESPONSE_GZIP_MIN_BYTES', 4096))
+
+# gzip 요청 본문을 푼 뒤 최대 크기 (작은 압축 본문이 매우 크게 풀리는 요청 차단, 앱에 MAX_CONTENT_LENGTH가 있으면 그 값)
+REQUEST_MAX_DECOMPRESSED_BYTES = int(os.environ.get('REQUEST_MAX_DECOMPRESSED_BYTES', 64 * 1024 * 1024))
+DECOMPRESS_CHUNK_SIZE = 65536
+
+
+def decompressed_limit():
+    """gzip 요청 본문을 푼 뒤 최대 크기 (바이트)"""
+    if has_request_context() and current_app.config.get('MAX_CONTENT_LENGTH'):
+        return current_app.config['MAX_CONTENT_LENGTH']
+    return REQUEST_MAX_DECOMPRESSED_BYTES
+
+
+def body_too_large(limit):
+    return RequestEntityTooLarge(f"압축을 푼 요청 본문이 {limit}바이트를 넘습니다.")
+
+
+def gunzip_bounded(body, limit):
+    """
+    gzip 본문을 DECOMPRESS_CHUNK_SIZE씩 풀면서 크기 확인 (여러 멤버로 이어 붙인 gzip도 지원 - gzip.decompress와 동일)
+    예외: RequestEntityTooLarge (풀린 크기가 limit 초과), EOFError / zlib.error (잘못된 압축 데이터)
+    """
+    chunks = []
+    size = 0
+    data = body
+    while data:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        while data:
+            chunk = decompressor.decompress(data, DECOMPRESS_CHUNK_SIZE)
+            size += len(chunk)
+            if size > limit:
+                raise body_too_large(limit)
+            chunks.append(chunk)
+            data = decompressor.unconsumed_tail
+        if not decompressor.eof:
+            raise EOFError('압축 데이터가 중간에 끝났습니다.')
+        # 다음 gzip 멤버 (멤버 사이의 0 바이트 패딩은 무시)
+        data = decompressor.unused_data.lstrip(b'\x00')
+    return b''.join(chunks)
+
+
+class NegotiatingRequest(Request):
+    """MessagePack / gzip 요청 본문도 request.json으로 읽을 수 있는 요청 클래스"""
+
+    _decoded_data = None
+
+    def get_decoded_data(self):
+        """
+        요청 본문 (Content-Encoding: gzip이면 크기 제한 안에서 푼 본문, 한 번만 풀고 보관)
+        예외: RequestEntityTooLarge (413), EOFError / zlib.error (잘못된 압축 데이터)
+        """
+        if self._decoded_data is None:
+            body = self.get_data()
+            if self.content_encoding == 'gzip':
+                body = gunzip_bounded(body, decompressed_limit())
+            self._decoded_data = body
+        return self._decoded_data
+
+    def get_json(self, force=False, silent=False, cache=True):
+        is_msgpack = self.mimetype in MSGPACK_MIMETYPES
+        if not is_msgpack and self.content_encoding != 'gzip':
+            return super().get_json(force=force, silent=silent, cache=cache)
+
+        if cache and self._cached_json[silent] is not Ellipsis:
+            return self._cached_json[silent]
+
+        if is_msgpack and msgpack is None:
+            raise UnsupportedMediaType('MessagePack 요청을 처리할 수 없습니다 (msgpack 미설치).')
+        if not (is_msgpack or force or self.is_json):
+            return None if silent else self.on_json_loading_failed(None)
+
+        try:
+            body = self.get_decoded_data()
+            if is_msgpack:
+                rv = msgpack.unpackb(body, raw=False)
+            else:
+                rv = self.json_module.loads(body)
+        except (ValueError, OSError, EOFError, zlib.error) as e:
+            if silent:
+                return None
+            return self.on_json_loading_failed(e)
+
+        if cache:
+            self._cached_json = (rv, rv)
+        return rv
+
+
+def decode_request_body():
+    """
+    before_request 훅: gzip 요청 본문(NDJSON 제외)을 라우트 전에 풀어 둠
+    → 크기 제한을 넘으면 라우트의 예외 처리(500)와 무관하게 413으로 응답
+    """
+    if request.content_encoding == 'gzip' and request.mimetype not in NDJSON_MIMETYPES:
+        try:
+            request.get_decoded_data()
+        except (EOFError, zlib.error):
+            pass  # 잘못된 압축 데이터는 request.json에서 400 처리
+
+
+def _iter_lines(stream, chunk_size=65536, limit=None):
+    """
+    스트림을 chunk_size씩 읽어 줄 단위로 나눔 (한 줄씩 읽으면 WSGI 입력 스트림은 바이트 단위로 읽힘)
+    limit: 읽은 전체 크기 제한 (넘으면 RequestEntityTooLarge)
+    """
+    pending = b''
+    size = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if limit is not None and size > limit:
+            raise body_too_large(limit)
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def iter_ndjson(req):
+    """
+    NDJSON 요청 본문을 한 줄씩 파싱해 반환하는 제너레이터 (빈 줄은 무시)
+    Content-Encoding: gzip 본문도 스트림으로 풀면서 읽음 (풀린 크기 제한은 decompressed_limit)
+    예외: ValueError (JSON이 아닌 줄 - 메시지에 줄 번호 포함), RequestEntityTooLarge (풀린 크기 초과)
+    """
+    stream = req.stream
+    limit = None
+    if req.content_encoding == 'gzip':
+        stream = gzip.GzipFile(fileobj=stream, mode='rb')
+        limit = decompressed_limit()
+
+    try:
+        for line_number, line in enumerate(_iter_lines(stream, limit=limit), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{line_number}번째 줄을 JSON으로 읽을 수 없습니다: {e}")
+    except (OSError, EOFError) as e:
+        raise ValueError(f"요청 본문을 읽을 수 없습니다: {e}")
+
+
+def ndjson_response(lines):
+    """객체 목록(또는 제너레이터)을 한 줄씩 내보내는 NDJSON 스트리밍 응답"""
+    return current_app.response_class(
+        (json.dumps(line, ensure_ascii=False) + '\n' for line in lines),
+        mimetype=NDJSON_MIMETYPE
+    )
+
+
+def prefers_msgpack():
+    """현재 요청의 Accept 헤더가 JSON보다 MessagePack을 우선하는지"""
+    if msgpack is None or not has_request_context():
+        return False
+    return request.accept_mimetypes.best_match(['application/json', MSGPACK_MIMETYPE]) == MSGPACK_MIMETYPE
+
+
+class NegotiatingJSONProvider(DefaultJSONProvider):
+    """jsonify 응답을 Accept 헤더에 따라 JSON 또는 MessagePack으로 인코딩"""
+
+    def response(self, *args, **kwargs):
+        if prefers_msgpack():
+            obj = self._prepare_response_obj(args, kwargs)
+            response = self._app.response_class(
+                msgpack.packb(obj, default=self.default, use_bin_type=True),
+                mimetype=MSGPACK_MIMETYPE
+            )
+        else:
+            response = super().response(*args, **kwargs)
+
+        response.vary.add('Accept')
+        return response
+
+
+def compress_response(response):
+    """
+    클라이언트가 gzip을 받을 수 있고 본문이 충분히 크면 gzip 압축
+    (스트리밍 응답, 이미 인코딩된 응답, 오류 응답은 그대로)
+    """
+    if RESPONSE_GZIP_LEVEL <= 0 or response.direct_passthrough or response.is_streamed:
+        return response
+    if response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if not request.accept_encodings['gzip']:
+        return response
+
+    body = response.get_data()
+    if len(body) < RESPONSE_GZIP_MIN_BYTES:
+        return response
+
+    response.set_data(gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def setup_content_negotiation(app):
+    """Flask 앱에 요청 클래스 / JSON 프로바이더 적용"""
+    app.request_class = NegotiatingRequest
+    app.json = NegotiatingJSONProvider(app)
@@ -0,0 +1,196 @@
+"""
+추천 서버 로깅 설정
+- 레벨별 로그 (LOG_LEVEL)
+- JSON 구조화 로그 (요청 ID, 처리 시간 등 추가 필드 포함)
+- DEBUG 로그는 요청 단위 샘플링 (LOG_DEBUG_SAMPLE_RATE)
+- 큐 기반 비동기 핸들러: 요청 처리 스레드는 큐에 넣기만 하고 출력은 별도 스레드에서 처리
+  (프로세스 종료 시 stop_logging으로 큐에 남은 로그를 모두 출력 - atexit, serve.py worker_exit)
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+try:
+    from flask import g, has_request_context
+except ImportError:  # Flask 없이 CLI 도구에서 사용하는 경우
+    g = None
+
+    def has_request_context():
+        return False
+
+
+# 로그 레코드의 기본 속성 (이 외의 속성은 extra 필드로 JSON에 포함)
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """한 줄 JSON 로그 포맷"""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """사람이 읽기 쉬운 한 줄 포맷 (개발용)"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s [%(requestId)s] %(message)s')
+
+    def format(self, record):
+        if not hasattr(record, 'requestId'):
+            record.requestId = '-'
+        return super().format(record)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Flask 요청 컨텍스트의 요청 ID를 레코드에 추가하고, DEBUG 로그는 샘플링된 요청만 통과
+    """
+
+    def filter(self, record):
+        if has_request_context():
+            record.requestId = getattr(g, 'request_id', None)
+            if record.levelno <= logging.DEBUG and not getattr(g, 'debug_sampled', False):
+                return False
+        return True
+
+
+class ProcessQueueHandler(logging.handlers.QueueHandler):
+    """
+    큐 기반 핸들러 - 프로세스마다 출력 스레드(QueueListener)를 하나씩 실행
+    (pre-fork 워커에서는 fork 이전에 시작한 스레드가 없으므로 처음 기록할 때 다시 시작)
+    출력 스레드를 멈춘 뒤(stop_listener)의 기록은 호출 스레드에서 바로 출력
+    """
+
+    def __init__(self, target_handler):
+        super().__init__(queue.SimpleQueue())
+        self.target_handler = target_handler
+        self._listener = None
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+        self._stopped = False
+
+    def emit(self, record):
+        if self._stopped:
+            self.target_handler.handle(self.prepare(record))
+            return
+        if self._listener_pid != os.getpid():
+            self._start_listener()
+        super().emit(record)
+
+    def prepare(self, record):
+        """
+        큐에 넣기 전 메시지 / 예외를 문자열로 확정 (추가 필드는 그대로 유지)
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def _start_listener(self):
+        with self._listener_lock:
+            if self._listener_pid == os.getpid():
+                return
+            # fork 이전 프로세스의 큐에 남은 레코드는 버리고 새 큐 사용
+            self.queue = queue.SimpleQueue()
+            self._listener = logging.handlers.QueueListener(self.queue, self.target_handler)
+            self._listener.start()
+            self._listener_pid = os.getpid()
+
+    def stop_listener(self):
+        """큐에 남은 레코드를 모두 출력한 뒤 출력 스레드 종료 (현재 프로세스의 스레드만)"""
+        with self._listener_lock:
+            self._stopped = True
+            if self._listener is not None and self._listener_pid == os.getpid():
+                self._listener.stop()
+            self._listener = None
+            self._listener_pid = None
+
+    def close(self):
+        self.stop_listener()
+        super().close()
+
+
+def setup_logging(name='recommendation'):
+    """
+    서비스 로거 설정 (환경 변수)
+    LOG_LEVEL: DEBUG / INFO / WARNING / ERROR (기본 INFO)
+    LOG_FORMAT: json / text (기본 json)
+    LOG_DEBUG_SAMPLE_RATE: DEBUG 로그를 남길 요청 비율 0~1 (기본 0.01)
+    """
+    logger = logging.getLogger(name)
+    if getattr(logger, '_service_logging_configured', False):
+        return logger
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if os.environ.get('LOG_FORMAT', 'json') == 'text':
+        stream_handler.setFormatter(TextFormatter())
+    else:
+        stream_handler.setFormatter(JSONFormatter())
+
+    queue_handler = ProcessQueueHandler(stream_handler)
+    queue_handler.addFilter(RequestContextFilter())
+
+    logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+    logger._service_logging_configured = True
+
+    # 종료 시 큐에 남은 로그 출력 (atexit는 등록 역순 실행 → 나중에 등록한 스냅샷 저장 로그까지 포함)
+    atexit.register(queue_handler.stop_listener)
+
+    return logger
+
+
+def stop_logging(name='recommendation'):
+    """
+    서비스 로거의 큐에 남은 로그를 모두 출력하고 출력 스레드 종료
+    atexit를 거치지 않고 끝나는 프로세스(gunicorn 워커 등)는 종료 직전에 직접 호출
+    """
+    for handler in logging.getLogger(name).handlers:
+        if isinstance(handler, ProcessQueueHandler):
+            handler.stop_listener()
+
+
+# 샘플링 전용 난수 생성기 (전역 random 상태에 영향을 주지 않도록 분리)
+debug_sampler = random.Random()
+
+
+def debug_sample_rate():
+    """DEBUG 로그 샘플링 비율"""
+    return float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 0.01))
+
+
+def should_sample_debug():
+    """이번 요청의 DEBUG 로그를 남길지 결정"""
+    rate = debug_sample_rate()
+    return rate >= 1 or (rate > 0 and debug_sampler.random() < rate)
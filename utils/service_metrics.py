@@ -0,0 +1,123 @@
+"""
+추천 서버 메트릭 (Prometheus 텍스트 형식)
+- 카운터 / 히스토그램, 라벨은 값 튜플로 전달
+- METRICS_ENABLED=0이면 모든 기록이 바로 반환되어 오버헤드가 거의 없음
+- pre-fork 운영 모드에서는 워커마다 별도 집계 (스크레이프는 요청을 받은 워커의 값)
+"""
+
+import bisect
+import threading
+
+# 처리 시간(초) 버킷
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 페이로드 크기(바이트) 버킷
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def escape_label_value(value):
+    """Prometheus 라벨 값 이스케이프"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labelnames, labels, extra=None):
+    pairs = [f'{name}="{escape_label_value(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """단조 증가 카운터"""
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """누적 버킷 히스토그램"""
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # labels → [버킷별 개수..., +Inf 개수, 합계]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        if not self.registry.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, series in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                    cumulative += count
+                    le = f'le="{format_value(bound)}"'
+                    lines.append(f'{self.name}_bucket{format_labels(self.labelnames, labels, le)} {cumulative}')
+                label_text = format_labels(self.labelnames, labels)
+                lines.append(f'{self.name}_sum{label_text} {format_value(series[-1])}')
+                lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """메트릭 모음 + Prometheus 텍스트 출력"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(self, name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(self, name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Prometheus 텍스트 노출 형식 (text/plain; version=0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,94 @@
+"""
+동시 중복 요청 합치기 (single-flight)
+같은 키의 계산이 이미 진행 중이면 새로 계산하지 않고 그 결과를 기다려 함께 사용
+(결과를 보관하지 않음 - 계산이 끝나면 키가 사라지므로 캐시와 달리 오래된 결과를 돌려주지 않음)
+"""
+
+import threading
+
+from kernel_pool import DeadlineExceeded
+
+
+class _Call:
+    """진행 중인 계산 하나 (결과 또는 예외를 기다리는 요청들이 공유)"""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    스레드 안전한 single-flight 그룹 (프로세스 내 - 다른 프로세스에서 진행 중인 같은 계산과는 합치지 않음)
+    결과는 기다린 요청들이 그대로 공유하므로 호출 측에서 수정하면 안 됨
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._calls = {}  # key → _Call
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.coalesced = 0
+        self.timeouts = 0  # 기다리다 기한을 넘긴 요청 수
+
+    def run(self, key, fn, *args, timeout=None):
+        """
+        fn(*args) 실행 - 같은 key의 계산이 진행 중이면 그 결과를 기다림
+        timeout: 다른 요청의 계산을 기다릴 최대 시간(초), None이면 무제한
+                 (직접 계산하는 요청의 기한은 fn이 처리 - 예: KernelPool.run(timeout=...))
+        반환: (결과, 다른 요청의 계산 결과를 받았는지)
+        예외: 계산 중 발생한 예외는 기다린 요청에도 그대로 전달, 기다리다 기한을 넘기면 DeadlineExceeded
+        """
+        if not self.enabled:
+            return fn(*args), False
+
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            if not call.done.wait(timeout):
+                with self._lock:
+                    call.waiters -= 1
+                    self.timeouts += 1
+                raise DeadlineExceeded(f"합쳐진 요청의 결과를 {timeout:.3f}초 안에 받지 못했습니다")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def stats(self):
+        """통계 (/health 응답용)"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'scope': 'process',
+                'inFlight': len(self._calls),
+                'waiting': sum(call.waiters for call in self._calls.values()),
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'timeouts': self.timeouts
+            }
@@ -0,0 +1,253 @@
+"""
+정수 단어 ID 어휘 + 압축 TF-IDF 벡터
+- TermTable: 단어 → 정수 ID (테이블 안에서 한 번 정한 ID는 바뀌지 않음, 추가만 가능)
+- Vocabulary: 현재 TermTable (세대) - 단어 수가 max_terms에 도달하면 빈 테이블로 교체
+  (오래 실행되는 워커에서 처음 보는 단어가 계속 쌓여 메모리가 끝없이 늘지 않도록)
+- TermVector: 정렬된 단어 ID 배열(int32) + 가중치 배열(float32) + 미리 계산한 벡터 크기 + ID를 정한 TermTable
+  취향 벡터를 딕셔너리 대신 이 형식으로 들고 다니고, 단어 문자열로는 API 응답 / 저장할 때만 변환
+  이전 세대 테이블은 그 테이블을 가리키는 TermVector가 모두 사라지면 함께 해제됨
+
+ID는 테이블(세대)마다, 프로세스마다 다르므로 다른 벡터 / 행렬과 비교할 때는 벡터의 table로 단어를 조회하고,
+pickle(프로세스 풀 결과 전달)할 때는 단어 문자열로 보내고 받는 쪽에서 다시 ID로 바꿈
+"""
+
+import os
+import threading
+from collections.abc import Mapping
+
+import numpy as np
+
+
+class TermTable:
+    """
+    스레드 안전한 단어 ↔ 정수 ID 테이블 (어휘 한 세대)
+    조회는 잠금 없이, 새 단어 추가만 잠금 (대부분의 요청은 이미 본 단어만 사용)
+    """
+
+    def __init__(self, generation=0):
+        self.generation = generation
+        self._lock = threading.Lock()
+        self._ids = {}
+        self._terms = []
+
+    def __len__(self):
+        return len(self._terms)
+
+    def intern(self, term):
+        """단어의 ID (처음 보는 단어면 새 ID 부여)"""
+        term_id = self._ids.get(term)
+        if term_id is None:
+            with self._lock:
+                term_id = self._ids.get(term)
+                if term_id is None:
+                    term_id = len(self._terms)
+                    self._terms.append(term)
+                    self._ids[term] = term_id
+        return term_id
+
+    def intern_all(self, terms):
+        """단어 목록 → ID 배열 (int32, 입력 순서 유지)"""
+        ids = self._ids
+        terms = list(terms)
+        term_ids = [ids.get(term) for term in terms]
+        if None in term_ids:
+            term_ids = [
+                self.intern(term) if term_id is None else term_id
+                for term, term_id in zip(terms, term_ids)
+            ]
+        return np.array(term_ids, dtype=np.int32)
+
+    def lookup(self, term):
+        """단어의 ID (없으면 -1, 새로 추가하지 않음)"""
+        return self._ids.get(term, -1)
+
+    def lookup_all(self, terms):
+        """단어 목록 → ID 배열 (없는 단어는 -1)"""
+        terms = list(terms)
+        ids = self._ids
+        return np.fromiter((ids.get(term, -1) for term in terms), dtype=np.int32, count=len(terms))
+
+    def term(self, term_id):
+        return self._terms[term_id]
+
+    def terms(self, term_ids):
+        """ID 배열 → 단어 목록"""
+        terms = self._terms
+        return [terms[term_id] for term_id in term_ids.tolist()]
+
+
+class Vocabulary:
+    """
+    세대별 TermTable 관리
+    current()는 현재 테이블을 반환하고, 단어 수가 max_terms 이상이면 먼저 새 세대 테이블로 교체
+    (테이블 하나를 받아 쓰는 동안 추가한 단어는 그 테이블에 들어가므로 max_terms를 요청 하나 분량만큼 넘을 수 있음)
+    max_terms: 0이나 None이면 교체하지 않음
+    """
+
+    def __init__(self, max_terms=None):
+        self.max_terms = max_terms
+        self.rotations = 0
+        self._lock = threading.Lock()
+        self._table = TermTable()
+
+    def current(self):
+        """새 벡터를 만들 때 사용할 테이블"""
+        table = self._table
+        if self.max_terms and len(table) >= self.max_terms:
+            with self._lock:
+                if self._table is table:
+                    self._table = TermTable(table.generation + 1)
+                    self.rotations += 1
+                table = self._table
+        return table
+
+    def __len__(self):
+        return len(self._table)
+
+    def stats(self):
+        """어휘 통계 (/health 응답용 - 현재 세대 기준)"""
+        return {
+            'terms': len(self._table),
+            'maxTerms': self.max_terms,
+            'generation': self._table.generation,
+            'rotations': self.rotations
+        }
+
+
+# 프로세스 전체가 공유하는 어휘 (VOCABULARY_MAX_TERMS개에 도달하면 새 세대로 교체)
+vocabulary = Vocabulary(max_terms=int(os.environ.get('VOCABULARY_MAX_TERMS', 200000)))
+
+
+def _from_terms(terms, weights, norm):
+    """pickle 복원용 (단어 문자열 → 현재 프로세스의 현재 세대 ID)"""
+    return TermVector.from_terms(terms, weights, norm=norm)
+
+
+class TermVector(Mapping):
+    """
+    희소 TF-IDF 벡터 (읽기 전용)
+    ids: 단어 ID 오름차순 int32 배열, weights: 같은 순서의 float32 가중치, norm: 벡터 크기 (float64로 계산)
+    table: ids를 정한 TermTable (생략하면 현재 세대)
+    채점 코드는 ids / weights / norm을 직접 사용하고 (다른 단어 공간의 ID는 table.lookup_all로 구함),
+    {term: weight} 매핑으로도 읽을 수 있어 딕셔너리를 받던 코드(카탈로그 검색 등)에 그대로 넘길 수 있음
+    """
+
+    __slots__ = ('ids', 'weights', 'norm', 'table')
+
+    def __init__(self, ids=None, weights=None, norm=None, table=None):
+        """ids는 정렬되어 있고 중복이 없어야 함 (정렬되지 않은 입력은 from_arrays 사용)"""
+        self.table = vocabulary.current() if table is None else table
+        self.ids = np.zeros(0, dtype=np.int32) if ids is None else ids
+        self.weights = np.zeros(0, dtype=np.float32) if weights is None else weights
+        if norm is None:
+            weights64 = self.weights.astype(np.float64)
+            norm = float(np.sqrt(np.dot(weights64, weights64)))
+        self.norm = norm
+
+    @classmethod
+    def from_arrays(cls, ids, weights, norm=None, table=None):
+        """
+        (ID, 가중치) 배열로 생성 - 같은 ID가 여러 번 있으면 가중치를 더함
+        table: ids를 정한 TermTable (생략하면 현재 세대 - ID를 같은 세대에서 받았을 때만 생략)
+        합산과 벡터 크기는 float64로 계산한 뒤 가중치만 float32로 저장
+        """
+        ids = np.asarray(ids, dtype=np.int32)
+        weights = np.asarray(weights, dtype=np.float64)
+
+        # 안정 정렬이므로 같은 ID의 가중치는 입력 순서대로 더해짐
+        order = np.argsort(ids, kind='stable')
+        ids = ids[order]
+        weights = weights[order]
+        if len(ids) > 1:
+            starts = np.flatnonzero(np.concatenate(([True], ids[1:] != ids[:-1])))
+            if len(starts) != len(ids):
+                weights = np.add.reduceat(weights, starts)
+                ids = ids[starts]
+
+        if norm is None:
+            norm = float(np.sqrt(np.dot(weights, weights)))
+        return cls(ids, weights.astype(np.float32), norm, table)
+
+    @classmethod
+    def from_terms(cls, terms, weights, norm=None):
+        """(단어, 가중치) 목록으로 생성 - 현재 세대 테이블에서 ID를 받음 (처음 보는 단어는 추가)"""
+        table = vocabulary.current()
+        return cls.from_arrays(table.intern_all(terms), weights, norm=norm, table=table)
+
+    @classmethod
+    def from_dict(cls, weights):
+        """{term: weight} → TermVector (처음 보는 단어는 어휘에 추가)"""
+        if isinstance(weights, TermVector):
+            return weights
+        return cls.from_terms(weights, np.fromiter(weights.values(), dtype=np.float64, count=len(weights)))
+
+    def to_dict(self):
+        """{term: weight} (API 응답 / 저장용)"""
+        return dict(zip(self.table.terms(self.ids), self.weights.tolist()))
+
+    def __reduce__(self):
+        return (_from_terms, (self.table.terms(self.ids), self.weights, self.norm))
+
+    # ----------------------------------------
+    # 매핑 인터페이스 (단어 문자열 기준)
+    # ----------------------------------------
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __bool__(self):
+        return len(self.ids) > 0
+
+    def __iter__(self):
+        return iter(self.table.terms(self.ids))
+
+    def __getitem__(self, term):
+        position = self.position(self.table.lookup(term))
+        if position < 0:
+            raise KeyError(term)
+        return float(self.weights[position])
+
+    def keys(self):
+        return self.table.terms(self.ids)
+
+    def values(self):
+        return self.weights.tolist()
+
+    def items(self):
+        return list(zip(self.table.terms(self.ids), self.weights.tolist()))
+
+    def __repr__(self):
+        return f"TermVector({len(self)} terms, norm={self.norm:.4f})"
+
+    # ----------------------------------------
+    # 벡터 연산
+    # ----------------------------------------
+
+    def position(self, term_id):
+        """term_id의 배열 위치 (없으면 -1)"""
+        position = int(np.searchsorted(self.ids, term_id))
+        if term_id >= 0 and position < len(self.ids) and self.ids[position] == term_id:
+            return position
+        return -1
+
+    def project(self, term_ids):
+        """
+        다른 어휘 공간(term_ids 순서의 열)으로 가중치 투영 - 없는 단어(-1 포함)는 0
+        term_ids: 이 벡터의 table 기준 ID (self.table.lookup_all(열 단어 목록))
+        정렬된 ID 배열에 대한 이분 탐색이므로 열 수 × log(단어 수)
+        """
+        projected = np.zeros(len(term_ids), dtype=np.float64)
+        if len(self.ids) == 0 or len(term_ids) == 0:
+            return projected
+        positions = np.minimum(np.searchsorted(self.ids, term_ids), len(self.ids) - 1)
+        matched = self.ids[positions] == term_ids
+        projected[matched] = self.weights[positions[matched]]
+        return projected
+
+    def top_terms(self, n):
+        """가중치 상위 n개 단어 (가중치가 같으면 단어 순 - 프로세스와 무관하게 같은 결과)"""
+        terms = self.table.terms(self.ids)
+        weights = self.weights.tolist()
+        order = sorted(range(len(terms)), key=lambda i: (-weights[i], terms[i]))
+        return [terms[i] for i in order[:n]]
+
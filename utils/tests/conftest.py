@@ -0,0 +1,31 @@
+"""
+추천 서버 테스트 공통 설정
+recommendation_service는 import 시점에 환경 변수로 저장소 / 스냅샷 경로를 정하므로
+import 전에 임시 디렉터리로 바꿔 운영 데이터(utils/data)를 건드리지 않도록 함
+
+    python -m pytest utils/tests
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+UTILS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if UTILS_DIR not in sys.path:
+    sys.path.insert(0, UTILS_DIR)
+
+DATA_DIR = tempfile.mkdtemp(prefix='recommendation-test-')
+os.environ['PROFILE_STORE_PATH'] = os.path.join(DATA_DIR, 'profiles.sqlite3')
+os.environ['RANKING_STORE_PATH'] = os.path.join(DATA_DIR, 'rankings.sqlite3')
+os.environ['CORPUS_IDF_PATH'] = os.path.join(DATA_DIR, 'corpus_idf.json')
+os.environ['CATALOG_SNAPSHOT_PATH'] = os.path.join(DATA_DIR, 'catalog.snapshot')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+
+@pytest.fixture(scope='session')
+def service():
+    """recommendation_service 모듈 (세션 동안 한 번만 import)"""
+    import recommendation_service
+    return recommendation_service
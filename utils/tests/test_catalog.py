@@ -0,0 +1,167 @@
+"""
+카탈로그 감정 태그: 검색 / 조회는 요청 감정으로 받은 문서만, 스냅샷에 태그 유지
+여러 워커의 종료 시 저장은 서로의 문서를 덮어쓰지 않고 합침
+오프라인 빌드는 서버 코퍼스 IDF 파일을 바꾸지 않음
+"""
+
+import json
+
+import pytest
+
+from catalog_index import CatalogIndex
+
+SLEEP = [
+    {'videoId': 's1', 'title': 'sleep piano music night', 'channelTitle': 'Calm'},
+    {'videoId': 's2', 'title': 'deep sleep rain night sounds', 'channelTitle': 'Calm'}
+]
+PARTY = [
+    {'videoId': 'p1', 'title': 'night party dance music', 'channelTitle': 'Club'},
+    {'videoId': 'p2', 'title': 'dance night remix', 'channelTitle': 'Club'}
+]
+QUERY = {'night': 1.0, 'music': 0.5, 'dance': 0.2, 'sleep': 0.2}
+
+
+@pytest.fixture
+def catalog(service):
+    catalog = CatalogIndex(analyzer=service.analyze_music)
+    catalog.add(SLEEP, 'sleep')
+    catalog.add(PARTY, 'party')
+    return catalog
+
+
+def video_ids(documents):
+    return sorted(doc['videoId'] for doc in documents)
+
+
+def test_search_filters_by_emotion(catalog):
+    assert video_ids(doc for doc, _ in catalog.search(QUERY, 10, emotion='sleep')) == ['s1', 's2']
+    assert video_ids(doc for doc, _ in catalog.search(QUERY, 10, emotion='party')) == ['p1', 'p2']
+    assert catalog.search(QUERY, 10, emotion='happy') == []
+    assert len(catalog.search(QUERY, 10)) == 4
+
+    assert video_ids(catalog.query(QUERY, emotion='sleep')) == ['s1', 's2']
+    assert catalog.query(QUERY, emotion='happy') == []
+
+
+def test_seen_again_under_another_emotion(catalog):
+    assert catalog.add([PARTY[0]], 'sleep') == 0
+
+    assert catalog.emotions('p1') == ['party', 'sleep']
+    assert video_ids(doc for doc, _ in catalog.search(QUERY, 10, emotion='sleep')) == ['p1', 's1', 's2']
+    assert video_ids(catalog.query(QUERY, emotion='sleep')) == ['p1', 's1', 's2']
+
+
+def test_snapshot_keeps_emotions(service, catalog, tmp_path):
+    path = str(tmp_path / 'catalog.snapshot')
+    catalog.save_snapshot(path)
+
+    loaded = CatalogIndex(analyzer=service.analyze_music)
+    loaded.load_snapshot(path)
+    loaded.add([SLEEP[0]], 'calm')  # 기본 계층 문서에 새 태그
+    loaded.add([{'videoId': 'c1', 'title': 'calm night music', 'channelTitle': 'Calm'}], 'calm')
+
+    assert loaded.emotions('s1') == ['calm', 'sleep']
+    assert video_ids(doc for doc, _ in loaded.search(QUERY, 10, emotion='calm')) == ['c1', 's1']
+    assert video_ids(loaded.query(QUERY, emotion='calm')) == ['c1', 's1']
+
+    loaded.save_snapshot(path)
+    reloaded = CatalogIndex(analyzer=service.analyze_music)
+    reloaded.load_snapshot(path)
+    assert [reloaded.emotions(video_id) for video_id in ['s1', 'p1', 'c1']] == [['calm', 'sleep'], ['party'], ['calm']]
+
+
+def test_workers_merge_snapshot_instead_of_overwriting(service, catalog, tmp_path):
+    path = str(tmp_path / 'catalog.snapshot')
+    catalog.save_snapshot(path)
+
+    # 같은 스냅샷으로 시작한 워커 두 개가 서로 다른 문서를 색인하고 차례로 종료
+    first = CatalogIndex(analyzer=service.analyze_music)
+    second = CatalogIndex(analyzer=service.analyze_music)
+    first.load_snapshot(path)
+    second.load_snapshot(path)
+    first.add([{'videoId': 'f1', 'title': 'first worker night music', 'channelTitle': 'A'}], 'sleep')
+    first.add([PARTY[0]], 'calm')
+    second.add([{'videoId': 'w2', 'title': 'second worker dance music', 'channelTitle': 'B'}], 'party')
+    second.add([PARTY[0]], 'sleep')
+    second.remove('s2')
+
+    first.merge_snapshot(path)
+    second.merge_snapshot(path)
+    assert not first.dirty and not second.dirty
+
+    merged = CatalogIndex(analyzer=service.analyze_music)
+    merged.load_snapshot(path)
+    assert [merged.contains(video_id) for video_id in ['s1', 's2', 'p1', 'p2', 'f1', 'w2']] == [
+        True, False, True, True, True, True
+    ]
+    assert merged.emotions('p1') == ['calm', 'party', 'sleep']
+
+
+def test_merged_snapshot_keeps_newest_documents(service, catalog, tmp_path):
+    path = str(tmp_path / 'catalog.snapshot')
+    catalog.save_snapshot(path)
+
+    worker = CatalogIndex(analyzer=service.analyze_music, max_size=4)
+    worker.load_snapshot(path)
+    worker.add([{'videoId': 'n1', 'title': 'new night music', 'channelTitle': 'A'}], 'sleep')
+    worker.merge_snapshot(path)
+
+    merged = CatalogIndex(analyzer=service.analyze_music)
+    merged.load_snapshot(path)
+    assert len(merged) == 4
+    assert not merged.contains('s1') and merged.contains('n1')
+
+
+def test_catalog_route_uses_request_emotion(service, monkeypatch, catalog):
+    monkeypatch.setattr(service, 'catalog', catalog)
+    history = [{'videoId': 'h1', 'title': 'night music', 'channelTitle': 'Calm', 'emotion': 'sleep'}]
+
+    response = service.app.test_client().post(
+        '/recommend/catalog', json={'userId': 'catalog-emotion', 'emotion': 'sleep', 'playedHistory': history}
+    )
+
+    assert response.status_code == 200
+    assert video_ids(response.get_json()['data']['recommendedMusic']) == ['s1', 's2']
+
+
+def test_build_leaves_server_corpus_alone(service, monkeypatch, tmp_path):
+    import catalog_snapshot
+    from corpus_idf import CorpusIDF
+
+    if service.corpus_idf is None:
+        pytest.skip('코퍼스 IDF 모드 전용')
+    monkeypatch.setattr(service.corpus_idf, 'read_only', False)  # build가 읽기 전용으로 바꾼 것을 테스트 후 되돌림
+
+    live_path = service.corpus_idf.path
+    service.corpus_idf.refresh()
+    with open(live_path, 'rb') as f:
+        live_before = f.read()
+
+    input_path = tmp_path / 'music.ndjson'
+    input_path.write_text('\n'.join(
+        json.dumps(dict(music, emotion='sleep')) for music in SLEEP
+    ) + '\n' + '\n'.join(json.dumps(music) for music in PARTY))
+    snapshot_path = str(tmp_path / 'catalog.snapshot')
+    corpus_out = str(tmp_path / 'corpus_idf.build.json')
+
+    args = catalog_snapshot.parse_args([
+        'build', '--input', str(input_path), '--out', snapshot_path, '--corpus-out', corpus_out
+    ])
+    assert args.handler(args) == 0
+    service.corpus_idf.refresh()  # 서버 모듈의 종료 시 저장과 같은 경로
+
+    with open(live_path, 'rb') as f:
+        assert f.read() == live_before
+    assert CorpusIDF(corpus_out).num_docs == CorpusIDF(live_path).num_docs + 4
+
+    built = CatalogIndex(analyzer=service.analyze_music)
+    built.load_snapshot(snapshot_path)
+    assert [built.emotions(video_id) for video_id in ['s1', 'p1']] == [['sleep'], []]
+
+
+def test_health_reports_worker_scope(service):
+    if service.catalog is None:
+        pytest.skip('카탈로그 비활성화')
+    catalog_stats = service.app.test_client().get('/health').get_json()['catalog']
+
+    assert catalog_stats['scope'] == 'worker'
@@ -0,0 +1,140 @@
+"""
+코퍼스 IDF: revision 고정, 여러 프로세스(인스턴스)가 같은 파일에 저장할 때 집계 유지, 문서 ID 상한
+"""
+
+import json
+
+import pytest
+
+from corpus_idf import CorpusIDF, RevisionUnavailable
+
+
+def test_documents_apply_on_refresh_only():
+    corpus = CorpusIDF()
+    before = corpus.current()
+
+    assert corpus.add_documents([('a', ['love', 'night']), ('b', ['love'])]) == 2
+    assert corpus.current() is before
+    assert corpus.idf('love') == before.idf('love')
+
+    table = corpus.refresh()
+    assert table.revision == before.revision + 1
+    assert (table.num_docs, table.doc_freq) == (2, {'love': 2, 'night': 1})
+    assert before.num_docs == 0  # 이전 revision은 그대로
+
+
+def test_same_document_counted_once():
+    corpus = CorpusIDF()
+    corpus.add_documents([('a', ['love'])])
+    corpus.add_documents([('a', ['love']), (None, ['night'])])
+    corpus.refresh()
+    corpus.add_documents([('a', ['love'])])
+
+    assert corpus.refresh().num_docs == 1
+    assert corpus.revision == 1  # 새로 집계한 문서가 없으면 revision 유지
+
+
+def test_writers_merge_instead_of_overwriting(tmp_path):
+    path = str(tmp_path / 'corpus_idf.json')
+    first = CorpusIDF(path, snapshot_interval=0)
+    second = CorpusIDF(path, snapshot_interval=0)
+
+    first.add_documents([('a', ['love']), ('shared', ['night'])])
+    second.add_documents([('b', ['love']), ('shared', ['night'])])
+    first.refresh()
+    second.refresh()
+
+    assert second.table.doc_freq == {'love': 2, 'night': 1}
+    assert second.num_docs == 3
+    assert second.revision == 2
+
+    # 다른 인스턴스의 revision은 다음 갱신에서 받아옴
+    assert first.refresh().revision == 2
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)['revision'] == 2
+
+
+def test_sync_reloads_newer_revision(tmp_path):
+    path = str(tmp_path / 'corpus_idf.json')
+    writer = CorpusIDF(path, snapshot_interval=0)
+    reader = CorpusIDF(path, snapshot_interval=0, read_only=True)
+
+    writer.add_documents([('a', ['love'])])
+    revision = writer.refresh().revision
+
+    assert reader.add_documents([('b', ['night'])]) == 0
+    assert reader.sync(revision).doc_freq == {'love': 1}
+
+
+def test_sync_returns_pinned_revision_only(tmp_path):
+    path = str(tmp_path / 'corpus_idf.json')
+    writer = CorpusIDF(path, snapshot_interval=0)
+    reader = CorpusIDF(path, snapshot_interval=0, read_only=True)
+    writer.add_documents([('a', ['love'])])
+    pinned = writer.refresh()
+    assert reader.sync(pinned.revision).doc_freq == {'love': 1}
+
+    # 고정한 뒤 다른 프로세스가 파일을 다음 revision으로 바꿔도 이미 읽은 revision은 그대로
+    writer.add_documents([('b', ['love', 'night'])])
+    writer.refresh()
+    assert writer.sync(pinned.revision) is pinned
+    assert reader.sync(pinned.revision).doc_freq == {'love': 1}
+    assert reader.sync(pinned.revision + 1).doc_freq == {'love': 2, 'night': 1}
+
+    # 읽기 전에 파일이 지나간 revision은 더 새 revision으로 대신하지 않음
+    late = CorpusIDF(path, snapshot_interval=0, read_only=True)
+    with pytest.raises(RevisionUnavailable):
+        late.sync(pinned.revision)
+
+
+def test_recent_revisions_are_bounded():
+    corpus = CorpusIDF(keep_revisions=2)
+    for index in range(4):
+        corpus.add_documents([(f"doc{index}", ['love'])])
+        corpus.refresh()
+
+    assert corpus.sync(4).num_docs == 4 and corpus.sync(3).num_docs == 3
+    with pytest.raises(RevisionUnavailable):
+        corpus.sync(2)
+
+
+def test_seen_is_capped(tmp_path):
+    path = str(tmp_path / 'corpus_idf.json')
+    corpus = CorpusIDF(path, snapshot_interval=0, max_seen=3)
+    for index in range(5):
+        corpus.add_documents([(f"doc{index}", ['love'])])
+        corpus.refresh()
+
+    assert list(corpus.seen) == ['doc2', 'doc3', 'doc4']
+    assert corpus.num_docs == 5
+    assert CorpusIDF(path, max_seen=3).seen.keys() == corpus.seen.keys()
+
+
+def test_loads_previous_snapshot_format(tmp_path):
+    path = tmp_path / 'corpus_idf.json'
+    path.write_text(json.dumps({'version': 1, 'numDocs': 2, 'docFreq': {'love': 2}, 'seen': ['a', 'b']}))
+
+    corpus = CorpusIDF(str(path))
+
+    assert (corpus.revision, corpus.num_docs, corpus.doc_freq) == (0, 2, {'love': 2})
+
+
+def test_install_replaces_server_file(tmp_path):
+    path = str(tmp_path / 'corpus_idf.json')
+    server = CorpusIDF(path, snapshot_interval=0)
+    server.add_documents([('a', ['love'])])
+    server.refresh()
+    running = CorpusIDF(path, snapshot_interval=0)  # 설치하는 동안 실행 중인 다른 서버 프로세스
+
+    built = server.offline_copy()
+    built.add_documents([('b', ['night']), ('c', ['night'])])
+    built.refresh()
+    built.write(str(tmp_path / 'corpus_idf.build.json'))
+    assert server.read_only and CorpusIDF(path).num_docs == 1  # 사본 집계는 서버 파일에 쓰지 않음
+
+    table = CorpusIDF(path, snapshot_interval=0).install(str(tmp_path / 'corpus_idf.build.json'))
+    assert table.revision == 3 and table.doc_freq == {'love': 1, 'night': 2}  # 서버 / 사본 revision보다 큼
+
+    # 실행 중인 서버 프로세스는 다음 갱신에서 설치된 파일을 읽고 대기 문서를 합침
+    running.add_documents([('d', ['love'])])
+    assert (running.refresh().revision, running.num_docs) == (4, 4)
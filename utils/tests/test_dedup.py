@@ -0,0 +1,79 @@
+"""
+근사 중복 후보 묶기: 같은 곡의 다른 영상만 묶고, 같은 가수 / 채널의 다른 곡은 남김
+"""
+
+import os
+
+import pytest
+
+DUPLICATES = [
+    # 같은 곡의 공식 영상 / 가사 영상 / 라이브
+    ('iu-palette-mv', '[MV] IU(아이유) _ Palette(팔레트) (Feat. G-DRAGON)', '1theK'),
+    ('iu-palette-lyrics', '[Lyrics] IU(아이유) _ Palette(팔레트) (Feat. G-DRAGON)', 'Lyrics Channel'),
+    ('bts-dynamite-mv', "BTS (방탄소년단) 'Dynamite' Official MV", 'HYBE LABELS'),
+    ('bts-dynamite-audio', "BTS (방탄소년단) 'Dynamite' (Official Audio)", 'BANGTANTV'),
+    ('yoasobi-yoru-mv', 'YOASOBI「夜に駆ける」 Official Music Video', 'Ayase / YOASOBI'),
+    ('yoasobi-yoru-lyrics', 'YOASOBI - 夜に駆ける (Lyric Video)', 'Lyrics JP'),
+]
+
+DISTINCT = [
+    # 같은 가수 / 채널의 다른 곡
+    ('iu-palette-mv', '[MV] IU(아이유) _ Palette(팔레트) (Feat. G-DRAGON)', '1theK'),
+    ('iu-night-mv', '[MV] IU(아이유) _ Through the Night(밤편지)', '1theK'),
+    ('bts-butter-mv', "BTS (방탄소년단) 'Butter' Official MV", 'HYBE LABELS'),
+    ('bts-dynamite-mv', "BTS (방탄소년단) 'Dynamite' Official MV", 'HYBE LABELS'),
+    ('yoasobi-yoru', '夜に駆ける', 'Ayase / YOASOBI'),
+    ('yoasobi-gunjou', '群青', 'Ayase / YOASOBI'),
+    ('yoasobi-idol', 'アイドル', 'Ayase / YOASOBI'),
+    ('yoasobi-yuusha', '勇者', 'Ayase / YOASOBI'),
+]
+
+
+def music_list(entries):
+    return [{'videoId': video_id, 'title': title, 'channelTitle': channel} for video_id, title, channel in entries]
+
+
+@pytest.fixture
+def dedup_enabled(service, monkeypatch):
+    monkeypatch.setattr(service, 'DEDUP_THRESHOLD', 0.8)
+
+
+def kept_ids(service, entries):
+    unique, _ = service.collapse_near_duplicates(music_list(entries))
+    return [music['videoId'] for music in unique]
+
+
+def test_disabled_by_default(service):
+    if 'DEDUP_THRESHOLD' in os.environ:
+        pytest.skip('DEDUP_THRESHOLD가 설정된 환경')
+    assert service.DEDUP_THRESHOLD == 0
+    assert kept_ids(service, DUPLICATES) == [video_id for video_id, _, _ in DUPLICATES]
+
+
+def test_same_song_collapses(service, dedup_enabled):
+    assert kept_ids(service, DUPLICATES) == ['iu-palette-mv', 'bts-dynamite-mv', 'yoasobi-yoru-mv']
+
+
+def test_different_songs_are_kept(service, dedup_enabled):
+    assert kept_ids(service, DISTINCT) == [video_id for video_id, _, _ in DISTINCT]
+
+
+def test_title_tokens_only(service):
+    assert service.dedup_tokens({'title': '夜に駆ける', 'channelTitle': 'Ayase / YOASOBI'}) == ['夜に駆ける']
+    assert service.dedup_tokens({'title': '勇者 / YOASOBI'}) == ['勇者', 'yoasobi']
+    assert service.dedup_tokens({'title': "BTS 'Butter' Official MV"}) == ['bts', 'butter']
+
+
+def test_recommend_keeps_distinct_songs(service, dedup_enabled):
+    body = {
+        'userId': 'dedup',
+        'candidateMusic': music_list(DISTINCT + DUPLICATES),
+        'playedHistory': [{'videoId': 'h1', 'title': 'YOASOBI 夜に駆ける', 'channelTitle': 'Ayase / YOASOBI'}]
+    }
+    response = service.app.test_client().post('/recommend', json=body)
+
+    # DISTINCT는 모두 남고, DUPLICATES는 DISTINCT에 같은 곡 영상이 있으면 묶임
+    # (夜に駆ける 공식 영상은 가수명 토큰이 더 있어 제목만 있는 영상과 다른 후보로 남음)
+    assert response.status_code == 200
+    video_ids = [music['videoId'] for music in response.get_json()['data']['recommendedMusic']]
+    assert sorted(video_ids) == sorted([video_id for video_id, _, _ in DISTINCT] + ['yoasobi-yoru-mv'])
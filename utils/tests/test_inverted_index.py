@@ -0,0 +1,103 @@
+"""
+상한 기반 가지치기 top-K (InvertedIndex / 카탈로그 스냅샷 세그먼트)와 전체 채점 결과 비교
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from catalog_index import unit_vector
+from catalog_snapshot import CatalogSegment, write_catalog_snapshot
+from inverted_index import InvertedIndex, vector_norm
+
+TERMS = [f"term{index}" for index in range(40)]
+LANGUAGES = ['ko', 'en', 'ja']
+LANGUAGE_BOOST = {'ko': 1.2, 'ja': 0.8}
+
+
+def random_documents(rng, count):
+    """[(key, 단위 벡터, 언어), ...] - 앞쪽 단어가 더 자주 나오도록 (포스팅 길이가 단어마다 다름)"""
+    documents = []
+    for index in range(count):
+        terms = {rng.choice(TERMS[:rng.randrange(5, len(TERMS) + 1)]) for _ in range(rng.randrange(1, 9))}
+        weights = unit_vector({term: rng.uniform(0.05, 1.0) for term in terms})
+        documents.append((f"doc{index}", weights, rng.choice(LANGUAGES)))
+    return documents
+
+
+def random_query(rng):
+    return {term: rng.uniform(0.01, 2.0) for term in rng.sample(TERMS, rng.randrange(1, 12))}
+
+
+def exhaustive_top_k(documents, query, k, skip):
+    """모든 문서를 채점해 정렬 (점수 내림차순, 같으면 먼저 추가된 문서 먼저, 0점 제외)"""
+    query_norm = vector_norm(query)
+    scored = []
+    for position, (key, weights, language) in enumerate(documents):
+        if key in skip:
+            continue
+        score = sum(query.get(term, 0.0) * weight for term, weight in weights.items())
+        score = score / query_norm * LANGUAGE_BOOST.get(language, 1.0)
+        if score > 0:
+            scored.append((-score, position, key))
+    scored.sort()
+    return [(key, -negative_score) for negative_score, _, key in scored[:k]]
+
+
+def assert_same_ranking(pruned, exhaustive):
+    assert [key for key, _ in pruned] == [key for key, _ in exhaustive]
+    np.testing.assert_allclose([score for _, score in pruned], [score for _, score in exhaustive], rtol=1e-9)
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('k', [1, 10, 50])
+def test_inverted_index_matches_exhaustive(seed, k):
+    rng = random.Random(seed)
+    documents = random_documents(rng, 300)
+    index = InvertedIndex()
+    for key, weights, language in documents:
+        index.add(key, weights, language)
+
+    removed = {key for key, _, _ in rng.sample(documents, 30)}
+    for key in removed:
+        index.remove(key)
+    exclude = {key for key, _, _ in rng.sample(documents, 20)}
+
+    for _ in range(5):
+        query = random_query(rng)
+        assert_same_ranking(
+            index.search(query, k, group_boost=LANGUAGE_BOOST, exclude=exclude),
+            exhaustive_top_k(documents, query, k, removed | exclude)
+        )
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_snapshot_segment_matches_exhaustive(seed, tmp_path):
+    rng = random.Random(seed)
+    documents = random_documents(rng, 300)
+    path = str(tmp_path / 'catalog.snapshot')
+    write_catalog_snapshot(path, [
+        {
+            'videoId': key,
+            'music': {'videoId': key},
+            'language': language,
+            'signature': np.zeros(8, dtype=np.uint8),
+            'terms': list(weights),
+            'counts': [1] * len(weights),
+            'weights': list(weights.values())
+        }
+        for key, weights, language in documents
+    ], num_bits=64)
+    segment = CatalogSegment(path)
+
+    skip = {key for key, _, _ in rng.sample(documents, 50)}
+    alive = np.array([key not in skip for key, _, _ in documents])
+
+    for k in [1, 10, 50]:
+        query = random_query(rng)
+        indices, scores = segment.search(query, k, LANGUAGE_BOOST, alive, vector_norm(query))
+        assert_same_ranking(
+            [(documents[index][0], score) for index, score in zip(indices.tolist(), scores.tolist())],
+            exhaustive_top_k(documents, query, k, skip)
+        )
@@ -0,0 +1,136 @@
+"""
+커널 프로세스 풀: 자식은 start()에서 모두 생성, initializer 적용, 자식의 코퍼스는 읽기 전용,
+자식이 고정된 코퍼스 revision을 읽지 못하면 더 새 revision 대신 요청 처리 프로세스에서 채점,
+풀을 다시 만든 뒤 이전 풀의 작업이 끝나도 대기열 한도 유지
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from corpus_idf import CorpusIDF, RevisionUnavailable
+from kernel_pool import DeadlineExceeded, KernelPool, PoolSaturated
+
+pytestmark = pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='fork 필요')
+
+initialized = False
+
+
+def mark_initialized():
+    global initialized
+    initialized = True
+
+
+def child_state():
+    return os.getpid(), initialized
+
+
+def sleep_for(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def corpus_state():
+    import recommendation_service
+    corpus = recommendation_service.corpus_idf
+    return corpus.read_only, corpus._snapshot_thread_pid != os.getpid()
+
+
+def test_start_forks_all_workers():
+    pool = KernelPool(max_workers=2, initializer=mark_initialized)
+    try:
+        before = len(multiprocessing.active_children())
+        pool.start()
+        assert len(multiprocessing.active_children()) - before == 2
+
+        pid, child_initialized = pool.run(child_state)
+        assert pid != os.getpid()
+        assert child_initialized and not initialized
+    finally:
+        pool.shutdown()
+
+
+def test_child_corpus_is_read_only(service):
+    if service.corpus_idf is None:
+        pytest.skip('코퍼스 IDF 모드 전용')
+
+    pool = KernelPool(max_workers=1, initializer=service.init_kernel_process)
+    try:
+        scored = pool.run(
+            service.score_recommendation,
+            [{'videoId': 'k1', 'title': '아이유 - 밤편지', 'channelTitle': '1theK'}],
+            [{'videoId': 'kh1', 'title': '아이유 - 좋은 날', 'channelTitle': '1theK'}],
+            None,
+            service.corpus_idf.revision
+        )
+        assert [document_id for document_id, _ in scored['documents']] == ['kh1', 'k1']
+        assert pool.run(corpus_state) == (True, True)
+        assert not service.corpus_idf.read_only
+    finally:
+        pool.shutdown()
+
+
+def test_unavailable_revision_is_scored_in_parent(service, monkeypatch):
+    if service.corpus_idf is None:
+        pytest.skip('코퍼스 IDF 모드 전용')
+    candidates = [{'videoId': 'p1', 'title': '아이유 - 밤편지', 'channelTitle': '1theK'},
+                  {'videoId': 'p2', 'title': '잔잔한 발라드 모음', 'channelTitle': '멜로디'}]
+    history = [{'videoId': 'ph1', 'title': '아이유 - 좋은 날 발라드', 'channelTitle': '1theK'}]
+
+    pool = KernelPool(max_workers=1, initializer=service.init_kernel_process)
+    monkeypatch.setattr(service, 'kernel_pool', pool)
+    try:
+        pool.start()  # 자식은 아래 revision을 보기 전에 생성됨
+        service.corpus_idf.add_documents([('pin-a', ['밤편지'])])
+        pinned = service.corpus_idf.refresh()
+
+        # 요청이 revision을 고정한 뒤 다른 워커가 파일을 다음 revision으로 바꿈
+        other = CorpusIDF(service.corpus_idf.path, snapshot_interval=0)
+        other.add_documents([('pin-b', ['발라드', '밤편지'])])
+        assert other.refresh().revision == pinned.revision + 1
+
+        with pytest.raises(RevisionUnavailable):
+            pool.run(service.score_recommendation, candidates, history, None, pinned.revision)
+
+        scored = service.run_recommendation_kernel(candidates, history, None, pinned)
+        expected = service.score_recommendation(candidates, history, None, pinned.revision)
+        assert scored['scores'] == expected['scores']
+    finally:
+        pool.shutdown()
+
+
+def test_stale_release_after_rebuild_keeps_limit():
+    pool = KernelPool(max_workers=1, max_queue=0)
+    try:
+        old = pool.start()
+        submitted = []
+        submit = old.submit
+        old.submit = lambda *args: submitted.append(submit(*args)) or submitted[-1]
+
+        with pytest.raises(DeadlineExceeded):
+            pool.run(sleep_for, 0.2, timeout=0.01)
+        assert pool.stats()['pending'] == 1
+
+        # 자식 비정상 종료로 풀을 다시 만든 뒤 이전 풀의 작업이 끝남 → 새 풀의 슬롯 수에 반영하지 않음
+        pool._discard_executor(old)
+        assert pool.start() is not old
+        finished = threading.Event()
+        submitted[0].add_done_callback(lambda future: finished.set())  # 풀의 슬롯 반환 콜백 다음에 실행
+        assert finished.wait(5)
+        assert pool.stats()['pending'] == 0
+
+        # 한도 1: 실행 중인 작업이 있으면 다음 작업은 거절
+        running = threading.Thread(target=pool.run, args=(sleep_for, 0.2))
+        running.start()
+        deadline = time.monotonic() + 5
+        while pool.stats()['pending'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        with pytest.raises(PoolSaturated):
+            pool.run(sleep_for, 0)
+        running.join()
+        assert pool.stats()['pending'] == 0
+    finally:
+        pool.shutdown()
@@ -0,0 +1,105 @@
+"""
+/generate-keywords 재생 기록 분석 캐시: 같은 감정 / 재생 기록이면 적중, 기록이 바뀌면 다시 분석,
+합쳐진 요청도 단계 시간 기록
+"""
+
+import threading
+
+from single_flight import SingleFlight
+
+from test_single_flight import wait_until
+
+HISTORY = [
+    {'videoId': f"kw{index}", 'title': title, 'channelTitle': 'Channel',
+     'playedAt': f"2025-01-01T{index:02d}:00:00Z", 'emotion': 'calm'}
+    for index, title in enumerate([
+        '아이유 - 밤편지', 'lofi chill beats', '잔잔한 발라드 모음', '아이유 - 좋은 날', 'acoustic love songs', '새벽 감성 플레이리스트'
+    ])
+]
+
+
+def generate(service, emotion, history):
+    response = service.app.test_client().post('/generate-keywords', json={'emotion': emotion, 'playedHistory': history})
+    assert response.status_code == 200
+    return response.get_json()['data']
+
+
+def keyword_lookups(service):
+    stats = service.keyword_cache.stats()
+    return stats['hits'], stats['misses']
+
+
+def stage_count(service, stage):
+    series = service.stage_duration._values.get(('/generate-keywords', stage))
+    return sum(series[:-1]) if series else 0
+
+
+def test_same_history_hits_cache(service):
+    service.keyword_cache.clear()
+    hits, misses = keyword_lookups(service)
+
+    first = generate(service, 'calm', HISTORY)
+    second = generate(service, 'calm', [dict(music) for music in HISTORY])
+
+    assert keyword_lookups(service) == (hits + 1, misses + 1)
+    assert second['topTerms'] == first['topTerms']
+    assert second['languagePreference'] == first['languagePreference']
+
+
+def test_changed_history_or_emotion_misses_cache(service):
+    service.keyword_cache.clear()
+    generate(service, 'calm', HISTORY)
+    hits, misses = keyword_lookups(service)
+
+    retitled = [dict(HISTORY[0], title='BTS - Dynamite')] + HISTORY[1:]
+    replayed = HISTORY + [dict(HISTORY[0], playedAt='2025-01-02T00:00:00Z')]
+    generate(service, 'calm', retitled)
+    generate(service, 'calm', replayed)
+    generate(service, 'calm', HISTORY[::-1])  # 순서도 지문에 포함
+    generate(service, 'happy', [dict(music, emotion='happy') for music in HISTORY])
+
+    assert keyword_lookups(service) == (hits, misses + 4)
+
+
+def test_history_fingerprint_is_a_stable_digest(service):
+    fingerprint = service.history_fingerprint(HISTORY)
+
+    assert fingerprint == service.history_fingerprint([dict(music) for music in HISTORY])
+    assert len(fingerprint) == 32 and int(fingerprint, 16) >= 0
+    assert fingerprint != service.history_fingerprint(HISTORY[:-1])
+    # 필드 경계가 달라도 같은 문자열로 이어 붙여지는 기록끼리 구분
+    assert service.history_fingerprint([{'videoId': 'a', 'title': 'b c'}]) != \
+        service.history_fingerprint([{'videoId': 'a', 'title': 'b', 'description': 'c'}])
+
+
+def test_coalesced_request_records_stage(service, monkeypatch):
+    service.keyword_cache.clear()
+    monkeypatch.setattr(service, 'request_flights', SingleFlight())
+    started = threading.Event()
+    release = threading.Event()
+    build = service.build_keyword_analysis
+
+    def blocking_build(cache_key, played_history):
+        started.set()
+        release.wait(5)
+        return build(cache_key, played_history)
+
+    monkeypatch.setattr(service, 'build_keyword_analysis', blocking_build)
+    coalesced_before = stage_count(service, 'coalesce')
+    profile_before = stage_count(service, 'profile')
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(generate(service, 'calm', HISTORY)))
+    leader.start()
+    assert started.wait(5)
+    waiter = threading.Thread(target=lambda: results.append(generate(service, 'calm', HISTORY)))
+    waiter.start()
+    wait_until(lambda: service.request_flights.stats()['waiting'] == 1)
+    release.set()
+    leader.join()
+    waiter.join()
+
+    assert service.request_flights.stats()['coalesced'] == 1
+    assert stage_count(service, 'profile') == profile_before + 1
+    assert stage_count(service, 'coalesce') == coalesced_before + 1
+    assert results[0]['topTerms'] == results[1]['topTerms']
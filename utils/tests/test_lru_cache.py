@@ -0,0 +1,59 @@
+"""
+LRU 캐시: 용량에 도달하면 가장 오래 사용하지 않은 항목부터 제거, 적중 / 미스 / 제거 / 만료 집계
+분석 캐시는 videoId + 내용 기준으로 재사용
+"""
+
+import time
+
+from lru_cache import LRUCache
+
+
+def test_evicts_least_recently_used_at_capacity():
+    cache = LRUCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # a를 최근 사용으로 이동 → 다음 제거 대상은 b
+
+    cache.set('c', 3)
+
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+    assert len(cache) == 2
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (3, 1, 1, 2)
+    assert stats['hitRate'] == 0.75
+
+
+def test_overwrite_does_not_evict():
+    cache = LRUCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('a', 10)  # 이미 있는 키는 값만 바뀌고 최근 사용으로 이동
+
+    cache.set('c', 3)
+
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (10, None, 3)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_expired_entry_counts_as_miss():
+    cache = LRUCache(max_size=2, ttl=0.01)
+    cache.set('a', 1)
+    time.sleep(0.02)
+
+    assert cache.get('a', 'missing') == 'missing'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expirations'], stats['size']) == (0, 1, 1, 0)
+
+
+def test_analysis_cache_reuses_same_video(service, monkeypatch):
+    monkeypatch.setattr(service, 'analysis_cache', LRUCache(max_size=2))
+    music = {'videoId': 'lru-1', 'title': '아이유 - 밤편지', 'channelTitle': '1theK'}
+
+    first = service.analyze_music(music)
+    assert service.analyze_music(dict(music)) is first
+    changed = service.analyze_music(dict(music, title='아이유 - 좋은 날'))  # 같은 videoId라도 내용이 바뀌면 다시 분석
+    assert changed is not first and '좋은' in changed['tokens']
+
+    service.analyze_music({'videoId': 'lru-2', 'title': 'lofi beats'})  # 용량 2 → 가장 오래된 lru-1 원래 분석 제거
+    assert service.analyze_music(music) is not first
+    assert service.analysis_cache.stats()['evictions'] >= 1
@@ -0,0 +1,64 @@
+"""
+프로필 증분 갱신: /profile/append로 한 곡씩 반영한 프로필 = 같은 재생 기록으로 /profile/refresh한 프로필
+"""
+
+import pytest
+
+TITLES = [
+    '아이유 - 밤편지', 'lofi chill beats', '잔잔한 발라드 모음', 'BTS - Dynamite', '아이유 - 좋은 날',
+    'night drive synthwave', '새벽 감성 플레이리스트', 'acoustic love songs', '비 오는 날 재즈', 'dance pop hits',
+    '아이유 - 무릎', 'lofi rain study', '발라드 명곡 모음', 'chill acoustic cover'
+]
+PLAYS = [
+    {
+        'videoId': f"pa{index}",
+        'title': title,
+        'channelTitle': 'Channel',
+        'playedAt': f"2025-01-01T{index:02d}:00:00Z",
+        'emotion': 'calm' if index % 3 else 'happy'
+    }
+    for index, title in enumerate(TITLES)
+]
+
+
+def post(service, path, body):
+    response = service.app.test_client().post(path, json=body)
+    assert response.status_code == 200, response.get_json()
+    return {profile['emotion']: profile for profile in response.get_json()['data']['profiles']}
+
+
+def assert_same_profile(appended, rebuilt):
+    assert appended['profile'].keys() == rebuilt['profile'].keys()
+    for term, weight in rebuilt['profile'].items():
+        assert appended['profile'][term] == pytest.approx(weight, rel=1e-6)
+    assert appended['languagePreference'] == pytest.approx(rebuilt['languagePreference'])
+    assert appended['musicCount'] == rebuilt['musicCount']
+
+
+def test_append_matches_full_rebuild(service):
+    # 처음 6곡으로 만든 뒤 나머지를 한 곡씩 추가 (10곡 윈도우가 밀려나는 경우 + 이미 반영한 재생 포함)
+    post(service, '/profile/refresh', {'userId': 'append-user', 'playedHistory': PLAYS[:6]})
+    for music in PLAYS[6:] + [PLAYS[8]]:
+        appended = post(service, '/profile/append', {'userId': 'append-user', 'music': music})
+
+    rebuilt = post(service, '/profile/refresh', {'userId': 'rebuild-user', 'playedHistory': PLAYS})
+
+    assert_same_profile(appended[''], rebuilt[''])
+    for emotion in ['calm', 'happy']:
+        stored = service.app.test_client().get(f"/profile/append-user?emotion={emotion}").get_json()['data']
+        assert_same_profile(stored, rebuilt[emotion])
+
+
+def test_append_older_play_matches_full_rebuild(service):
+    # 재생 시각이 늦게 도착한 과거 재생도 playedAt 순서 위치에 반영
+    post(service, '/profile/refresh', {'userId': 'append-late', 'playedHistory': PLAYS[:3] + PLAYS[4:]})
+    appended = post(service, '/profile/append', {'userId': 'append-late', 'music': PLAYS[3]})
+
+    rebuilt = post(service, '/profile/refresh', {'userId': 'rebuild-late', 'playedHistory': PLAYS})
+
+    assert_same_profile(appended[''], rebuilt[''])
+
+
+def test_append_without_profile_is_404(service):
+    response = service.app.test_client().post('/profile/append', json={'userId': 'append-none', 'music': PLAYS[0]})
+    assert response.status_code == 404
@@ -0,0 +1,43 @@
+"""
+페이지 커서 채점 결과 저장소 (워커 간 공유)
+"""
+
+import time
+
+from ranking_store import RankingStore
+
+RANKING = {'id': 'r1', 'userId': 'u1', 'music': [{'videoId': 'a'}], 'scores': [0.5], 'languages': None, 'k': 1}
+
+
+def test_other_worker_reads_saved_ranking(tmp_path):
+    path = str(tmp_path / 'rankings.sqlite3')
+    RankingStore(path).set('r1', RANKING)
+
+    other = RankingStore(path)
+
+    assert other.get('r1') == RANKING
+    assert other.stats()['sharedHits'] == 1
+    assert other.get('missing') is None
+
+
+def test_expired_and_overflow_rows_are_removed(tmp_path):
+    path = str(tmp_path / 'rankings.sqlite3')
+    store = RankingStore(path, max_size=2, ttl=60, cleanup_every=1000)
+    for index in range(4):
+        store.set(f"r{index}", RANKING)
+        time.sleep(0.01)
+
+    store.cleanup()
+    other = RankingStore(path)
+    assert [other.get(f"r{index}") is not None for index in range(4)] == [False, False, True, True]
+
+    expired = RankingStore(str(tmp_path / 'expired.sqlite3'), ttl=-1)
+    expired.set('r1', RANKING)
+    assert RankingStore(expired.path).get('r1') is None
+
+
+def test_memory_only_without_path():
+    store = RankingStore(None)
+    store.set('r1', RANKING)
+
+    assert store.get('r1') == RANKING
@@ -0,0 +1,34 @@
+"""
+준비 상태 체크: 워밍업 전 / 중에는 /ready 503, 워밍업 후 준비 완료되면 200 + 워밍업 결과
+"""
+
+
+def ready(service):
+    response = service.app.test_client().get('/ready')
+    return response.status_code, response.get_json()
+
+
+def test_ready_only_after_warm_up(service, monkeypatch):
+    monkeypatch.setattr(service, 'service_state', dict(service.service_state, ready=False, warmup=None))
+
+    status, body = ready(service)
+    assert (status, body['status'], body['startup']['warmup']) == (503, 'starting', None)
+    assert body['startup']['importSeconds'] >= 0
+
+    during = []
+    preload = service.preload_hot_path
+    monkeypatch.setattr(service, 'preload_hot_path', lambda: during.append(ready(service)) or preload())
+
+    warmup = service.warm_up()
+
+    assert [(status, body['status']) for status, body in during] == [(503, 'warming')]
+    assert ready(service)[0] == 503  # 워밍업만으로는 준비 완료가 아님 (mark_ready 필요)
+    assert warmup['requests'] > 0 and warmup['failed'] == 0
+
+    service.mark_ready()
+    status, body = ready(service)
+    assert (status, body['status']) == (200, 'ready')
+    assert body['startup']['warmup'] == warmup
+
+    service.mark_ready(False)  # 워커 종료 시
+    assert ready(service)[0] == 503
@@ -0,0 +1,54 @@
+"""
+프로필 일괄 재계산: 서버 코퍼스 IDF 파일은 바꾸지 않고 --corpus-out에 저장, corpus-install로 따로 교체
+"""
+
+import json
+
+import pytest
+
+import rebuild_profiles
+from corpus_idf import CorpusIDF
+
+HISTORY = [
+    {'userId': 'u1', 'youtubeVideoId': 'r1', 'videoTitle': '아이유 - 밤편지', 'channelTitle': '1theK',
+     'playedAt': '2025-01-01T10:00:00Z', 'emotionId': {'emotion': 'sleep'}},
+    {'userId': 'u1', 'youtubeVideoId': 'r2', 'videoTitle': 'lofi night beats', 'channelTitle': 'Lofi Girl',
+     'playedAt': '2025-01-01T09:00:00Z', 'emotionId': {'emotion': 'sleep'}},
+    {'userId': 'u2', 'youtubeVideoId': 'r3', 'videoTitle': 'BTS - Dynamite', 'channelTitle': 'HYBE LABELS',
+     'playedAt': '2025-01-01T08:00:00Z', 'emotionId': {'emotion': 'happy'}}
+]
+
+
+def run(argv):
+    args = rebuild_profiles.parse_args(argv)
+    assert args.handler(args) == 0
+
+
+def test_build_writes_corpus_to_separate_path(service, monkeypatch, tmp_path):
+    if service.corpus_idf is None:
+        pytest.skip('코퍼스 IDF 모드 전용')
+    monkeypatch.setattr(service.corpus_idf, 'read_only', False)  # build가 읽기 전용으로 바꾼 것을 테스트 후 되돌림
+
+    live_path = service.corpus_idf.path
+    service.corpus_idf.add_documents([('live', ['서버', '문서'])])  # 단독 실행해도 서버 파일이 있도록
+    service.corpus_idf.refresh()
+    with open(live_path, 'rb') as f:
+        live_before = f.read()
+    live = CorpusIDF(live_path)
+
+    input_path = tmp_path / 'music_history.jsonl'
+    input_path.write_text('\n'.join(json.dumps(record) for record in HISTORY))
+    corpus_out = str(tmp_path / 'corpus_idf.rebuild.json')
+    run(['build', '--input', str(input_path), '--out', str(tmp_path / 'profiles.jsonl'),
+         '--corpus-out', corpus_out, '--workers', '1'])
+    service.corpus_idf.refresh()  # 서버 모듈의 종료 시 저장과 같은 경로
+
+    with open(live_path, 'rb') as f:
+        assert f.read() == live_before
+    built = CorpusIDF(corpus_out)
+    assert {'r1', 'r2', 'r3'} <= built.seen.keys()
+
+    run(['corpus-install', corpus_out, '--corpus', live_path])
+    installed = CorpusIDF(live_path)
+    assert installed.revision > max(live.revision, built.revision)
+    assert (installed.num_docs, installed.doc_freq) == (built.num_docs, built.doc_freq)
@@ -0,0 +1,184 @@
+"""
+/recommend 응답 (코퍼스 IDF 모드에서 같은 요청은 같은 점수, 코퍼스 문서가 적으면 요청별 IDF),
+/recommend/batch 응답 = 사용자별 /recommend 응답 (같은 후보, 같은 순서와 점수)
+"""
+
+import json
+
+import pytest
+
+CANDIDATES = [
+    {'videoId': 'c1', 'title': '아이유 - 밤편지 (Official MV)', 'channelTitle': '1theK'},
+    {'videoId': 'c2', 'title': 'Lofi Girl - chill beats to relax', 'channelTitle': 'Lofi Girl'},
+    {'videoId': 'c3', 'title': '잔잔한 발라드 플레이리스트', 'channelTitle': '멜로디'},
+    {'videoId': 'c4', 'title': 'BTS - Dynamite (Official MV)', 'channelTitle': 'HYBE LABELS'}
+]
+
+HISTORY = [
+    {'videoId': 'h1', 'title': '아이유 - 좋은 날', 'channelTitle': '1theK', 'playedAt': '2025-01-01T10:00:00Z'},
+    {'videoId': 'h2', 'title': '잔잔한 밤 발라드 모음', 'channelTitle': '멜로디', 'playedAt': '2025-01-01T09:00:00Z'},
+    {'videoId': 'h3', 'title': 'chill lofi beats', 'channelTitle': 'Lofi Girl', 'playedAt': '2025-01-01T08:00:00Z'}
+]
+
+
+def recommend(service, body):
+    response = service.app.test_client().post('/recommend', json=body)
+    assert response.status_code == 200
+    return response.get_json()['data']
+
+
+def test_same_request_gets_same_scores(service):
+    body = {'userId': 'same-request', 'candidateMusic': CANDIDATES, 'playedHistory': HISTORY, 'dedup': False}
+
+    first = recommend(service, body)
+    second = recommend(service, body)
+
+    assert first['recommendedMusic'] == second['recommendedMusic']
+    if service.corpus_idf is not None:
+        assert service.corpus_idf.stats()['pending'] > 0  # 다음 revision에 집계
+
+
+def test_next_page_from_another_worker(service):
+    body = {'userId': 'paging', 'candidateMusic': CANDIDATES, 'playedHistory': HISTORY, 'k': 2, 'dedup': False}
+    first = recommend(service, body)
+
+    # 다른 워커: 워커별 캐시에는 없고 공유 저장소에만 있음
+    service.ranking_store.cache.clear()
+    second = recommend(service, {'userId': 'paging', 'cursor': first['nextCursor']})
+
+    assert first['totalCount'] == 4
+    assert second['nextCursor'] is None
+    page_ids = [music['videoId'] for music in first['recommendedMusic'] + second['recommendedMusic']]
+    assert sorted(page_ids) == ['c1', 'c2', 'c3', 'c4']
+
+
+def test_invalid_deadline_is_rejected(service):
+    client = service.app.test_client()
+    for deadline in ['100', True, -1]:
+        body = {'userId': 'deadline', 'candidateMusic': CANDIDATES, 'playedHistory': HISTORY, 'deadlineMs': deadline}
+        response = client.post('/recommend', json=body)
+        assert response.status_code == 400
+        assert 'deadlineMs' in response.get_json()['message']
+
+    assert recommend(service, {'userId': 'deadline', 'candidateMusic': CANDIDATES, 'playedHistory': HISTORY, 'deadlineMs': 0})
+
+
+def test_cold_corpus_uses_request_idf(service, monkeypatch):
+    if service.corpus_idf is None:
+        pytest.skip('코퍼스 IDF 모드 전용')
+    candidates = [dict(music, videoId=f"cold-{music['videoId']}") for music in CANDIDATES]
+    body = {'userId': 'cold-corpus', 'candidateMusic': candidates, 'playedHistory': HISTORY, 'dedup': False}
+
+    monkeypatch.setattr(service, 'CORPUS_MIN_DOCS', 10 ** 9)
+    assert service.current_corpus() is None
+    cold = recommend(service, body)
+    assert 'cold-c1' in service.corpus_idf._pending  # 요청별 IDF로 채점하는 동안에도 문서는 집계
+
+    monkeypatch.setattr(service, 'corpus_idf', None)  # IDF_MODE=request
+    assert recommend(service, body)['recommendedMusic'] == cold['recommendedMusic']
+
+
+def test_batch_matches_single_requests(service):
+    history = [dict(music, emotion='calm') for music in HISTORY]
+    users = [
+        {'userId': 'batch-1', 'emotion': 'calm', 'playedHistory': history},
+        {'userId': 'batch-2', 'emotion': 'calm', 'playedHistory': history[1:]},
+        {'userId': 'batch-3', 'emotion': 'calm', 'playedHistory': []}
+    ]
+    response = service.app.test_client().post('/recommend/batch', json={
+        'candidateMusic': CANDIDATES, 'requests': users, 'limit': 3, 'dedup': False
+    })
+    assert response.status_code == 200
+    results = response.get_json()['data']['results']
+
+    for user, result in zip(users, results):
+        single = recommend(service, dict(user, candidateMusic=CANDIDATES, k=3, dedup=False))
+        assert [music['videoId'] for music in result['recommendedMusic']] == [
+            music['videoId'] for music in single['recommendedMusic']
+        ]
+        assert [music['score'] for music in result['recommendedMusic']] == pytest.approx(
+            [music['score'] for music in single['recommendedMusic']], abs=1e-4
+        )
+
+
+def test_batch_rejects_invalid_limit(service):
+    client = service.app.test_client()
+    for limit in ['10', -1, 0, 2.5, True]:
+        response = client.post('/recommend/batch', json={
+            'candidateMusic': CANDIDATES, 'requests': [{'userId': 'batch-limit', 'playedHistory': HISTORY}], 'limit': limit
+        })
+        assert response.status_code == 400
+        assert 'limit' in response.get_json()['message']
+
+
+def recommend_stream(service, lines):
+    response = service.app.test_client().post(
+        '/recommend/stream', data=''.join(line + '\n' for line in lines), content_type='application/x-ndjson'
+    )
+    return response.status_code, [json.loads(line) for line in response.get_data(as_text=True).splitlines() if line]
+
+
+def assert_stream_matches_recommend(service, header, candidates):
+    body = dict(header, candidateMusic=candidates)
+    expected = recommend(service, body)
+
+    lines = [json.dumps(header)] + [json.dumps(candidates[:1]), ''] + [json.dumps(music) for music in candidates[1:]]
+    status, (summary, *items) = recommend_stream(service, lines)
+
+    assert status == 200
+    assert summary['data']['totalCount'] == expected['totalCount']
+    assert [(item['videoId'], item['score']) for item in items] == [
+        (music['videoId'], music['score']) for music in expected['recommendedMusic']
+    ]
+
+
+def test_stream_ranks_like_recommend(service):
+    header = {'userId': 'stream', 'emotion': '', 'playedHistory': HISTORY, 'k': 3, 'dedup': False}
+    assert_stream_matches_recommend(service, header, CANDIDATES)
+
+
+def test_stream_chunks_rank_like_recommend_with_corpus_idf(service, monkeypatch):
+    if service.corpus_idf is None:
+        pytest.skip('코퍼스 IDF 모드 전용 (요청별 IDF는 청크 기준)')
+    monkeypatch.setattr(service, 'CORPUS_MIN_DOCS', 0)
+    monkeypatch.setattr(service.chunk_candidates, '__defaults__', (2,))  # 후보 4개 → 청크 2개
+
+    header = {'userId': 'stream-chunks', 'emotion': '', 'playedHistory': HISTORY, 'k': 3, 'dedup': False}
+    assert_stream_matches_recommend(service, header, CANDIDATES)
+
+
+def test_stream_rejects_malformed_lines(service):
+    header = json.dumps({'userId': 'stream-bad', 'playedHistory': HISTORY})
+    candidate = json.dumps(CANDIDATES[0])
+
+    cases = [
+        ([header, candidate, '{"videoId": "broken"'], '3번째 줄'),
+        (['not json', candidate], '1번째 줄'),
+        ([json.dumps([CANDIDATES[0]]), candidate], '첫 줄'),
+        ([header, json.dumps({'title': 'no id'})], 'videoId'),
+        ([header, '42'], 'videoId')
+    ]
+    for lines, message in cases:
+        status, (error,) = recommend_stream(service, lines)
+        assert status == 400
+        assert error['success'] is False and message in error['message']
+
+    response = service.app.test_client().post('/recommend/stream', json={'userId': 'stream-bad'})
+    assert response.status_code == 415
+
+
+def test_compact_arrays_line_up_with_full_response(service):
+    body = {'userId': 'compact', 'candidateMusic': CANDIDATES, 'playedHistory': HISTORY, 'k': 3, 'dedup': False}
+    full = recommend(service, body)
+    compact = recommend(service, dict(body, compact=True, includeLanguage=True))
+
+    assert compact['videoIds'] == [music['videoId'] for music in full['recommendedMusic']]
+    assert compact['scores'] == [music['score'] for music in full['recommendedMusic']]
+    assert compact['languages'] == [music['language'] for music in full['recommendedMusic']]
+    assert (compact['totalCount'], compact['userProfileSize']) == (full['totalCount'], full['userProfileSize'])
+    assert 'recommendedMusic' not in compact and 'userProfile' not in compact and 'userProfile' in full
+
+    # 다음 페이지도 같은 옵션으로 이어짐
+    rest = recommend(service, {'userId': 'compact', 'cursor': compact['nextCursor'], 'compact': True})
+    assert sorted(compact['videoIds'] + rest['videoIds']) == ['c1', 'c2', 'c3', 'c4']
+    assert 'languages' not in rest
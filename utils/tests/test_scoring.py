@@ -0,0 +1,68 @@
+"""
+일괄 채점(score_candidates / score_candidates_batch)과 후보별 cosine_similarity 비교
+취향 벡터 가중치를 float32로 보관하므로 상대 오차 범위 안에서 비교
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+WORDS = ['love', 'night', 'dance', 'ballad', 'official', 'live', 'acoustic', 'remix',
+         '사랑', '이별', '발라드', '밤편지', '아이유', '노래', '플레이리스트', '잔잔한']
+
+RTOL = 1e-5
+ATOL = 1e-9
+
+
+def random_documents(rng, count):
+    """단어 0 ~ 12개짜리 토큰 목록 (빈 문서 포함)"""
+    return [[rng.choice(WORDS) for _ in range(rng.randrange(0, 13))] for _ in range(count)]
+
+
+def random_profile(rng):
+    """후보에 없는 단어도 섞인 {term: weight} 취향 벡터"""
+    terms = rng.sample(WORDS + ['unseen', '처음'], rng.randrange(1, 10))
+    return {term: rng.uniform(0.01, 2.0) for term in terms}
+
+
+def reference_scores(service, user_profile, token_lists):
+    """원래 구현: 후보마다 TF-IDF 딕셔너리를 만들고 cosine_similarity 호출 (IDF는 후보 전체 기준)"""
+    idf = service.calculate_idf([{'tokens': tokens} for tokens in token_lists])
+    return [
+        service.cosine_similarity(user_profile, service.calculate_tfidf(service.calculate_tf(tokens), idf))
+        for tokens in token_lists
+    ]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_score_candidates_matches_cosine_similarity(service, seed):
+    rng = random.Random(seed)
+    token_lists = random_documents(rng, rng.randrange(1, 60))
+    user_profile = random_profile(rng)
+
+    # 후보 행렬을 먼저 만들고 취향 벡터를 나중에 만들어도 (처음 보는 단어 포함) 같은 점수
+    candidate_matrix = service.build_candidate_matrix(token_lists)
+    scores = service.score_candidates(service.TermVector.from_dict(user_profile), candidate_matrix)
+
+    np.testing.assert_allclose(scores, reference_scores(service, user_profile, token_lists), rtol=RTOL, atol=ATOL)
+
+
+def test_score_candidates_batch_matches_single(service):
+    rng = random.Random(42)
+    token_lists = random_documents(rng, 40)
+    profiles = [service.TermVector.from_dict(random_profile(rng)) for _ in range(5)] + [service.TermVector()]
+    candidate_matrix = service.build_candidate_matrix(token_lists)
+
+    batch_scores = service.score_candidates_batch(profiles, candidate_matrix, chunk_size=2)
+
+    for profile, row in zip(profiles, batch_scores):
+        np.testing.assert_allclose(row, service.score_candidates(profile, candidate_matrix), rtol=RTOL, atol=ATOL)
+
+
+def test_score_candidates_empty_inputs(service):
+    candidate_matrix = service.build_candidate_matrix([['love', 'night'], []])
+
+    assert service.score_candidates({}, candidate_matrix).tolist() == [0.0, 0.0]
+    assert service.score_candidates({'love': 1.0}, service.build_candidate_matrix([])).tolist() == []
+    assert service.score_candidates({'love': 1.0}, candidate_matrix)[1] == 0.0
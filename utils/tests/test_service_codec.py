@@ -0,0 +1,58 @@
+"""
+gzip 요청 본문 크기 제한 (압축 해제 후 크기 기준 413)
+"""
+
+import gzip
+import json
+import zlib
+
+import pytest
+from werkzeug.exceptions import RequestEntityTooLarge
+
+import service_codec
+from service_codec import gunzip_bounded
+
+BODY = {'userId': 'gzip', 'candidateMusic': [{'videoId': 'a', 'title': 'love song'}], 'playedHistory': []}
+
+
+def test_gunzip_bounded_matches_gzip():
+    data = json.dumps(BODY).encode() * 100
+
+    assert gunzip_bounded(gzip.compress(data), len(data)) == data
+    assert gunzip_bounded(gzip.compress(data) + gzip.compress(b'tail'), len(data) + 4) == data + b'tail'
+
+
+def test_gunzip_bounded_stops_past_limit():
+    with pytest.raises(RequestEntityTooLarge):
+        gunzip_bounded(gzip.compress(b'\0' * 10_000_000), 1_000_000)
+
+
+def test_gunzip_bounded_rejects_truncated_data():
+    with pytest.raises((EOFError, zlib.error)):
+        gunzip_bounded(gzip.compress(b'x' * 1000)[:-10], 10_000)
+
+
+def test_gzip_json_body_over_limit_returns_413(service, monkeypatch):
+    monkeypatch.setattr(service_codec, 'REQUEST_MAX_DECOMPRESSED_BYTES', 4096)
+    client = service.app.test_client()
+    headers = {'Content-Encoding': 'gzip', 'Content-Type': 'application/json'}
+
+    small = client.post('/recommend', data=gzip.compress(json.dumps(BODY).encode()), headers=headers)
+    bomb = client.post('/recommend', data=gzip.compress(json.dumps(BODY).encode() + b' ' * 100_000), headers=headers)
+
+    assert small.status_code == 200
+    assert bomb.status_code == 413
+    assert bomb.get_json()['success'] is False
+
+
+def test_gzip_ndjson_body_over_limit_returns_413(service, monkeypatch):
+    monkeypatch.setattr(service_codec, 'REQUEST_MAX_DECOMPRESSED_BYTES', 4096)
+    lines = [json.dumps({'userId': 'gzip', 'k': 5})] + [json.dumps({'videoId': f"v{i}", 'title': 'love song'}) for i in range(500)]
+
+    response = service.app.test_client().post(
+        '/recommend/stream',
+        data=gzip.compress('\n'.join(lines).encode()),
+        headers={'Content-Encoding': 'gzip', 'Content-Type': 'application/x-ndjson'}
+    )
+
+    assert response.status_code == 413
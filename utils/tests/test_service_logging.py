@@ -0,0 +1,33 @@
+"""
+큐 기반 로그 핸들러: 출력 스레드를 멈추면 큐에 남은 로그를 모두 출력, 이후 로그는 바로 출력
+"""
+
+import logging
+
+from service_logging import ProcessQueueHandler
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_stop_listener_flushes_queued_records():
+    target = ListHandler()
+    handler = ProcessQueueHandler(target)
+    logger = logging.Logger('test.service_logging')
+    logger.addHandler(handler)
+
+    for index in range(200):
+        logger.info('queued %d', index)
+    handler.stop_listener()
+
+    assert target.messages == [f"queued {index}" for index in range(200)]
+
+    logger.info('after stop')
+    assert target.messages[-1] == 'after stop'
+    handler.close()
@@ -0,0 +1,176 @@
+"""
+동시 중복 요청 합치기: 같은 키는 한 번만 계산, 예외 전달, 기다리는 요청의 기한, 끈 경우 합치지 않음
+"""
+
+import threading
+import time
+
+import pytest
+
+from kernel_pool import DeadlineExceeded
+from single_flight import SingleFlight
+
+from test_recommend import CANDIDATES, HISTORY
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, '대기 시간 초과'
+        time.sleep(0.005)
+
+
+def run_concurrently(flights, count, fn, timeout=None):
+    """첫 호출이 fn 안에 들어간 뒤 나머지 호출 시작, fn을 끝내는 release 이벤트와 호출별 결과 / 예외 반환"""
+    started = threading.Event()
+    release = threading.Event()
+    results = [None] * count
+
+    def blocking(*args):
+        started.set()
+        release.wait(5)
+        return fn(*args)
+
+    def call(index):
+        try:
+            results[index] = flights.run('key', blocking, index, timeout=timeout)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=call, args=(0,))]
+    threads[0].start()
+    assert started.wait(5)
+    threads += [threading.Thread(target=call, args=(index,)) for index in range(1, count)]
+    for thread in threads[1:]:
+        thread.start()
+    return threads, release, results
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    threads, release, results = run_concurrently(flights, 4, lambda index: calls.append(index) or {'leader': index})
+    wait_until(lambda: flights.stats()['waiting'] == 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [0]
+    assert results[0] == ({'leader': 0}, False)
+    assert all(result == ({'leader': 0}, True) for result in results[1:])
+    assert results[1][0] is results[0][0]  # 같은 결과 객체를 공유
+    stats = flights.stats()
+    assert (stats['calls'], stats['coalesced'], stats['inFlight'], stats['scope']) == (1, 3, 0, 'process')
+
+    # 계산이 끝나면 키가 사라지므로 다음 호출은 새로 계산
+    assert flights.run('key', lambda: 'again') == ('again', False)
+
+
+def test_error_is_passed_to_waiters():
+    flights = SingleFlight()
+
+    def fail(index):
+        raise ValueError('kernel failed')
+
+    threads, release, results = run_concurrently(flights, 3, fail)
+    wait_until(lambda: flights.stats()['waiting'] == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert results[1] is results[0]
+
+
+def test_waiter_gives_up_at_its_deadline():
+    flights = SingleFlight()
+
+    threads, release, results = run_concurrently(flights, 2, lambda index: index, timeout=0.05)
+    threads[1].join(5)
+    assert isinstance(results[1], DeadlineExceeded)
+    assert results[0] is None  # 계산 중인 요청은 그대로 진행
+
+    release.set()
+    threads[0].join()
+    assert results[0] == (0, False)
+    assert flights.stats()['timeouts'] == 1
+
+
+def test_disabled_does_not_coalesce():
+    flights = SingleFlight(enabled=False)
+    calls = []
+
+    threads, release, results = run_concurrently(flights, 3, lambda index: calls.append(index) or index)
+    wait_until(lambda: len(calls) == 0 and all(thread.is_alive() for thread in threads))
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(calls) == [0, 1, 2]
+    assert results == [(0, False), (1, False), (2, False)]
+    assert flights.stats()['coalesced'] == 0
+
+
+@pytest.fixture
+def blocked_kernel(service, monkeypatch):
+    """/recommend 채점을 release까지 멈춤 (호출 수 기록)"""
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    run = service.kernel_pool.run
+
+    def blocking_run(fn, *args, timeout=None):
+        calls.append(fn)
+        started.set()
+        release.wait(5)
+        return run(fn, *args, timeout=timeout)
+
+    monkeypatch.setattr(service.kernel_pool, 'run', blocking_run)
+    monkeypatch.setattr(service, 'request_flights', SingleFlight())
+    yield started, release, calls
+    release.set()
+
+
+def post_in_thread(service, body, responses):
+    def post():
+        responses.append(service.app.test_client().post('/recommend', json=body).get_json())
+    thread = threading.Thread(target=post)
+    thread.start()
+    return thread
+
+
+def test_recommend_coalesces_identical_requests(service, blocked_kernel):
+    started, release, calls = blocked_kernel
+    body = {'userId': 'coalesce', 'candidateMusic': CANDIDATES, 'playedHistory': HISTORY, 'dedup': False}
+    responses = []
+
+    leader = post_in_thread(service, body, responses)
+    assert started.wait(5)
+    waiter = post_in_thread(service, body, responses)
+    wait_until(lambda: service.request_flights.stats()['waiting'] == 1)
+    release.set()
+    leader.join()
+    waiter.join()
+
+    assert len(calls) == 1
+    assert service.request_flights.stats()['coalesced'] == 1
+    assert responses[0]['data']['recommendedMusic'] == responses[1]['data']['recommendedMusic']
+
+
+def test_coalesced_request_keeps_its_deadline(service, blocked_kernel):
+    started, release, calls = blocked_kernel
+    body = {'userId': 'coalesce-deadline', 'candidateMusic': CANDIDATES, 'playedHistory': HISTORY, 'dedup': False}
+    responses = []
+
+    leader = post_in_thread(service, body, responses)
+    assert started.wait(5)
+    waiter = post_in_thread(service, dict(body, deadlineMs=50), responses)
+    waiter.join(5)
+
+    assert responses[0]['data']['partial'] is True
+    assert [music['videoId'] for music in responses[0]['data']['recommendedMusic']] == ['c1', 'c2', 'c3', 'c4']
+
+    release.set()
+    leader.join()
+    assert 'partial' not in responses[1]['data']
@@ -0,0 +1,56 @@
+"""
+어휘 세대 교체: 단어 수 상한, 교체 전에 만든 벡터도 그대로 사용 가능, 이전 세대는 벡터가 사라지면 해제
+"""
+
+import gc
+import pickle
+import weakref
+
+import numpy as np
+import pytest
+
+import term_vectors
+from term_vectors import TermVector, Vocabulary
+
+
+@pytest.fixture
+def small_vocabulary(monkeypatch):
+    vocabulary = Vocabulary(max_terms=4)
+    monkeypatch.setattr(term_vectors, 'vocabulary', vocabulary)
+    return vocabulary
+
+
+def test_vocabulary_rotates_at_max_terms(small_vocabulary):
+    first = TermVector.from_dict({'a': 1.0, 'b': 2.0, 'c': 3.0, 'd': 4.0})
+    second = TermVector.from_dict({'e': 1.0})
+
+    assert first.table is not second.table
+    assert small_vocabulary.stats() == {'terms': 1, 'maxTerms': 4, 'generation': 1, 'rotations': 1}
+    assert first.to_dict() == {'a': 1.0, 'b': 2.0, 'c': 3.0, 'd': 4.0}
+    assert first['c'] == 3.0 and 'e' not in first
+    assert pickle.loads(pickle.dumps(first)).to_dict() == first.to_dict()
+
+
+def test_old_generation_is_released(small_vocabulary):
+    old = TermVector.from_dict({f"term{index}": 1.0 for index in range(10)})
+    old_table = weakref.ref(old.table)
+    TermVector.from_dict({'new': 1.0})
+
+    del old
+    gc.collect()
+    assert old_table() is None
+
+
+def test_scoring_across_generations(service, small_vocabulary):
+    old = TermVector.from_dict({'love': 1.0, 'night': 0.5, 'ballad': 0.2, 'live': 0.1})
+    candidate_matrix = service.build_candidate_matrix([['love', 'night'], ['dance'], ['night', 'remix']])
+    new = TermVector.from_dict({'love': 1.0, 'night': 0.5, 'ballad': 0.2, 'live': 0.1})
+
+    assert old.table is not new.table
+    np.testing.assert_allclose(
+        service.score_candidates(old, candidate_matrix), service.score_candidates(new, candidate_matrix)
+    )
+    np.testing.assert_allclose(
+        service.score_candidates_batch([old, new], candidate_matrix),
+        [service.score_candidates(old, candidate_matrix)] * 2
+    )
@@ -165,19 +165,31 @@ const formatDuration = (seconds) => {
  * @param {number} resultsPerKeyword - 키워드당 결과 수 (기본값: 10)
  * @param {number} maxDuration - 최대 길이(초) (기본값: 300 = 5분)
  * @param {string[]} excludeVideoIds - 제외할 비디오 ID 배열 (중복 방지용)
+ * @param {Function} [onResults] - 키워드 하나의 검색이 끝날 때마다 새로 찾은 음악 배열로 호출 (스트리밍 추천용)
  * @returns {Promise<Object[]>} 음악 정보 배열
  */
-const searchMultipleKeywords = async (keywords, resultsPerKeyword = 10, maxDuration = MUSIC.MAX_DURATION, excludeVideoIds = []) => {
+const searchMultipleKeywords = async (keywords, resultsPerKeyword = 10, maxDuration = MUSIC.MAX_DURATION, excludeVideoIds = [], onResults = null) => {
   try {
     console.log(`[YouTube API] 다중 키워드 검색 시작: ${keywords.length}개 키워드`);
     console.log(`[YouTube API] 제외할 비디오: ${excludeVideoIds.length}개`);
     
     const allResults = [];
+    const forwardedIds = new Set(excludeVideoIds);
     
     for (const keyword of keywords) {
       try {
         const results = await searchMusic(keyword, resultsPerKeyword, maxDuration);
         allResults.push(...results);
+
+        // 전체 검색이 끝나기 전에 이번 키워드에서 새로 찾은 음악만 바로 전달
+        if (onResults) {
+          const newResults = results.filter(item => {
+            if (forwardedIds.has(item.videoId)) return false;
+            forwardedIds.add(item.videoId);
+            return true;
+          });
+          if (newResults.length > 0) onResults(newResults);
+        }
         
         // API 할당량 절약을 위한 딜레이 (200ms)
         await new Promise(resolve => setTimeout(resolve, 200));